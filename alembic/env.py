@@ -5,7 +5,7 @@ from sqlalchemy import pool
 
 from alembic import context  # type: ignore
 
-from app.models import Base
+from app.models import Base, include_object
 from app.config import settings
 
 # this is the Alembic Config object, which provides
@@ -49,6 +49,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -64,6 +65,13 @@ def run_migrations_online() -> None:
     and associate a connection with the context.
 
     """
+    # caller may pass its own connection, e.g. benchmarks migrate
+    # database other than the one of settings.
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        run_migrations_on(connection)
+        return
+
     connectable = engine_from_config(
         config.get_section(config.config_ini_section, {}),
         prefix="sqlalchemy.",
@@ -71,10 +79,18 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        run_migrations_on(connection)
+
+
+def run_migrations_on(connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_object=include_object,
+    )
 
-        with context.begin_transaction():
-            context.run_migrations()
+    with context.begin_transaction():
+        context.run_migrations()
 
 
 if context.is_offline_mode():
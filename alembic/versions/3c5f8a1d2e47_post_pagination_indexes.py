@@ -0,0 +1,31 @@
+"""post pagination indexes
+
+Revision ID: 3c5f8a1d2e47
+Revises: b94f1af04a47
+Create Date: 2026-10-18 09:12:41.204117
+
+"""
+from alembic import op  # type: ignore
+
+
+# revision identifiers, used by Alembic.
+revision = "3c5f8a1d2e47"
+down_revision = "b94f1af04a47"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_posts_created_at_id", "posts", ["created_at", "id"])
+    op.create_index(
+        "ix_posts_author_id_created_at_id", "posts", ["author_id", "created_at", "id"]
+    )
+    op.create_index(
+        "ix_posts_is_active_created_at_id", "posts", ["is_active", "created_at", "id"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_posts_is_active_created_at_id", table_name="posts")
+    op.drop_index("ix_posts_author_id_created_at_id", table_name="posts")
+    op.drop_index("ix_posts_created_at_id", table_name="posts")
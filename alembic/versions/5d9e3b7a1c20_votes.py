@@ -0,0 +1,44 @@
+"""votes
+
+Revision ID: 5d9e3b7a1c20
+Revises: 8e21b6f04c93
+Create Date: 2026-10-18 14:21:08.412593
+
+"""
+from alembic import op  # type: ignore
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "5d9e3b7a1c20"
+down_revision = "8e21b6f04c93"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "votes",
+        sa.Column("author_id", sa.Integer(), nullable=False),
+        sa.Column("post_id", sa.Integer(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.TIMESTAMP(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(["author_id"], ["authors.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["post_id"], ["posts.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("author_id", "post_id"),
+    )
+    op.add_column(
+        "posts",
+        sa.Column("vote_count", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.create_index("ix_posts_vote_count_id", "posts", ["vote_count", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_posts_vote_count_id", table_name="posts")
+    op.drop_column("posts", "vote_count")
+    op.drop_table("votes")
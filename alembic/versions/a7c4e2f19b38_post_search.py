@@ -0,0 +1,35 @@
+"""post search
+
+Revision ID: a7c4e2f19b38
+Revises: 5d9e3b7a1c20
+Create Date: 2026-10-18 15:02:44.718305
+
+"""
+from alembic import op  # type: ignore
+
+
+# revision identifiers, used by Alembic.
+revision = "a7c4e2f19b38"
+down_revision = "5d9e3b7a1c20"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # title matches weigh more than description matches in ranking.
+    op.execute(
+        "ALTER TABLE posts ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('english', title), 'A') || "
+        "setweight(to_tsvector('english', description), 'B')) STORED"
+    )
+    op.create_index(
+        "ix_posts_search_vector",
+        "posts",
+        ["search_vector"],
+        postgresql_using="gin",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_posts_search_vector", table_name="posts")
+    op.drop_column("posts", "search_vector")
@@ -0,0 +1,39 @@
+"""comment pagination
+
+Revision ID: c3e8d5a2f614
+Revises: a7c4e2f19b38
+Create Date: 2026-10-18 15:47:29.130862
+
+"""
+from alembic import op  # type: ignore
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "c3e8d5a2f614"
+down_revision = "a7c4e2f19b38"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_comments_post_id_created_at_id",
+        "comments",
+        ["post_id", "created_at", "id"],
+    )
+    op.add_column(
+        "posts",
+        sa.Column("comment_count", sa.Integer(), server_default="0", nullable=False),
+    )
+    # counters of existing posts are filled once, afterwards they are
+    # maintained together with comments.
+    op.execute(
+        "UPDATE posts SET comment_count = "
+        "(SELECT count(*) FROM comments WHERE comments.post_id = posts.id)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("posts", "comment_count")
+    op.drop_index("ix_comments_post_id_created_at_id", table_name="comments")
@@ -0,0 +1,292 @@
+"""Module is responsible for caching serialized post responses, so posts
+which didn't change since last request aren't loaded and serialized again.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional, Tuple
+
+from fastapi import Response, status
+
+from .config import settings
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class MemoryCacheBackend:
+    """class keeps bounded number of entries in process memory, least
+    recently used entries are evicted first. counters are kept apart
+    from entries and are bounded the same way. evicted counter starts
+    from the greatest value, which was ever evicted, so it never goes
+    back to version, whose entries may still be alive.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._counters: "OrderedDict[str, int]" = OrderedDict()
+        self._counter_floor = 0
+
+    async def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    async def get_counter(self, key: str) -> int:
+        with self._lock:
+            value = self._counters.get(key)
+            if value is None:
+                return self._counter_floor
+            self._counters.move_to_end(key)
+            return value
+
+    async def incr(self, key: str) -> int:
+        with self._lock:
+            value = self._counters.get(key, self._counter_floor) + 1
+            self._counters[key] = value
+            self._counters.move_to_end(key)
+            while len(self._counters) > self.max_size:
+                _, evicted = self._counters.popitem(last=False)
+                self._counter_floor = max(self._counter_floor, evicted + 1)
+            return value
+
+    async def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+            self._counter_floor = 0
+
+
+class RedisCacheBackend:
+    """class keeps entries in Redis (or compatible server),
+    so they are shared between workers.
+    """
+
+    def __init__(self, url: str, prefix: str = "response_cache:"):
+        # redis is optional dependency, it is needed by this backend only.
+        import redis.asyncio
+
+        self.client = redis.asyncio.Redis.from_url(url)
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(self.prefix + key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self.client.set(self.prefix + key, value, px=int(ttl * 1000))
+
+    async def get_counter(self, key: str) -> int:
+        return int(await self.client.get(self.prefix + key) or 0)
+
+    async def incr(self, key: str) -> int:
+        return await self.client.incr(self.prefix + key)
+
+    async def clear(self) -> None:
+        async for key in self.client.scan_iter(match=self.prefix + "*"):
+            await self.client.delete(key)
+
+
+class NullCacheBackend:
+    """class is used when caching is turned off, nothing is stored."""
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return None
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        pass
+
+    async def get_counter(self, key: str) -> int:
+        return 0
+
+    async def incr(self, key: str) -> int:
+        return 0
+
+    async def clear(self) -> None:
+        pass
+
+
+def build_backend():
+    """function creates cache backend chosen by settings."""
+    if settings.response_cache_backend == "redis":
+        return RedisCacheBackend(settings.response_cache_redis_url)
+    if settings.response_cache_backend == "none":
+        return NullCacheBackend()
+    return MemoryCacheBackend(settings.response_cache_size)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """function checks If-None-Match header against ETag,
+    weak comparison is used as HTTP requires for GET requests.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    etag = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in if_none_match.split(",")
+    )
+
+
+def post_etag(post_id: int, updated_at: datetime, comment_count: int) -> str:
+    """function builds ETag of one post from its last modification time and
+    number of its comments, comments don't change modification time, but
+    they change the post client receives.
+    """
+    microseconds = (updated_at - EPOCH) // timedelta(microseconds=1)
+    return f'W/"{post_id}-{microseconds}-{comment_count}"'
+
+
+def parse_post_etag(etag: str) -> Optional[Tuple[int, datetime]]:
+    """function restores post id and modification time from ETag built by
+    post_etag, None is returned for any other value.
+    """
+    try:
+        post_id, microseconds, _ = etag.strip().removeprefix("W/").strip('"').split("-")
+        return int(post_id), EPOCH + timedelta(microseconds=int(microseconds))
+    except ValueError:
+        return None
+
+
+def body_etag(body: bytes) -> str:
+    """function builds ETag of response, which has no single modification time."""
+    return f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+class CachedResponse:
+    """class holds serialized response body together with its ETag."""
+
+    def __init__(self, etag: str, body: bytes):
+        self.etag = etag
+        self.body = body
+
+    def dump(self) -> bytes:
+        return self.etag.encode() + b"\n" + self.body
+
+    @classmethod
+    def load(cls, value: bytes) -> "CachedResponse":
+        etag, body = value.split(b"\n", 1)
+        return cls(etag.decode(), body)
+
+    def to_response(self, if_none_match: Optional[str]) -> Response:
+        """function returns 304 if client already has this version,
+        otherwise it returns cached body.
+        """
+        if etag_matches(if_none_match, self.etag):
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": self.etag}
+            )
+        return Response(
+            content=self.body,
+            media_type="application/json",
+            headers={"ETag": self.etag},
+        )
+
+
+class ResponseCache:
+    """class caches serialized posts by id and post lists by query parameters.
+
+    every key contains version counter, which is read before database is
+    queried. write operations increase counters, so entries of old versions
+    are never read again and responses which were being built during write
+    are stored under dead keys.
+
+    replica may lag behind primary during read-your-writes window, so
+    responses read from replica within that window after write aren't
+    stored, otherwise stale body would be cached under new version and
+    served even to the writer, who reads from primary.
+    """
+
+    LIST_VERSION_KEY = "posts:version"
+    LIST_WRITTEN_KEY = "posts:written"
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    @staticmethod
+    def post_version_key(post_id: int) -> str:
+        return f"post:{post_id}:version"
+
+    @staticmethod
+    def post_written_key(post_id: int) -> str:
+        return f"post:{post_id}:written"
+
+    async def post_key(self, post_id: int) -> str:
+        version = await self.backend.get_counter(self.post_version_key(post_id))
+        return f"post:{post_id}:v{version}"
+
+    async def list_key(self, params: dict) -> str:
+        version = await self.backend.get_counter(self.LIST_VERSION_KEY)
+        query = "&".join(f"{name}={params[name]}" for name in sorted(params))
+        return f"posts:v{version}:{query}"
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        value = await self.backend.get(key)
+        return None if value is None else CachedResponse.load(value)
+
+    async def set(
+        self,
+        key: str,
+        etag: str,
+        body: bytes,
+        from_replica: bool = False,
+        post_id: Optional[int] = None,
+    ) -> CachedResponse:
+        """function stores response of given post or, without post_id, of
+        post list. response read from replica isn't stored, if posts were
+        written recently.
+        """
+        cached = CachedResponse(etag, body)
+        if from_replica:
+            written_key = (
+                self.LIST_WRITTEN_KEY
+                if post_id is None
+                else self.post_written_key(post_id)
+            )
+            if await self.backend.get(written_key) is not None:
+                return cached
+        await self.backend.set(key, cached.dump(), settings.response_cache_ttl_seconds)
+        return cached
+
+    async def invalidate_posts(self, post_ids: Iterable[int] = ()) -> None:
+        """function drops given posts and every post list, it must be called
+        after post is created, modified or deleted, or after author of
+        posts is changed, since author is embedded into them.
+        """
+        written_keys = [self.LIST_WRITTEN_KEY]
+        for post_id in post_ids:
+            await self.backend.incr(self.post_version_key(post_id))
+            written_keys.append(self.post_written_key(post_id))
+        await self.backend.incr(self.LIST_VERSION_KEY)
+        # written keys live as long as users stay pinned to primary.
+        if settings.read_your_writes_seconds > 0:
+            for written_key in written_keys:
+                await self.backend.set(
+                    written_key, b"1", settings.read_your_writes_seconds
+                )
+
+    async def clear(self) -> None:
+        await self.backend.clear()
+
+
+response_cache = ResponseCache(build_backend())
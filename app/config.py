@@ -1,5 +1,7 @@
 """Module is responsible to get and hold ENVIRONMENTAL VARIABLES."""
 
+from typing import Dict, Optional
+
 from pydantic import BaseSettings
 
 
@@ -15,6 +17,52 @@ class Settings(BaseSettings):
     secret_key: str
     algorithm: str
     access_token_expire_minutes: int
+    # async stack is an alternative, until it measures as well as threadpool one.
+    db_async: bool = False
+    # database, which benchmarks seed, it must differ from db_name.
+    benchmark_db_name: Optional[str] = None
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_statement_timeout_ms: int = 30_000
+    db_pgbouncer: bool = False
+    db_replica_hostname: Optional[str] = None
+    db_replica_port: Optional[str] = None
+    db_replica_name: Optional[str] = None
+    read_your_writes_seconds: float = 5.0
+    export_chunk_size: int = 1000
+    bulk_max_items: int = 1000
+    response_cache_backend: str = "memory"
+    response_cache_size: int = 10_000
+    response_cache_ttl_seconds: float = 60.0
+    response_cache_redis_url: str = "redis://localhost:6379/0"
+    # internal metrics endpoint is turned off, until token is given.
+    metrics_token: Optional[str] = None
+    rate_limit_backend: str = "memory"
+    rate_limit_redis_url: str = "redis://localhost:6379/0"
+    rate_limit_max_keys: int = 100_000
+    # "<METHOD> <path>" of route and "<number>/<second|minute|hour|day>".
+    rate_limits: Dict[str, str] = {
+        "POST /login": "10/minute",
+        "POST /register": "10/minute",
+        "POST /token/refresh": "60/minute",
+        "GET /posts/": "20/second",
+    }
+    verify_token_author: bool = True
+    author_cache_size: int = 10_000
+    author_cache_seconds: float = 60.0
+    token_cache_size: int = 10_000
+    refresh_token_expire_days: int = 30
+    revocation_cache_size: int = 100_000
+    revocation_sync_seconds: float = 5.0
+    blacklist_purge_interval_seconds: float = 60.0
+    blacklist_purge_batch_size: int = 1000
+    blacklist_purge_max_batches: int = 100
+    password_hash_workers: int = 2
+    password_hash_max_pending: int = 16
+    password_hash_retry_after_seconds: int = 1
 
     class Config:
         env_file = ".env"
@@ -1,31 +1,52 @@
 """Module is responsible for adding token into black list, and
-removing old tokens from database.
+removing expired tokens from database.
 """
 
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
 
-from app import models, config
+from app import models
+from app.revocation import revocation_cache
 
 
-def save_in_black_list(user_token: str, user_id: int, db: Session) -> bool:
-    """function is responsible for adding user token into
-    black list table.
+async def save_in_black_list(
+    jti: str, exp: datetime, user_id: int, db: AsyncSession
+) -> bool:
+    """function is responsible for adding user token's id (jti) into
+    black list table. token is revoked in current worker's cache
+    immediately, other workers pick it up on their next sync.
     """
-    black_token = models.BlackList(token=user_token, user_id=user_id)
+    black_token = models.BlackList(jti=jti, exp=exp, user_id=user_id)
     db.add(black_token)
-    db.commit()
-    db.refresh(black_token)
+    await db.commit()
+    revocation_cache.add(jti, exp.timestamp())
     return True
 
 
-def remove_old_black_tokens(db: Session) -> bool:
-    """function checks and removes tokens from database,
-    that are older than determined - (access_token_expire_minutes) time.
+def remove_old_black_tokens(db: Session, batch_size: int) -> int:
+    """function removes at most batch_size tokens from database,
+    which are already expired, such tokens are rejected anyway.
+    returns number of removed tokens.
     """
-    expiration_time = config.settings.access_token_expire_minutes
-    limit = datetime.now() - timedelta(minutes=int(expiration_time))
-    my_query = db.query(models.BlackList).filter(models.BlackList.created_at < limit)
-    my_query.delete()
+    limit = datetime.now(timezone.utc)
+    # rows locked by another worker's purge are skipped instead of waited for.
+    expired_ids = (
+        select(models.BlackList.id)
+        .where(models.BlackList.exp < limit)
+        .order_by(models.BlackList.exp)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    my_query = db.query(models.BlackList).filter(models.BlackList.id.in_(expired_ids))
+    removed = my_query.delete(synchronize_session=False)
     db.commit()
-    return True
+    return removed
+
+
+def count_old_black_tokens(db: Session) -> int:
+    """function returns number of expired tokens, which are still in database."""
+    limit = datetime.now(timezone.utc)
+    return db.query(models.BlackList.id).filter(models.BlackList.exp < limit).count()
@@ -1,24 +1,318 @@
 """Module is responsible for preparing database."""
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from contextlib import asynccontextmanager
+from typing import Optional
+from uuid import uuid4
+
+import anyio
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 
 from .config import settings
+from .pool import TimedAsyncAdaptedQueuePool, TimedQueuePool
 
 
 SQLALCHEMY_DATABASE_URL = f"postgresql://{settings.db_username}:{settings.db_password}@{settings.db_hostname}:{settings.db_port}/{settings.db_name}"
+ASYNC_SQLALCHEMY_DATABASE_URL = f"postgresql+asyncpg://{settings.db_username}:{settings.db_password}@{settings.db_hostname}:{settings.db_port}/{settings.db_name}"
+
+# replica shares credentials of primary database, port and database name
+# are the same as primary ones, unless they are set explicitly.
+REPLICA_PORT = settings.db_replica_port or settings.db_port
+REPLICA_NAME = settings.db_replica_name or settings.db_name
+REPLICA_SQLALCHEMY_DATABASE_URL = f"postgresql://{settings.db_username}:{settings.db_password}@{settings.db_replica_hostname}:{REPLICA_PORT}/{REPLICA_NAME}"
+ASYNC_REPLICA_SQLALCHEMY_DATABASE_URL = f"postgresql+asyncpg://{settings.db_username}:{settings.db_password}@{settings.db_replica_hostname}:{REPLICA_PORT}/{REPLICA_NAME}"
+
+
+def unique_statement_name() -> str:
+    """function names prepared statement of asyncpg uniquely, so statements
+    of different clients sharing server connection never collide.
+    """
+    return f"__asyncpg_{uuid4()}__"
+
+
+def connect_args(async_driver: bool) -> dict:
+    """function returns driver specific arguments of new connections."""
+    if settings.db_pgbouncer:
+        # PgBouncer in transaction mode hands server connection to another
+        # client after every transaction and rejects startup parameters, so
+        # no prepared statements are cached, statements asyncpg still
+        # prepares get unique names and timeout is set per transaction.
+        if not async_driver:
+            return {}
+        return {
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": unique_statement_name,
+        }
+    if not settings.db_statement_timeout_ms:
+        return {}
+    statement_timeout = str(settings.db_statement_timeout_ms)
+    if async_driver:
+        return {"server_settings": {"statement_timeout": statement_timeout}}
+    return {"options": f"-c statement_timeout={statement_timeout}"}
+
+
+def pool_options() -> dict:
+    """function returns connection pool configuration of engines."""
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+
+class AppSession(Session):
+    """class is used by application sessions, so session events
+    are attached to them only.
+    """
+
+
+@event.listens_for(AppSession, "after_begin")
+def set_local_statement_timeout(session, transaction, connection):
+    """function limits statement time of every transaction, when timeout
+    can't be set once per connection because of PgBouncer.
+    """
+    if settings.db_pgbouncer and settings.db_statement_timeout_ms:
+        connection.exec_driver_sql(
+            f"SET LOCAL statement_timeout = {int(settings.db_statement_timeout_ms)}"
+        )
+
+
+def build_engine(url: str):
+    """function creates sync engine with configured pool."""
+    return create_engine(
+        url,
+        poolclass=TimedQueuePool,
+        connect_args=connect_args(async_driver=False),
+        **pool_options(),
+    )
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def build_async_engine(url: str):
+    """function creates async engine with configured pool."""
+    return create_async_engine(
+        url,
+        poolclass=TimedAsyncAdaptedQueuePool,
+        connect_args=connect_args(async_driver=True),
+        **pool_options(),
+    )
+
+
+# engines and session factories are created by create_engines on startup
+# of the application, so importing it neither loads database drivers
+# nor needs database to be reachable.
+engine = None
+SessionLocal = None
+async_engine = None
+AsyncSessionLocal = None
+
+# read replica is optional, without it every query goes to primary database.
+replica_engine = None
+async_replica_engine = None
+ReadSessionLocal = None
+AsyncReadSessionLocal = None
+
+
+def create_engines() -> None:
+    """function creates engines and session factories, which don't exist
+    yet. engines connect to database only when they are used.
+    """
+    global engine, SessionLocal, async_engine, AsyncSessionLocal
+    global replica_engine, async_replica_engine
+    global ReadSessionLocal, AsyncReadSessionLocal
+    if engine is None:
+        engine = build_engine(SQLALCHEMY_DATABASE_URL)
+        SessionLocal = sessionmaker(
+            autocommit=False, autoflush=False, bind=engine, class_=AppSession
+        )
+        async_engine = build_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL)
+        AsyncSessionLocal = async_sessionmaker(
+            autocommit=False,
+            autoflush=False,
+            bind=async_engine,
+            expire_on_commit=False,
+            sync_session_class=AppSession,
+        )
+    if settings.db_replica_hostname and replica_engine is None:
+        replica_engine = build_engine(REPLICA_SQLALCHEMY_DATABASE_URL)
+        ReadSessionLocal = sessionmaker(
+            autocommit=False, autoflush=False, bind=replica_engine, class_=AppSession
+        )
+        async_replica_engine = build_async_engine(ASYNC_REPLICA_SQLALCHEMY_DATABASE_URL)
+        AsyncReadSessionLocal = async_sessionmaker(
+            autocommit=False,
+            autoflush=False,
+            bind=async_replica_engine,
+            expire_on_commit=False,
+            sync_session_class=AppSession,
+        )
+
+
+async def dispose_engines() -> None:
+    """function closes pooled connections of every engine and forgets
+    them, create_engines makes new ones if they are needed again.
+    """
+    global engine, SessionLocal, async_engine, AsyncSessionLocal
+    global replica_engine, async_replica_engine
+    global ReadSessionLocal, AsyncReadSessionLocal
+    if engine is not None:
+        engine.dispose()
+        await async_engine.dispose()
+    if replica_engine is not None:
+        replica_engine.dispose()
+        await async_replica_engine.dispose()
+    engine = SessionLocal = async_engine = AsyncSessionLocal = None
+    replica_engine = async_replica_engine = None
+    ReadSessionLocal = AsyncReadSessionLocal = None
+
 
 Base = declarative_base()
 
 
+class ThreadpoolSession:
+    """class gives sync session the same awaitable interface as AsyncSession
+    has, every database call runs in threadpool. it lets routers written
+    for async stack run on top of sync driver.
+    if slots are given, one of them is taken before the first database
+    call and returned on close, requests which don't use database never
+    wait for it.
+    """
+
+    def __init__(self, session: Session, slots: Optional[anyio.Semaphore] = None):
+        self.sync_session = session
+        self.slots = slots
+        self.holds_slot = False
+
+    async def run(self, function, *args, **kwargs):
+        if self.slots is not None and not self.holds_slot:
+            await self.slots.acquire()
+            self.holds_slot = True
+        return await run_in_threadpool(function, *args, **kwargs)
+
+    def get_bind(self):
+        return self.sync_session.get_bind()
+
+    @property
+    def info(self) -> dict:
+        return self.sync_session.info
+
+    def add(self, instance) -> None:
+        self.sync_session.add(instance)
+
+    def add_all(self, instances) -> None:
+        self.sync_session.add_all(instances)
+
+    async def execute(self, statement, params=None, **kwargs):
+        return await self.run(self.sync_session.execute, statement, params, **kwargs)
+
+    async def scalar(self, statement, params=None, **kwargs):
+        return await self.run(self.sync_session.scalar, statement, params, **kwargs)
+
+    async def scalars(self, statement, params=None, **kwargs):
+        return await self.run(self.sync_session.scalars, statement, params, **kwargs)
+
+    async def stream(self, statement, params=None, **kwargs):
+        result = await self.run(self.sync_session.execute, statement, params, **kwargs)
+        return ThreadpoolResult(result)
+
+    async def get(self, entity, ident, **kwargs):
+        return await self.run(self.sync_session.get, entity, ident, **kwargs)
+
+    async def refresh(self, instance, attribute_names=None):
+        await self.run(self.sync_session.refresh, instance, attribute_names)
+
+    async def flush(self) -> None:
+        await self.run(self.sync_session.flush)
+
+    async def commit(self) -> None:
+        await self.run(self.sync_session.commit)
+
+    async def rollback(self) -> None:
+        await self.run(self.sync_session.rollback)
+
+    async def close(self) -> None:
+        if not self.holds_slot:
+            # session, which never took a slot, holds no connection.
+            self.sync_session.close()
+            return
+        try:
+            await run_in_threadpool(self.sync_session.close)
+        finally:
+            self.slots.release()
+            self.holds_slot = False
+
+
+class ThreadpoolResult:
+    """class gives buffered sync result the same partitions interface
+    as AsyncResult has, every chunk is fetched in threadpool.
+    """
+
+    def __init__(self, result):
+        self.result = result
+
+    async def partitions(self, size=None):
+        partitions = self.result.partitions(size)
+        while True:
+            partition = await run_in_threadpool(next, partitions, None)
+            if partition is None:
+                return
+            yield partition
+
+    async def close(self) -> None:
+        await run_in_threadpool(self.result.close)
+
+
+# sync session keeps its connection between threadpool calls, so sessions
+# waiting for pool checkout could occupy every thread, while sessions which
+# hold connections wait for a thread to release them. number of sync
+# sessions, which use database, is limited to pool capacity, extra
+# requests wait in event loop. every engine has own pool, so it has own
+# slots too: replica read holds primary session of authentication, it
+# would wait forever for the second slot of one shared limit.
+threadpool_session_slots = anyio.Semaphore(
+    settings.db_pool_size + settings.db_max_overflow
+)
+replica_session_slots = anyio.Semaphore(
+    settings.db_pool_size + settings.db_max_overflow
+)
+
+
+@asynccontextmanager
+async def open_session(session_factory, async_session_factory, slots):
+    """function opens session of stack chosen by settings, made by one
+    of given factories, sync session takes one of given slots. neither
+    session takes connection from the pool before it is used.
+    """
+    if settings.db_async:
+        async with async_session_factory() as db:
+            yield db
+    else:
+        db = ThreadpoolSession(session_factory(expire_on_commit=False), slots)
+        try:
+            yield db
+        finally:
+            await db.close()
+
+
+def replica_configured() -> bool:
+    """function checks if read replica is available."""
+    create_engines()
+    return ReadSessionLocal is not None
+
+
 # Dependency
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_async_db():
+    create_engines()
+    async with open_session(
+        SessionLocal, AsyncSessionLocal, threadpool_session_slots
+    ) as db:
         yield db
-    finally:
-        db.close()
+
+
+def open_read_session():
+    """function opens session connected to read replica."""
+    create_engines()
+    return open_session(ReadSessionLocal, AsyncReadSessionLocal, replica_session_slots)
@@ -0,0 +1,39 @@
+"""Module is responsible for streaming query results to client
+as newline-delimited JSON, chunk by chunk.
+"""
+
+from typing import AsyncIterator, Callable, List, Sequence
+
+from fastapi.responses import StreamingResponse
+
+from app import serialization
+from .config import settings
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+async def stream_rows(
+    db, statement, to_dicts: Callable[[Sequence[tuple]], List[dict]]
+) -> AsyncIterator[bytes]:
+    """function reads rows through server-side cursor, so only one chunk
+    of rows is held in memory, and yields every chunk encoded.
+    """
+    result = await db.stream(
+        statement.execution_options(yield_per=settings.export_chunk_size)
+    )
+    try:
+        async for rows in result.partitions():
+            yield serialization.dumps_lines(to_dicts(rows))
+    finally:
+        # we release cursor, also when client disconnects in the middle.
+        await result.close()
+
+
+def ndjson_response(
+    db, statement, to_dicts: Callable[[Sequence[tuple]], List[dict]]
+) -> StreamingResponse:
+    """function returns response, which streams rows of statement."""
+    return StreamingResponse(
+        stream_rows(db, statement, to_dicts), media_type=NDJSON_MEDIA_TYPE
+    )
@@ -1,17 +1,42 @@
 """Module is responsible for launching server in development local area."""
 
+import asyncio
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI
 
-from app.routers import user, authentication, post, comment
+from app import tasks, utils
+from app import database
+from app.rate_limit import RateLimitMiddleware, rate_limiter
+from app.routers import user, authentication, post, comment, metrics, vote
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """function creates database engines and starts background tasks
+    with the application, they are stopped and disposed on shutdown.
+    database schema is managed by alembic migrations only.
+    """
+    database.create_engines()
+    purge_task = asyncio.create_task(tasks.purge_black_list_periodically())
+    yield
+    purge_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await purge_task
+    utils.shutdown_password_pool()
+    await database.dispose_engines()
 
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
 
 
 app.include_router(post.router)
 app.include_router(user.router)
 app.include_router(authentication.router)
 app.include_router(comment.router)
+app.include_router(vote.router)
+app.include_router(metrics.router)
 
 
 @app.get("/")
@@ -1,9 +1,18 @@
 """Module is responsible for creating relational database tables."""
 
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Float
+from sqlalchemy import (
+    DDL,
+    Column,
+    Integer,
+    String,
+    Boolean,
+    ForeignKey,
+    Float,
+    Index,
+    event,
+)
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql.sqltypes import TIMESTAMP
-from sqlalchemy.sql.expression import text
 from sqlalchemy.sql import func
 
 from .database import Base
@@ -17,7 +26,7 @@ class Author(Base):
     password = Column(String, nullable=False)
     email = Column(String, nullable=False, unique=True)
     created_at = Column(
-        TIMESTAMP(timezone=True), nullable=False, server_default=text("now()")
+        TIMESTAMP(timezone=True), nullable=False, server_default=func.now()
     )
     posts = relationship("Post", back_populates="author")
     comments = relationship("Comment", back_populates="author")
@@ -41,8 +50,77 @@ class Post(Base):
     author_id = Column(
         Integer, ForeignKey("authors.id", ondelete="CASCADE"), nullable=False
     )
+    # numbers of votes and comments are kept on post row,
+    # so lists don't count them.
+    vote_count = Column(Integer, nullable=False, server_default="0")
+    comment_count = Column(Integer, nullable=False, server_default="0")
     author = relationship("Author", back_populates="posts")
 
+    # composite indexes serve keyset pagination ordered by (created_at, id)
+    # or (vote_count, id), optionally narrowed down by author or activity status.
+    __table_args__ = (
+        Index("ix_posts_created_at_id", "created_at", "id"),
+        Index("ix_posts_author_id_created_at_id", "author_id", "created_at", "id"),
+        Index("ix_posts_is_active_created_at_id", "is_active", "created_at", "id"),
+        Index("ix_posts_vote_count_id", "vote_count", "id"),
+    )
+
+
+# full-text search index depends on database, so it isn't part of the model.
+# PostgreSQL keeps generated tsvector column with GIN index, while SQLite
+# (used without PostgreSQL server) keeps FTS5 table synchronized by triggers.
+POSTGRESQL_SEARCH_DDL = (
+    "ALTER TABLE posts ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', title), 'A') || "
+    "setweight(to_tsvector('english', description), 'B')) STORED",
+    "CREATE INDEX ix_posts_search_vector ON posts USING gin (search_vector)",
+)
+# objects created by search DDL, autogenerate of migrations must skip them,
+# they aren't declared on the model.
+SEARCH_SCHEMA_OBJECTS = {
+    ("column", "search_vector"),
+    ("index", "ix_posts_search_vector"),
+    ("table", "posts_fts"),
+}
+SQLITE_SEARCH_DDL = (
+    "CREATE VIRTUAL TABLE posts_fts USING fts5("
+    "title, description, content='posts', content_rowid='id')",
+    "CREATE TRIGGER posts_fts_insert AFTER INSERT ON posts BEGIN "
+    "INSERT INTO posts_fts (rowid, title, description) "
+    "VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER posts_fts_delete AFTER DELETE ON posts BEGIN "
+    "INSERT INTO posts_fts (posts_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER posts_fts_update AFTER UPDATE ON posts BEGIN "
+    "INSERT INTO posts_fts (posts_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO posts_fts (rowid, title, description) "
+    "VALUES (new.id, new.title, new.description); END",
+)
+
+for statement in POSTGRESQL_SEARCH_DDL:
+    event.listen(
+        Post.__table__,
+        "after_create",
+        DDL(statement).execute_if(dialect="postgresql"),
+    )
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(
+        Post.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite")
+    )
+event.listen(
+    Post.__table__,
+    "after_drop",
+    DDL("DROP TABLE IF EXISTS posts_fts").execute_if(dialect="sqlite"),
+)
+
+
+def include_object(object, name, type_, reflected, compare_to) -> bool:
+    """function is include_object hook of alembic autogenerate, it skips
+    search objects, so migrations never propose to drop them.
+    """
+    return not (reflected and (type_, name) in SEARCH_SCHEMA_OBJECTS)
+
 
 class Comment(Base):
     __tablename__ = "comments"
@@ -50,7 +128,7 @@ class Comment(Base):
     id = Column(Integer, primary_key=True, nullable=False)
     comment = Column(String, nullable=False)
     created_at = Column(
-        TIMESTAMP(timezone=True), nullable=False, server_default=text("now()")
+        TIMESTAMP(timezone=True), nullable=False, server_default=func.now()
     )
     post_id = Column(
         Integer,
@@ -64,13 +142,52 @@ class Comment(Base):
     )
     author = relationship("Author", back_populates="comments")
 
+    # composite index serves keyset pagination of post comments.
+    __table_args__ = (
+        Index("ix_comments_post_id_created_at_id", "post_id", "created_at", "id"),
+    )
+
+
+class Vote(Base):
+    __tablename__ = "votes"
+
+    author_id = Column(
+        Integer, ForeignKey("authors.id", ondelete="CASCADE"), primary_key=True
+    )
+    post_id = Column(
+        Integer, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True
+    )
+    created_at = Column(
+        TIMESTAMP(timezone=True), nullable=False, server_default=func.now()
+    )
+
 
 class BlackList(Base):
     __tablename__ = "blacklist"
 
     id = Column(Integer, primary_key=True, nullable=False)
-    token = Column(String, unique=True, nullable=False)
+    jti = Column(String(32), unique=True, nullable=False)
+    exp = Column(TIMESTAMP(timezone=True), nullable=False, index=True)
     user_id = Column(Integer, nullable=False)
     created_at = Column(
-        TIMESTAMP(timezone=True), nullable=False, server_default=text("now()")
+        TIMESTAMP(timezone=True), nullable=False, server_default=func.now()
+    )
+
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, nullable=False)
+    # only digest of token is stored, so rows can't be used to log in.
+    token_hash = Column(String(64), unique=True, nullable=False)
+    # tokens, which were rotated from the same login, share family id.
+    family_id = Column(String(32), nullable=False, index=True)
+    author_id = Column(
+        Integer, ForeignKey("authors.id", ondelete="CASCADE"), nullable=False
+    )
+    expires_at = Column(TIMESTAMP(timezone=True), nullable=False, index=True)
+    used_at = Column(TIMESTAMP(timezone=True), nullable=True)
+    revoked_at = Column(TIMESTAMP(timezone=True), nullable=True)
+    created_at = Column(
+        TIMESTAMP(timezone=True), nullable=False, server_default=func.now()
     )
@@ -1,13 +1,20 @@
 """Module is responsible for JWT token related operations."""
 
-from fastapi import HTTPException, Depends, status
+from fastapi import HTTPException, Depends, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JOSEError, jwt
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
+from typing import Dict, Optional, Tuple, Union
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import schemas, models
-from app.database import get_db
+from app.database import get_async_db
+from app.revocation import revocation_cache
 from .config import settings
 
 
@@ -18,55 +25,218 @@ ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
 oauth_schema = OAuth2PasswordBearer(tokenUrl="login")
 
 
+class KnownAuthors:
+    """class remembers authors, whose existence was confirmed recently,
+    so authenticated requests don't query authors table every time.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._known_until: Dict[int, float] = {}
+
+    def add(self, author_id: int) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._known_until[author_id] = now + self.ttl_seconds
+            # expired entries are dropped, when there are too many of them,
+            # if all of them are alive, cache starts from scratch.
+            if len(self._known_until) > self.max_size:
+                self._known_until = {
+                    known_id: until
+                    for known_id, until in self._known_until.items()
+                    if until > now
+                }
+            if len(self._known_until) > self.max_size:
+                self._known_until = {author_id: now + self.ttl_seconds}
+
+    def __contains__(self, author_id: int) -> bool:
+        return self._known_until.get(author_id, 0) > time.monotonic()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._known_until.clear()
+
+
+known_authors = KnownAuthors(
+    max_size=settings.author_cache_size,
+    ttl_seconds=settings.author_cache_seconds,
+)
+
+
+class DecodedTokens:
+    """class remembers claims of recently verified tokens, so signature of
+    token, which client sends again and again, isn't verified every time.
+    tokens are found by their digest, least recently used entries are
+    evicted first and every entry is dropped, when its token expires.
+    revocation isn't cached here, it is checked on every request.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[bytes, Tuple[float, schemas.TokenData]]" = (
+            OrderedDict()
+        )
+
+    @staticmethod
+    def key(user_token: Union[str, bytes]) -> bytes:
+        """function returns digest of token, raw bytes of header may be given."""
+        if isinstance(user_token, str):
+            user_token = user_token.encode()
+        return hashlib.blake2b(user_token, digest_size=32).digest()
+
+    def get(self, key: bytes) -> Optional[schemas.TokenData]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.time():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def add(self, key: bytes, expires_at: float, token_data: schemas.TokenData):
+        """function remembers claims of verified token until expires_at (unix time)."""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (expires_at, token_data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+decoded_tokens = DecodedTokens(max_size=settings.token_cache_size)
+
+
 def create_access_token(data: dict):
-    """function creates unique token for logged in user."""
+    """function creates unique token for logged in user, every token
+    gets random jti (token id), which is used to revoke it.
+    """
     to_encode = data.copy()
 
     expire_time = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire_time})
+    to_encode.update({"exp": expire_time, "jti": uuid.uuid4().hex})
+
+    # jose is imported on first use, it loads cryptography backends.
+    from jose import jwt
 
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
 def verify_access_token(user_token: str, credential_exception):
-    """function verifies if token used by user is valid."""
+    """function verifies if token used by user is valid, claims of
+    token, which was verified recently and hasn't expired, are reused.
+    """
+    key = decoded_tokens.key(user_token)
+    token_data = decoded_tokens.get(key)
+    if token_data is not None:
+        return token_data
+    return decode_access_token(user_token, key, credential_exception)
+
+
+def decode_access_token(user_token: str, key: bytes, credential_exception):
+    """function verifies signature and claims of token, which isn't in
+    cache of decoded tokens, and remembers them by given digest of token.
+    """
+    from jose import JOSEError, jwt
+
     try:
         # we verify if token is valid
         decoded_jwt = jwt.decode(
             token=user_token, key=SECRET_KEY, algorithms=[ALGORITHM]
         )
         id: str = decoded_jwt.get("author_id")
+        jti: str = decoded_jwt.get("jti")
         # if user tries to access some data by using invalid,
         # token, then we will raise 403 error.
-        if id is None:
+        if id is None or jti is None:
             raise credential_exception
-        token_data = schemas.TokenData(id=id)
-        return token_data
+        expires_at = decoded_jwt.get("exp")
+        token_data = schemas.TokenData(
+            id=id, jti=jti, exp=expires_at, family=decoded_jwt.get("fid")
+        )
     except JOSEError:
         raise credential_exception
+    # token without expiration time isn't cached, it could never be evicted.
+    if expires_at is not None:
+        decoded_tokens.add(key, float(expires_at), token_data)
+    return token_data
 
 
-def get_current_user(
-    user_token: str = Depends(oauth_schema), db: Session = Depends(get_db)
+async def get_current_token(
+    request: Request,
+    user_token: str = Depends(oauth_schema),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    """function returns current user's id, if user's credentials and JWT token are valid."""
+    """function returns claims of provided JWT token, if token is valid
+    and it wasn't revoked. token, which was verified by rate limiter
+    during the same request, isn't verified again.
+    """
     credential_exception = HTTPException(
         status_code=status.HTTP_403_FORBIDDEN,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    # we check if provided token is in black_list.
-    check_token = (
-        db.query(models.BlackList).filter(models.BlackList.token == user_token).first()
-    )
-    # If provided token is not in black list,
-    # Then we try, to verify it.
-    if check_token is None:
-        author = verify_access_token(user_token, credential_exception)
-        current_user = (
-            db.query(models.Author).filter(models.Author.id == int(author.id)).first()
-        )
-        return current_user.id
+    verified = request.scope.get("state", {}).get("token_data")
+    if verified is not None and verified[0] == user_token:
+        token_data = verified[1]
     else:
+        token_data = verify_access_token(user_token, credential_exception)
+    # we check if provided token is in black_list, in-memory copy of
+    # black list is refreshed from database once per sync interval and
+    # database is asked directly only if copy can't give reliable answer.
+    if revocation_cache.needs_sync():
+        await revocation_cache.sync(db)
+    is_revoked = revocation_cache.is_revoked(token_data.jti)
+    if is_revoked is None:
+        check_token = await db.scalar(
+            select(models.BlackList.id).where(models.BlackList.jti == token_data.jti)
+        )
+        is_revoked = check_token is not None
+    if is_revoked:
         raise credential_exception
+    return token_data
+
+
+async def get_current_user(
+    token_data: schemas.TokenData = Depends(get_current_token),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """function returns current user's id, if user's credentials and JWT token are valid.
+    id is taken from token itself, existence of the author is checked
+    once per cache interval, unless the check is turned off.
+    """
+    author_id = int(token_data.id)
+    if not settings.verify_token_author or author_id in known_authors:
+        return author_id
+    # we check if author of the token still exists,
+    # if not, token isn't accepted anymore.
+    exists = await db.scalar(
+        select(models.Author.id).where(models.Author.id == author_id)
+    )
+    if exists is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    known_authors.add(author_id)
+    return author_id
@@ -0,0 +1,44 @@
+"""Module is responsible for encoding and decoding keyset pagination cursors."""
+
+import base64
+from datetime import datetime
+from typing import Tuple
+
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    """function turns (created_at, id) pair of the last returned row
+    into opaque string, which client sends back to get next page.
+    """
+    raw_cursor = f"{created_at.isoformat()}|{id}"
+    return base64.urlsafe_b64encode(raw_cursor.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """function restores (created_at, id) pair from opaque cursor,
+    ValueError is raised if cursor was not generated by encode_cursor.
+    """
+    try:
+        raw_cursor = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, id = raw_cursor.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor!")
+
+
+def encode_vote_cursor(vote_count: int, id: int) -> str:
+    """function turns (vote_count, id) pair of the last returned row into
+    opaque string, it is used when posts are sorted by votes.
+    """
+    return base64.urlsafe_b64encode(f"{vote_count}|{id}".encode()).decode()
+
+
+def decode_vote_cursor(cursor: str) -> Tuple[int, int]:
+    """function restores (vote_count, id) pair from opaque cursor,
+    ValueError is raised if cursor was not generated by encode_vote_cursor.
+    """
+    try:
+        raw_cursor = base64.urlsafe_b64decode(cursor.encode()).decode()
+        vote_count, id = raw_cursor.split("|")
+        return int(vote_count), int(id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor!")
@@ -0,0 +1,89 @@
+"""Module is responsible for connection pools, which measure how long
+requests wait for database connection.
+"""
+
+import threading
+import time
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+# upper bounds (seconds) of wait time histogram buckets.
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, float("inf"))
+
+
+class WaitHistogram:
+    """class counts pool checkout wait times into fixed buckets."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counts = [0] * len(WAIT_BUCKETS)
+            self.total = 0
+            self.sum_seconds = 0.0
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            for index, upper_bound in enumerate(WAIT_BUCKETS):
+                if seconds <= upper_bound:
+                    self.counts[index] += 1
+                    break
+            self.total += 1
+            self.sum_seconds += seconds
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "buckets": {
+                    str(upper_bound): count
+                    for upper_bound, count in zip(WAIT_BUCKETS, self.counts)
+                },
+                "count": self.total,
+                "sum_seconds": self.sum_seconds,
+            }
+
+
+class TimedPoolMixin:
+    """mixin measures time spent to get connection out of the pool,
+    including waiting for other sessions to return one.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.wait_histogram = kwargs.pop("wait_histogram", None) or WaitHistogram()
+        super().__init__(*args, **kwargs)
+
+    def recreate(self):
+        new_pool = super().recreate()
+        new_pool.wait_histogram = self.wait_histogram
+        return new_pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.wait_histogram.observe(time.perf_counter() - started)
+
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_status(pool) -> dict:
+    """function returns current state of connection pool."""
+    status = {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "checked_in": pool.checkedin(),
+    }
+    if isinstance(pool, TimedPoolMixin):
+        status["checkout_wait"] = pool.wait_histogram.as_dict()
+    return status
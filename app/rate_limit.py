@@ -0,0 +1,281 @@
+"""Module is responsible for limiting how often single client may call
+expensive routes. every client gets token bucket per limited route,
+client is author of verified JWT token or, without one, its IP address.
+"""
+
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from starlette.responses import JSONResponse
+from starlette.routing import compile_path
+
+from . import oauth2
+from .config import settings
+
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+# exception is only caught, so one instance is shared by all requests.
+INVALID_TOKEN = HTTPException(status_code=status.HTTP_403_FORBIDDEN)
+
+
+class Rule:
+    """class describes limit of one route: bucket holds at most limit
+    tokens and gets limit tokens back during period, so short bursts
+    are allowed, but average rate can't exceed limit per period.
+    """
+
+    def __init__(self, route: str, limit: int, period: int):
+        self.route = route
+        self.limit = limit
+        self.period = period
+        self.refill_per_second = limit / period
+        # headers, which don't depend on the bucket, are built once.
+        self.headers = [
+            (b"ratelimit-limit", str(limit).encode()),
+            (b"ratelimit-policy", f"{limit};w={period}".encode()),
+        ]
+
+    @classmethod
+    def parse(cls, route: str, value: str) -> "Rule":
+        """function parses limit given as "<number>/<second|minute|hour|day>"."""
+        limit, _, period = value.partition("/")
+        if period not in PERIODS or not limit.isdigit() or int(limit) < 1:
+            raise ValueError(f"invalid rate limit of {route}: {value}")
+        return cls(route, int(limit), PERIODS[period])
+
+
+class MemoryRateLimitBackend:
+    """class keeps buckets in process memory, so every worker limits
+    clients on its own. least recently used buckets are evicted first,
+    evicted bucket is simply full again. buckets are used from event loop
+    only, so they need no lock.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self.clock = time.monotonic
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    async def take(self, key: str, rule: Rule) -> Tuple[bool, float]:
+        """function takes one token from the bucket, if there is one.
+        whether request is allowed and number of tokens left are returned.
+        """
+        now = self.clock()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [rule.limit, now]
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            tokens, updated_at = bucket
+            bucket[0] = min(
+                rule.limit, tokens + (now - updated_at) * rule.refill_per_second
+            )
+            bucket[1] = now
+        if bucket[0] < 1:
+            return False, bucket[0]
+        bucket[0] -= 1
+        return True, bucket[0]
+
+    async def clear(self) -> None:
+        self._buckets.clear()
+
+
+# bucket is updated by one script, so concurrent workers can't take the
+# same token. server time is used, clocks of workers may differ.
+TAKE_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local refill_per_second = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(bucket[1]) or limit
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(limit, tokens + math.max(0, now - updated_at) * refill_per_second)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(limit / refill_per_second * 1000))
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisRateLimitBackend:
+    """class keeps buckets in Redis (or compatible server), so limits
+    are shared between workers. bucket expires, when it would be full.
+    """
+
+    def __init__(self, url: str, prefix: str = "rate_limit:"):
+        # redis is optional dependency, it is needed by this backend only.
+        import redis.asyncio
+
+        self.client = redis.asyncio.Redis.from_url(url)
+        self.prefix = prefix
+        self._take = self.client.register_script(TAKE_SCRIPT)
+
+    async def take(self, key: str, rule: Rule) -> Tuple[bool, float]:
+        allowed, tokens = await self._take(
+            keys=[self.prefix + key], args=[rule.limit, rule.refill_per_second]
+        )
+        return bool(allowed), float(tokens)
+
+    async def clear(self) -> None:
+        async for key in self.client.scan_iter(match=self.prefix + "*"):
+            await self.client.delete(key)
+
+
+class RateLimiter:
+    """class finds rule of requested route and takes token from bucket
+    of the client. routes are given as "<METHOD> <path>", path may have
+    parameters, e.g. "GET /posts/{id}".
+    """
+
+    def __init__(self, backend, limits: Dict[str, str]):
+        self.backend = backend
+        self.enabled = True
+        self.configure(limits)
+
+    def configure(self, limits: Dict[str, str]) -> None:
+        """function replaces rules of all routes."""
+        self._exact: Dict[Tuple[str, str], Rule] = {}
+        self._patterns = []
+        for route, value in limits.items():
+            method, _, path = route.partition(" ")
+            rule = Rule.parse(route, value)
+            if "{" in path:
+                self._patterns.append((method.upper(), compile_path(path)[0], rule))
+            else:
+                self._exact[method.upper(), path] = rule
+
+    def rule(self, method: str, path: str) -> Optional[Rule]:
+        rule = self._exact.get((method, path))
+        if rule is None:
+            for pattern_method, pattern, pattern_rule in self._patterns:
+                if pattern_method == method and pattern.match(path):
+                    return pattern_rule
+        return rule
+
+    async def clear(self) -> None:
+        await self.backend.clear()
+
+
+def build_limiter() -> RateLimiter:
+    """function creates rate limiter with backend chosen by settings,
+    limiter without rules is created, when limiting is turned off.
+    """
+    if settings.rate_limit_backend == "none":
+        return RateLimiter(MemoryRateLimitBackend(0), {})
+    if settings.rate_limit_backend == "redis":
+        backend = RedisRateLimitBackend(settings.rate_limit_redis_url)
+    else:
+        backend = MemoryRateLimitBackend(settings.rate_limit_max_keys)
+    return RateLimiter(backend, settings.rate_limits)
+
+
+rate_limiter = build_limiter()
+
+
+def bearer_token(scope) -> Optional[bytes]:
+    """function returns raw bytes of bearer token, header isn't decoded."""
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.partition(b" ")
+            if scheme.lower() == b"bearer" and token:
+                return token
+            return None
+    return None
+
+
+def client_key(scope) -> str:
+    """function returns key of the client, who sent request: author of
+    verified token or IP address. claims of token, which was verified
+    recently, are found in cache of decoded tokens by digest of raw
+    header, only unknown token is decoded. claims are kept in request
+    state, so route doesn't look them up again.
+    """
+    token = bearer_token(scope)
+    if token is not None:
+        key = oauth2.decoded_tokens.key(token)
+        token_data = oauth2.decoded_tokens.get(key)
+        if token_data is None:
+            try:
+                token_data = oauth2.decode_access_token(
+                    token.decode("latin-1"), key, INVALID_TOKEN
+                )
+            except HTTPException:
+                # invalid token can't be trusted, route will reject it anyway.
+                token_data = None
+        if token_data is not None:
+            state = scope.setdefault("state", {})
+            state["token_data"] = (token.decode("latin-1"), token_data)
+            return f"author:{token_data.id}"
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+def limit_headers(rule: Rule, tokens: float) -> List[Tuple[bytes, bytes]]:
+    """function builds RateLimit-* headers: limit policy, number of
+    requests left and seconds till the bucket is full again.
+    """
+    reset = math.ceil((rule.limit - tokens) / rule.refill_per_second)
+    return [
+        *rule.headers,
+        (b"ratelimit-remaining", b"%d" % tokens),
+        (b"ratelimit-reset", b"%d" % reset),
+    ]
+
+
+class RateLimitMiddleware:
+    """class is plain ASGI middleware, requests of limited routes take
+    token from bucket of their client, requests without token get 429.
+    backend failure doesn't stop requests, they are let through.
+    """
+
+    def __init__(self, app, limiter: RateLimiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.limiter.enabled:
+            await self.app(scope, receive, send)
+            return
+        rule = self.limiter.rule(scope["method"], scope["path"])
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+        key = f"{rule.route}|{client_key(scope)}"
+        try:
+            allowed, tokens = await self.limiter.backend.take(key, rule)
+        except Exception:
+            logger.exception("rate limit backend failed, request is let through")
+            await self.app(scope, receive, send)
+            return
+        headers = limit_headers(rule, tokens)
+        if not allowed:
+            retry_after = math.ceil((1 - tokens) / rule.refill_per_second)
+            response = JSONResponse(
+                {"detail": "Too many requests!"},
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={"Retry-After": str(retry_after)},
+            )
+            response.raw_headers.extend(headers)
+            await response(scope, receive, send)
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), *headers]
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
@@ -0,0 +1,123 @@
+"""Module is responsible for issuing, rotating and revoking refresh tokens,
+which let clients get new access tokens without sending password again.
+"""
+
+import hashlib
+import secrets
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import settings
+
+
+def hash_refresh_token(refresh_token: str) -> str:
+    """function returns digest of refresh token, which is stored instead of
+    token itself. token is long random string, so fast hash is enough.
+    """
+    return hashlib.sha256(refresh_token.encode()).hexdigest()
+
+
+def new_family_id() -> str:
+    return uuid.uuid4().hex
+
+
+def issue_refresh_token(author_id: int, family_id: str, db: AsyncSession) -> str:
+    """function adds new refresh token of given family to the session
+    and returns it, caller commits the session.
+    """
+    refresh_token = secrets.token_urlsafe(32)
+    db.add(
+        models.RefreshToken(
+            token_hash=hash_refresh_token(refresh_token),
+            family_id=family_id,
+            author_id=author_id,
+            expires_at=datetime.now(timezone.utc)
+            + timedelta(days=settings.refresh_token_expire_days),
+        )
+    )
+    return refresh_token
+
+
+async def revoke_family(family_id: str, db: AsyncSession) -> None:
+    """function revokes every refresh token of the family, which wasn't
+    revoked yet, caller commits the change.
+    """
+    await db.execute(
+        update(models.RefreshToken)
+        .where(
+            models.RefreshToken.family_id == family_id,
+            models.RefreshToken.revoked_at.is_(None),
+        )
+        .values(revoked_at=func.now())
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def rotate_refresh_token(
+    refresh_token: str, db: AsyncSession
+) -> Optional[Tuple[int, str, str]]:
+    """function marks refresh token as used and issues the next token of its
+    family. author id, family id and new refresh token are returned, or None,
+    if token is unknown, expired, revoked or was already used. token, which
+    is used second time, was stolen from one of its holders, so the whole
+    family is revoked.
+    """
+    token_hash = hash_refresh_token(refresh_token)
+    # token is marked as used by the same statement, which checks it,
+    # so concurrent requests can't rotate it twice.
+    used = (
+        await db.execute(
+            update(models.RefreshToken)
+            .where(
+                models.RefreshToken.token_hash == token_hash,
+                models.RefreshToken.used_at.is_(None),
+                models.RefreshToken.revoked_at.is_(None),
+                models.RefreshToken.expires_at > func.now(),
+            )
+            .values(used_at=func.now())
+            .returning(models.RefreshToken.author_id, models.RefreshToken.family_id)
+            .execution_options(synchronize_session=False)
+        )
+    ).first()
+    if used is None:
+        # we check if rejected token was used before, reuse means theft.
+        reused_family_id = await db.scalar(
+            select(models.RefreshToken.family_id).where(
+                models.RefreshToken.token_hash == token_hash,
+                models.RefreshToken.used_at.is_not(None),
+            )
+        )
+        if reused_family_id is not None:
+            await revoke_family(reused_family_id, db)
+            await db.commit()
+        return None
+    author_id, family_id = used
+    next_refresh_token = issue_refresh_token(author_id, family_id, db)
+    await db.commit()
+    return author_id, family_id, next_refresh_token
+
+
+def remove_expired_refresh_tokens(db: Session, batch_size: int) -> int:
+    """function removes at most batch_size expired refresh tokens,
+    returns number of removed tokens.
+    """
+    expired_ids = (
+        select(models.RefreshToken.id)
+        .where(models.RefreshToken.expires_at < datetime.now(timezone.utc))
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    removed = db.execute(
+        delete(models.RefreshToken)
+        .where(models.RefreshToken.id.in_(expired_ids))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return removed
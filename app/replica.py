@@ -0,0 +1,76 @@
+"""Module is responsible for routing read-only queries to database replica,
+while keeping users, who have just written something, on primary database.
+"""
+
+import threading
+import time
+from typing import Dict
+
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import database, oauth2
+from app.config import settings
+
+
+class PrimaryPins:
+    """class remembers users, who wrote into primary database recently,
+    replica may not have their changes yet, so they read from primary.
+    pins live in memory of every worker.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pinned_until: Dict[int, float] = {}
+
+    def pin(self, user_id: int) -> None:
+        """function pins user to primary for read-your-writes window."""
+        now = time.monotonic()
+        with self._lock:
+            self._pinned_until[user_id] = now + settings.read_your_writes_seconds
+            # expired pins are dropped, when there are many of them.
+            if len(self._pinned_until) > 10_000:
+                self._pinned_until = {
+                    pinned_id: until
+                    for pinned_id, until in self._pinned_until.items()
+                    if until > now
+                }
+
+    def is_pinned(self, user_id: int) -> bool:
+        return self._pinned_until.get(user_id, 0) > time.monotonic()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pinned_until.clear()
+
+
+primary_pins = PrimaryPins()
+
+
+# Dependency
+def pin_to_primary(current_user_id: int = Depends(oauth2.get_current_user)):
+    """dependency of write endpoints, it sends following reads of
+    current user to primary database for a short window.
+    """
+    primary_pins.pin(current_user_id)
+
+
+# Dependency
+async def get_read_db(
+    current_user_id: int = Depends(oauth2.get_current_user),
+    primary_db: AsyncSession = Depends(database.get_async_db),
+):
+    """dependency of read-only endpoints, it returns replica session,
+    unless replica isn't configured or user has written recently.
+    """
+    if not database.replica_configured() or primary_pins.is_pinned(current_user_id):
+        yield primary_db
+        return
+    async with database.open_read_session() as db:
+        db.info["replica"] = True
+        yield db
+
+
+def reads_replica(db: AsyncSession) -> bool:
+    """function checks if session was opened on replica by get_read_db."""
+    return db.info.get("replica", False)
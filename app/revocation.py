@@ -0,0 +1,115 @@
+"""Module is responsible for keeping in-memory copy of revoked tokens,
+so authenticated requests don't need to query black list table.
+"""
+
+import heapq
+import threading
+import time
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from .config import settings
+
+
+# rows inserted by concurrent transactions may become visible after rows
+# with greater id, so every sync re-reads rows created within this window.
+SYNC_OVERLAP_SECONDS = 30
+
+
+class RevocationCache:
+    """class holds bounded set of revoked token ids, every entry lives until
+    expiration time of its token, after that token is rejected anyway.
+    dict lookup is already the fast path for tokens, which were never
+    revoked, so nothing is put in front of it.
+    """
+
+    def __init__(self, max_size: int, sync_seconds: float):
+        self.max_size = max_size
+        self.sync_seconds = sync_seconds
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self) -> None:
+        """function forgets every revoked token and synchronization state."""
+        with self._lock:
+            self._expires: Dict[str, float] = {}
+            self._expiry_heap: List[Tuple[float, str]] = []
+            self._high_water_mark = 0
+            self._last_sync: Optional[float] = None
+            self._incomplete_until = 0.0
+
+    def add(self, key: str, expires_at: float) -> None:
+        """function marks token as revoked until expires_at (unix time)."""
+        with self._lock:
+            self._add(key, expires_at)
+
+    def _add(self, key: str, expires_at: float) -> None:
+        if expires_at <= time.time() or key in self._expires:
+            return
+        if len(self._expires) >= self.max_size:
+            self._evict_expired()
+        if len(self._expires) >= self.max_size:
+            # cache is full of live tokens, so we drop the soonest expiring
+            # one and stop trusting negative answers until it expires.
+            dropped_expires_at, dropped_key = heapq.heappop(self._expiry_heap)
+            del self._expires[dropped_key]
+            self._incomplete_until = max(self._incomplete_until, dropped_expires_at)
+        self._expires[key] = expires_at
+        heapq.heappush(self._expiry_heap, (expires_at, key))
+
+    def _evict_expired(self) -> None:
+        now = time.time()
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            _, key = heapq.heappop(self._expiry_heap)
+            del self._expires[key]
+
+    def is_revoked(self, key: str) -> Optional[bool]:
+        """function returns True if token is revoked, False if it is not and
+        None if cache overflowed and answer must be taken from database.
+        """
+        if key in self._expires:
+            return True
+        if self._incomplete_until > time.time():
+            return None
+        return False
+
+    def needs_sync(self) -> bool:
+        """function checks if black list table must be read again."""
+        return (
+            self._last_sync is None
+            or time.monotonic() - self._last_sync >= self.sync_seconds
+        )
+
+    async def sync(self, db: AsyncSession) -> None:
+        """function loads black list rows, which were added since last sync,
+        tokens revoked by other workers become known here.
+        """
+        # expired rows are skipped, such tokens are rejected anyway.
+        statement = select(
+            models.BlackList.id, models.BlackList.jti, models.BlackList.exp
+        ).where(models.BlackList.exp > func.now())
+        if self._high_water_mark:
+            overlap = models.BlackList.created_at > func.now() - timedelta(
+                seconds=SYNC_OVERLAP_SECONDS
+            )
+            statement = statement.where(
+                or_(models.BlackList.id > self._high_water_mark, overlap)
+            )
+        result = await db.execute(statement.order_by(models.BlackList.id))
+        black_tokens = result.all()
+        with self._lock:
+            self._evict_expired()
+            for black_token in black_tokens:
+                self._add(black_token.jti, black_token.exp.timestamp())
+                self._high_water_mark = max(self._high_water_mark, black_token.id)
+            self._last_sync = time.monotonic()
+
+
+revocation_cache = RevocationCache(
+    max_size=settings.revocation_cache_size,
+    sync_seconds=settings.revocation_sync_seconds,
+)
@@ -3,20 +3,43 @@
 from fastapi import status, HTTPException, Depends, APIRouter
 from fastapi.security.oauth2 import OAuth2PasswordRequestForm
 
-from sqlalchemy.orm import Session
-from app import models, schemas, utils, oauth2, crud
-from app.database import get_db, engine
-
-models.Base.metadata.create_all(bind=engine)
+from sqlalchemy import or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models, schemas, utils, oauth2, crud, refresh_tokens
+from app.config import settings
+from app.database import get_async_db
 
 
 router = APIRouter(tags=["Authentication"])
 
 
-@router.post("/login", response_model=schemas.UserToken)
-def login(
+def password_hasher_busy_exception() -> HTTPException:
+    """function builds 503 error, which tells client when to retry,
+    if password hashing pool is saturated.
+    """
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server is busy, please try again later!",
+        headers={"Retry-After": str(settings.password_hash_retry_after_seconds)},
+    )
+
+
+async def find_author(username: str, db: AsyncSession):
+    """function returns author with given username. session is closed
+    right away, so pooled connection isn't held while password is hashed.
+    """
+    my_author = await db.scalar(
+        select(models.Author).where(models.Author.username == username)
+    )
+    await db.close()
+    return my_author
+
+
+@router.post("/login", response_model=schemas.LoginToken)
+async def login(
     author_credentials: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """login view checks if user exists in the database
     and if he/she exists than logs him/her into program
@@ -24,11 +47,7 @@ def login(
     operations.
     """
     # here we check if user exists in the database.
-    my_author = (
-        db.query(models.Author)
-        .filter(models.Author.username == author_credentials.username)
-        .first()
-    )
+    my_author = await find_author(author_credentials.username, db)
 
     # if user doesn't exist than we throw 403 error.
     if my_author is None:
@@ -36,78 +55,161 @@ def login(
             status_code=status.HTTP_403_FORBIDDEN, detail="Wrong Credentials!"
         )
 
-    # if user exists then we check if password is correct
+    # if user exists then we check if password is correct, bcrypt runs
+    # in separate process, so it doesn't hold other requests.
     # if password is incorrect than we throw 403 error
-    if not utils.verify_user_password(
-        plain_password=author_credentials.password, hashed_password=my_author.password
-    ):
+    try:
+        is_valid = await utils.verify_user_password_async(
+            plain_password=author_credentials.password,
+            hashed_password=my_author.password,
+        )
+    except utils.PasswordHasherBusy:
+        raise password_hasher_busy_exception()
+    if not is_valid:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Wrong Credentials!"
         )
     else:
         # if credentials are correct, we generate and provide JWT Token to user
-        payload_data = {"author_id": my_author.id}
+        # together with refresh token, which starts new token family.
+        family_id = refresh_tokens.new_family_id()
+        refresh_token = refresh_tokens.issue_refresh_token(my_author.id, family_id, db)
+        await db.commit()
+        payload_data = {"author_id": my_author.id, "fid": family_id}
         access_token = oauth2.create_access_token(data=payload_data)
-        return {"access_token": access_token, "token_type": "bearer"}
+        return {
+            "access_token": access_token,
+            "token_type": "bearer",
+            "refresh_token": refresh_token,
+        }
+
+
+@router.post("/token/refresh", response_model=schemas.LoginToken)
+async def refresh_access_token(
+    token_request: schemas.RefreshTokenRequest,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """refresh_access_token view gives new access token for valid refresh
+    token, so user doesn't need to log in again, when access token expires.
+    refresh token can be used only once, the next one is returned with
+    access token. if used refresh token is sent again, every token of its
+    family is revoked and user needs to log in again.
+    """
+    rotated = await refresh_tokens.rotate_refresh_token(token_request.refresh_token, db)
+    if rotated is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Invalid refresh token!"
+        )
+    author_id, family_id, refresh_token = rotated
+    payload_data = {"author_id": author_id, "fid": family_id}
+    access_token = oauth2.create_access_token(data=payload_data)
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+    }
+
+
+async def find_registered_author(username: str, email: str, db: AsyncSession):
+    """function returns username and email of author, who already has given
+    username or email, or None. session is closed right away, so pooled
+    connection isn't held while password is hashed.
+    """
+    registered = (
+        await db.execute(
+            select(models.Author.username, models.Author.email)
+            .where(
+                or_(models.Author.username == username, models.Author.email == email)
+            )
+            .limit(1)
+        )
+    ).first()
+    await db.close()
+    return registered
+
+
+async def insert_author(author_credentials: schemas.GetUser, db: AsyncSession):
+    """function saves new author into database with a single statement and
+    returns his/her id, None is returned if username or email is taken.
+    """
+    author_id = await db.scalar(
+        insert(models.Author)
+        .values(**author_credentials.dict())
+        .on_conflict_do_nothing()
+        .returning(models.Author.id)
+    )
+    await db.commit()
+    return author_id
+
+
+def author_exists_exception(detail: str) -> HTTPException:
+    """function builds 409 error, which tells that author is already registered."""
+    return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=detail)
 
 
 @router.post("/register", status_code=status.HTTP_201_CREATED)
-def register(author_credentials: schemas.GetUser, db: Session = Depends(get_db)):
+async def register(
+    author_credentials: schemas.GetUser, db: AsyncSession = Depends(get_async_db)
+):
     """register view checks if user exists in the database
     and if he/she not exists than registers him/her into program
     and gives newly generated token for executing another
     operations.
     """
-    # here we check if user exists in the database.
-    my_author = (
-        db.query(models.Author)
-        .filter(models.Author.username == author_credentials.username)
-        .first()
+    # here we check if user exists in the database, before password is
+    # hashed, so repeated registrations don't waste time on bcrypt.
+    registered = await find_registered_author(
+        author_credentials.username, author_credentials.email, db
     )
-    # if user not exists then we register him/her.
-    if my_author is None:
-        # we have to hash user password.
-        hashed_password = utils.hash_user_password(author_credentials.password)
-        author_credentials.password = hashed_password
-        # user data is already renewed with hashed password.
-        new_user = models.Author(**author_credentials.dict())
-        db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
-        # now we can access created users credentials.
-        created_author = (
-            db.query(models.Author)
-            .filter(models.Author.email == author_credentials.email)
-            .first()
-        )
-        # we generate JWT Token for user.
-        payload_data = {"author_id": created_author.id}
-        access_token = oauth2.create_access_token(data=payload_data)
-        return {"access_token": access_token, "token_type": "bearer"}
-    else:
-        # if user already exists than we raise 208 error with
+    if registered is not None:
+        # if user already exists than we raise 409 error with
         # message that user is already registered.
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail=f"User with name {my_author.username} - already exists!",
+        if registered.username == author_credentials.username:
+            detail = f"User with name {registered.username} - already exists!"
+        else:
+            detail = f"User with email {registered.email} - already exists!"
+        raise author_exists_exception(detail)
+
+    # we have to hash user password, bcrypt runs in separate process.
+    try:
+        hashed_password = await utils.hash_user_password_async(
+            author_credentials.password
         )
+    except utils.PasswordHasherBusy:
+        raise password_hasher_busy_exception()
+    author_credentials.password = hashed_password
+    # unique constraints decide, if the same user was registered
+    # meanwhile by concurrent request.
+    author_id = await insert_author(author_credentials, db)
+    if author_id is None:
+        raise author_exists_exception(
+            f"User with name {author_credentials.username} "
+            f"or email {author_credentials.email} - already exists!"
+        )
+    # we generate JWT Token for user.
+    payload_data = {"author_id": author_id}
+    access_token = oauth2.create_access_token(data=payload_data)
+    return {"access_token": access_token, "token_type": "bearer"}
 
 
 @router.get("/logout", status_code=status.HTTP_200_OK)
-def logout(
-    user_token: str = Depends(oauth2.oauth_schema),
-    db: Session = Depends(get_db),
+async def logout(
+    token_data: schemas.TokenData = Depends(oauth2.get_current_token),
+    db: AsyncSession = Depends(get_async_db),
     current_user_id: int = Depends(oauth2.get_current_user),
 ):
     """logout view is responsible for logging out users,
     user must be logged in to access this endpoint, and
-    after executing logout view, user token will be added
+    after executing logout view, user token's id will be added
     into black list, so user needs to generate another token
-    to access some login_required data, also logout view cleans
-    database from old tokens.
+    to access some login_required data. refresh tokens issued with
+    the token are revoked as well. expired tokens are removed
+    from database by background task.
     """
-    # we check database and remove old black list tokens.
-    crud.remove_old_black_tokens(db)
-    # we add logged-out user's token into blacklist table.
-    if crud.save_in_black_list(user_token=user_token, user_id=current_user_id, db=db):
+    if token_data.family is not None:
+        await refresh_tokens.revoke_family(token_data.family, db)
+    # we add logged-out user's token id into blacklist table.
+    if await crud.save_in_black_list(
+        jti=token_data.jti, exp=token_data.exp, user_id=current_user_id, db=db
+    ):
         return {"message": "You have been logged out successfully!"}
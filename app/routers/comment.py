@@ -1,36 +1,54 @@
 """Module is responsible for post's comment feature."""
 
-from fastapi import status, HTTPException, Depends, APIRouter
-from typing import List
+from fastapi import status, HTTPException, Depends, APIRouter, Query
+from fastapi.responses import ORJSONResponse
+from typing import Optional
 
-from sqlalchemy.orm import Session
-from app import models, schemas, oauth2
-from app.database import get_db, engine
-
-models.Base.metadata.create_all(bind=engine)
+from sqlalchemy import and_, join, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from app import models, schemas, oauth2, pagination, replica, serialization
+from app.cache import response_cache
+from app.export import NDJSON_MEDIA_TYPE, ndjson_response
+from app.database import get_async_db
 
 
 router = APIRouter(prefix="/posts", tags=["Comment"])
 
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
 
 @router.post(
     "/{id}/comments",
     status_code=status.HTTP_201_CREATED,
     response_model=schemas.SendComment,
+    dependencies=[Depends(replica.pin_to_primary)],
 )
-def create_comment(
+async def create_comment(
     id: int,
     comment_data: schemas.GetComment,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user_id: int = Depends(oauth2.get_current_user),
 ):
     """create_comment view is responsible for adding
     new comments to existing posts in the database.
     user must be logged in to execute this operation.
     """
-    # we check if chosen post exists and
-    # if post not exists we raise 404 error
-    chosen_post = db.query(models.Post).filter(models.Post.id == id).first()
+    # we increase comment counter of chosen post, if post not exists
+    # nothing is updated and we raise 404 error. row of post stays locked
+    # until comment is committed, so counter can't miss concurrent comments.
+    chosen_post = await db.scalar(
+        update(models.Post)
+        .where(models.Post.id == id)
+        # comment isn't modification of post, so updated_at is kept.
+        .values(
+            comment_count=models.Post.comment_count + 1,
+            updated_at=models.Post.updated_at,
+        )
+        .returning(models.Post.id)
+        .execution_options(synchronize_session=False)
+    )
     if chosen_post is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -41,31 +59,113 @@ def create_comment(
         comment=comment_data.comment, author_id=current_user_id, post_id=id
     )
     db.add(new_comment)
-    db.commit()
-    db.refresh(new_comment)
-    return new_comment
+    await db.commit()
+    await response_cache.invalidate_posts([id])
+    result = await db.execute(
+        select(models.Comment)
+        .options(selectinload(models.Comment.author))
+        .where(models.Comment.id == new_comment.id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalar_one()
 
 
-@router.get("/{id}/comments", response_model=List[schemas.SendComment])
-def get_comments(
+@router.get("/{id}/comments", response_model=schemas.CommentPage)
+async def get_comments(
     id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(replica.get_read_db),
     current_user_id: int = Depends(oauth2.get_current_user),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
 ):
     """get_comments view is responsible for returning post
-    specific comments, user must be logged in to execute
+    specific comments page by page, oldest comments come first.
+    next_cursor of the response must be passed as cursor to
+    retrieve following page. user must be logged in to execute
     this operation.
     """
+    # comments of the page are joined to chosen post, so one query
+    # also tells if post exists: no rows means there is no such post.
+    page_condition = models.Comment.post_id == models.Post.id
+    # we continue right after the last comment of previous page.
+    if cursor is not None:
+        try:
+            last_created_at, last_id = pagination.decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor!"
+            )
+        page_condition = and_(
+            page_condition,
+            tuple_(models.Comment.created_at, models.Comment.id)
+            > tuple_(last_created_at, last_id),
+        )
+    comments_with_authors = join(
+        models.Comment, models.Author, models.Comment.author_id == models.Author.id
+    )
+    # we fetch one extra row to find out if next page exists.
+    result = await db.execute(
+        select(models.Post.id, *serialization.COMMENT_EXPORT_COLUMNS)
+        .select_from(models.Post)
+        .outerjoin(comments_with_authors, page_condition)
+        .where(models.Post.id == id)
+        .order_by(models.Comment.created_at, models.Comment.id)
+        .limit(limit + 1)
+    )
+    rows = result.all()
     # we check if chosen post exists,
     # if post not exists then we raise 404 error.
-    chosen_post = db.query(models.Post).filter(models.Post.id == id).first()
-    if chosen_post is None:
+    if not rows:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Post with id {id} not exists",
         )
+    # post without (further) comments comes as one row without comment.
+    rows = [row[1:] for row in rows if row[1] is not None]
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = pagination.encode_cursor(rows[-1][2], rows[-1][0])
+    return ORJSONResponse(
+        {
+            "items": serialization.comment_rows_to_dicts(row[1:] for row in rows),
+            "next_cursor": next_cursor,
+        }
+    )
+
 
-    # if post exists then we return every comment,
-    # related to this chosen post.
-    post_comments = db.query(models.Comment).filter(models.Comment.post_id == id).all()
-    return post_comments
+@router.get(
+    "/{id}/comments/export",
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+)
+async def export_comments(
+    id: int,
+    db: AsyncSession = Depends(replica.get_read_db),
+    current_user_id: int = Depends(oauth2.get_current_user),
+    after_id: Optional[int] = Query(None, ge=0),
+):
+    """export_comments view is responsible for streaming comments of
+    chosen post as newline-delimited JSON, ordered by id. interrupted
+    export is resumed by passing id of the last received comment as after_id.
+    user must be logged in to execute this operation.
+    """
+    # we check if chosen post exists before streaming starts,
+    # afterwards status code can't be changed.
+    chosen_post = await db.scalar(select(models.Post.id).where(models.Post.id == id))
+    if chosen_post is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Post with id {id} not exists",
+        )
+    my_query = (
+        select(*serialization.COMMENT_EXPORT_COLUMNS)
+        .join(models.Comment.author)
+        .where(models.Comment.post_id == id)
+    )
+    if after_id is not None:
+        my_query = my_query.where(models.Comment.id > after_id)
+    return ndjson_response(
+        db,
+        my_query.order_by(models.Comment.id),
+        serialization.comment_rows_to_export_dicts,
+    )
@@ -0,0 +1,56 @@
+"""Module is responsible for exposing internal metrics of the application."""
+
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+
+from app import database, oauth2, tasks
+from app.config import settings
+from app.pool import pool_status
+
+
+def require_metrics_token(authorization: Optional[str] = Header(None)):
+    """function lets through requests, which carry metrics token of settings,
+    endpoint doesn't exist at all, when token isn't configured.
+    """
+    if not settings.metrics_token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    scheme, _, token = (authorization or "").partition(" ")
+    # we compare tokens in constant time, so token can't be guessed by timing.
+    if scheme.lower() != "bearer" or not secrets.compare_digest(
+        token.encode(), settings.metrics_token.encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token!",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+router = APIRouter(
+    prefix="/internal",
+    tags=["Internal"],
+    dependencies=[Depends(require_metrics_token)],
+)
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    """metrics view returns counters of background tasks and token cache
+    and state of database connection pools, it isn't part of public API,
+    so it is served only to callers, who have metrics token.
+    """
+    database.create_engines()
+    pools = {
+        "sync": pool_status(database.engine.pool),
+        "async": pool_status(database.async_engine.pool),
+    }
+    if database.replica_configured():
+        pools["replica_sync"] = pool_status(database.replica_engine.pool)
+        pools["replica_async"] = pool_status(database.async_replica_engine.pool)
+    return {
+        "blacklist_purge": tasks.purge_metrics,
+        "pool": pools,
+        "token_cache": oauth2.decoded_tokens.stats(),
+    }
@@ -1,41 +1,210 @@
 """Module is responsible for post related CRUD operation."""
 
-from fastapi import status, HTTPException, Depends, APIRouter
-from typing import List
+from fastapi import status, HTTPException, Depends, APIRouter, Header, Query, Response
+from fastapi.responses import JSONResponse, ORJSONResponse
+from typing import List, Optional, Tuple, Union
 
-from sqlalchemy.orm import Session
-from app import models, schemas, oauth2
-from app.database import get_db, engine
-
-models.Base.metadata.create_all(bind=engine)
+from pydantic import ValidationError
+from sqlalchemy import delete, false, insert, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from app import models, schemas, oauth2, pagination, replica, search, serialization
+from app.export import NDJSON_MEDIA_TYPE, ndjson_response
+from app.cache import body_etag, parse_post_etag, post_etag, response_cache
+from app.database import get_async_db
 
 
 router = APIRouter(prefix="/posts", tags=["Post"])
 
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+MAX_SEARCH_LENGTH = 200
+# search results are ranked, so they can't be paginated by keyset,
+# deep pages are limited instead.
+MAX_SEARCH_OFFSET = 1000
+
+
+async def get_post_with_author(id: int, db: AsyncSession):
+    """function returns post together with its author, or None if post
+    doesn't exist. already loaded post is refreshed from database.
+    """
+    result = await db.execute(
+        select(models.Post)
+        .options(joinedload(models.Post.author))
+        .where(models.Post.id == id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalar_one_or_none()
+
 
-@router.get("/", status_code=status.HTTP_200_OK, response_model=List[schemas.SendPost])
-def all_post(
-    db: Session = Depends(get_db),
+@router.get(
+    "/",
+    status_code=status.HTTP_200_OK,
+    response_model=Union[schemas.PostPage, schemas.PostOutPage],
+)
+async def all_post(
+    db: AsyncSession = Depends(replica.get_read_db),
     current_user_id: object = Depends(oauth2.get_current_user),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    author_id: Optional[int] = None,
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    sort: schemas.PostSort = schemas.PostSort.new,
+    with_votes: bool = False,
+    if_none_match: Optional[str] = Header(None),
+):
+    """all_post view is responsible for retrieving posts from database
+    page by page, newest or most voted posts come first. next_cursor of
+    the response must be passed as cursor to retrieve following page.
+    if with_votes is set, every post comes with its number of votes.
+    user must be logged in to execute this operation.
+    """
+    # we return serialized page from cache, if posts haven't changed
+    # since it was built.
+    cache_key = await response_cache.list_key(
+        {
+            "limit": limit,
+            "cursor": cursor,
+            "is_active": is_active,
+            "author_id": author_id,
+            "min_price": min_price,
+            "max_price": max_price,
+            "sort": sort.value,
+            "with_votes": with_votes,
+        }
+    )
+    cached = await response_cache.get(cache_key)
+    if cached is not None:
+        return cached.to_response(if_none_match)
+    # authors are joined into the same statement and plain columns are
+    # selected, page is serialized from them without ORM objects.
+    my_query = select(*serialization.POST_ROW_COLUMNS).join(models.Post.author)
+    # we apply requested filters on database side.
+    if is_active is not None:
+        my_query = my_query.where(models.Post.is_active == is_active)
+    if author_id is not None:
+        my_query = my_query.where(models.Post.author_id == author_id)
+    if min_price is not None:
+        my_query = my_query.where(models.Post.price >= min_price)
+    if max_price is not None:
+        my_query = my_query.where(models.Post.price <= max_price)
+    # we continue right after the last row of previous page,
+    # so every page costs the same index range scan.
+    if sort == schemas.PostSort.votes:
+        sort_column, decode_cursor = (
+            models.Post.vote_count,
+            pagination.decode_vote_cursor,
+        )
+    else:
+        sort_column, decode_cursor = models.Post.created_at, pagination.decode_cursor
+    if cursor is not None:
+        try:
+            last_value, last_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor!"
+            )
+        my_query = my_query.where(
+            tuple_(sort_column, models.Post.id) < tuple_(last_value, last_id)
+        )
+    # we fetch one extra row to find out if next page exists.
+    result = await db.execute(
+        my_query.order_by(sort_column.desc(), models.Post.id.desc()).limit(limit + 1)
+    )
+    rows = result.all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        if sort == schemas.PostSort.votes:
+            next_cursor = pagination.encode_vote_cursor(
+                rows[-1].vote_count, rows[-1].id
+            )
+        else:
+            next_cursor = pagination.encode_cursor(rows[-1].created_at, rows[-1].id)
+    if with_votes:
+        items = serialization.post_rows_to_out_dicts(rows)
+    else:
+        items = serialization.post_rows_to_dicts(rows)
+    body = serialization.dumps({"items": items, "next_cursor": next_cursor})
+    cached = await response_cache.set(
+        cache_key, body_etag(body), body, from_replica=replica.reads_replica(db)
+    )
+    return cached.to_response(if_none_match)
+
+
+@router.get(
+    "/search", status_code=status.HTTP_200_OK, response_model=schemas.PostSearchPage
+)
+async def search_posts(
+    q: str = Query(..., min_length=1, max_length=MAX_SEARCH_LENGTH),
+    db: AsyncSession = Depends(replica.get_read_db),
+    current_user_id: int = Depends(oauth2.get_current_user),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0, le=MAX_SEARCH_OFFSET),
+):
+    """search_posts view is responsible for finding posts, whose title or
+    description match the query, best matches come first. matched words
+    are highlighted, next_offset of the response must be passed as offset
+    to retrieve following page.
+    user must be logged in to execute this operation.
+    """
+    items, next_offset = await search.search_posts(db, q, limit, offset)
+    return ORJSONResponse({"items": items, "next_offset": next_offset})
+
+
+@router.get(
+    "/export",
+    status_code=status.HTTP_200_OK,
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+)
+async def export_posts(
+    db: AsyncSession = Depends(replica.get_read_db),
+    current_user_id: int = Depends(oauth2.get_current_user),
+    after_id: Optional[int] = Query(None, ge=0),
 ):
-    """all_post view is responsible for retrieving all posts from database,
+    """export_posts view is responsible for streaming every post as
+    newline-delimited JSON, ordered by id. interrupted export is resumed
+    by passing id of the last received post as after_id.
     user must be logged in to execute this operation.
     """
-    my_posts = db.query(models.Post).all()
-    return my_posts
+    my_query = select(*serialization.POST_ROW_COLUMNS).join(models.Post.author)
+    if after_id is not None:
+        my_query = my_query.where(models.Post.id > after_id)
+    return ndjson_response(
+        db,
+        my_query.order_by(models.Post.id),
+        serialization.post_rows_to_export_dicts,
+    )
 
 
-@router.get("/{id}", status_code=status.HTTP_200_OK, response_model=schemas.SendPost)
-def one_post(
+@router.get(
+    "/{id}",
+    status_code=status.HTTP_200_OK,
+    response_model=Union[schemas.SendPost, schemas.PostOut],
+)
+async def one_post(
     id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(replica.get_read_db),
     current_user_id: int = Depends(oauth2.get_current_user),
+    with_votes: bool = False,
+    if_none_match: Optional[str] = Header(None),
 ):
     """one_post view is responsible for retrieving
-    information about one specific post.
+    information about one specific post, together with
+    its number of votes if with_votes is set.
     user must be logged in to execute this operation.
     """
-    my_post = db.query(models.Post).filter(models.Post.id == id).first()
+    # we check if post is cached, then client which already has
+    # the same version gets 304 without loading post.
+    cache_key = await response_cache.post_key(id)
+    if with_votes:
+        cache_key += ":votes"
+    cached = await response_cache.get(cache_key)
+    if cached is not None:
+        return cached.to_response(if_none_match)
+    my_post = await get_post_with_author(id, db)
     # we check if chosen post exists, if not exists
     # we raise 404 error, but if exists then we return
     # desired information.
@@ -44,13 +213,29 @@ def one_post(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"post with id: {id}, was not found!",
         )
-    return my_post
+    if with_votes:
+        # votes don't change modification time of post,
+        # so ETag is built from the body.
+        body = schemas.PostOut(Post=my_post, votes=my_post.vote_count).json().encode()
+        etag = body_etag(body)
+    else:
+        body = schemas.SendPost.from_orm(my_post).json().encode()
+        etag = post_etag(my_post.id, my_post.updated_at, my_post.comment_count)
+    cached = await response_cache.set(
+        cache_key, etag, body, from_replica=replica.reads_replica(db), post_id=id
+    )
+    return cached.to_response(if_none_match)
 
 
-@router.post("/", status_code=status.HTTP_201_CREATED, response_model=schemas.SendPost)
-def create_post(
+@router.post(
+    "/",
+    status_code=status.HTTP_201_CREATED,
+    response_model=schemas.SendPost,
+    dependencies=[Depends(replica.pin_to_primary)],
+)
+async def create_post(
     new_post: schemas.GetPost,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user_id: int = Depends(oauth2.get_current_user),
 ):
     """create_post module is responsible for creating new posts,
@@ -58,76 +243,329 @@ def create_post(
     """
     my_post = models.Post(author_id=current_user_id, **new_post.dict())
     db.add(my_post)
-    db.commit()
-    db.refresh(my_post)
-    return my_post
+    await db.commit()
+    await response_cache.invalidate_posts()
+    return await get_post_with_author(my_post.id, db)
 
 
-@router.delete("/{id}")
-def delete_post(
-    id: int,
-    db: Session = Depends(get_db),
+async def check_bulk_ownership(
+    ids: List[int], current_user_id: int, db: AsyncSession
+) -> List[schemas.BulkItemResult]:
+    """function checks with one query that every post of the batch exists
+    and belongs to current user, it returns result of every item.
+    """
+    result = await db.execute(
+        select(models.Post.id, models.Post.author_id).where(
+            models.Post.id.in_(set(ids))
+        )
+    )
+    owners = dict(result.all())
+    results = []
+    seen_ids = set()
+    for index, id in enumerate(ids):
+        item = schemas.BulkItemResult(index=index, id=id, status=status.HTTP_200_OK)
+        # we check that post is mentioned once, exists and belongs
+        # to current user, as single post endpoints do.
+        if id in seen_ids:
+            item.status = status.HTTP_409_CONFLICT
+            item.detail = f"post with id: {id}, is repeated in the batch!"
+        elif id not in owners:
+            item.status = status.HTTP_404_NOT_FOUND
+            item.detail = f"post with id: {id}, was not found!"
+        elif owners[id] != current_user_id:
+            item.status = status.HTTP_403_FORBIDDEN
+            item.detail = "Not authorized to perform requested action!"
+        seen_ids.add(id)
+        results.append(item)
+    return results
+
+
+def bulk_failed(results: List[schemas.BulkItemResult], partial: bool) -> bool:
+    """function checks if batch must be rejected as a whole, then items
+    which were valid are marked as not applied.
+    """
+    if partial or all(item.status < 400 for item in results):
+        return False
+    for item in results:
+        if item.status < 400:
+            item.status = status.HTTP_424_FAILED_DEPENDENCY
+            item.detail = "Not applied, because other items of the batch failed!"
+    return True
+
+
+def bulk_response(
+    results: List[schemas.BulkItemResult], rejected: bool, success_status: int
+) -> JSONResponse:
+    """function returns results of every item, response status shows if
+    whole batch, part of it or nothing was applied.
+    """
+    if rejected:
+        status_code = status.HTTP_400_BAD_REQUEST
+    elif any(item.status >= 400 for item in results):
+        status_code = status.HTTP_207_MULTI_STATUS
+    else:
+        status_code = success_status
+    return JSONResponse(
+        status_code=status_code, content=schemas.BulkResult(items=results).dict()
+    )
+
+
+def parse_bulk_posts(
+    items: list,
+) -> Tuple[List[Optional[schemas.GetPost]], List[schemas.BulkItemResult]]:
+    """function validates every item of the batch as new post, it returns
+    parsed posts (None for invalid ones) and result of every item.
+    """
+    posts = []
+    results = []
+    for index, item in enumerate(items):
+        result = schemas.BulkItemResult(index=index, status=status.HTTP_201_CREATED)
+        try:
+            posts.append(schemas.GetPost.parse_obj(item))
+        except ValidationError as error:
+            posts.append(None)
+            result.status = status.HTTP_422_UNPROCESSABLE_ENTITY
+            result.detail = "; ".join(
+                f"{'.'.join(str(part) for part in problem['loc'])}: {problem['msg']}"
+                for problem in error.errors()
+            )
+        results.append(result)
+    return posts, results
+
+
+@router.post(
+    "/bulk",
+    status_code=status.HTTP_201_CREATED,
+    response_model=schemas.BulkResult,
+    dependencies=[Depends(replica.pin_to_primary)],
+)
+async def bulk_create_posts(
+    new_posts: schemas.BulkCreatePosts,
+    db: AsyncSession = Depends(get_async_db),
     current_user_id: int = Depends(oauth2.get_current_user),
+    partial: bool = False,
 ):
-    """delete_post view is responsible for deleting chosen post
-    from database, user must be logged in to execute this operation.
+    """bulk_create_posts view is responsible for creating many posts
+    by multi-row insert and one commit. batch fails as a whole if any
+    item is invalid, unless partial is set, then valid items are still
+    created.
+    user must be logged in to execute this operation.
     """
-    my_query = db.query(models.Post).filter(models.Post.id == id)
-    my_post = my_query.first()
-    # we check if chosen post exists in the database.
-    if my_post:
-        # we check if chosen post belongs to current user.
-        if my_post.author_id == current_user_id:
-            my_query.delete()
-            db.commit()
-            return {"message": f"Post with id {id}, has been deleted!"}
-        else:
-            # if chosen post doesn't belong to current user, then
-            # he/she won't be able to delete it, because we raise
-            # 403 error.
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not authorized to perform requested action!",
-            )
-    else:
+    posts, results = parse_bulk_posts(new_posts.items)
+    rejected = bulk_failed(results, partial)
+    valid = [
+        (item_result, post)
+        for item_result, post in zip(results, posts)
+        if item_result.status < 400
+    ]
+    if not rejected and valid:
+        result = await db.execute(
+            insert(models.Post).returning(models.Post.id, sort_by_parameter_order=True),
+            [{"author_id": current_user_id, **post.dict()} for _, post in valid],
+        )
+        for (item_result, _), id in zip(valid, result.scalars().all()):
+            item_result.id = id
+        await db.commit()
+        await response_cache.invalidate_posts()
+    return bulk_response(results, rejected, status.HTTP_201_CREATED)
+
+
+@router.patch(
+    "/bulk",
+    response_model=schemas.BulkResult,
+    dependencies=[Depends(replica.pin_to_primary)],
+)
+async def bulk_update_posts(
+    updates: schemas.BulkPatchPosts,
+    db: AsyncSession = Depends(get_async_db),
+    current_user_id: int = Depends(oauth2.get_current_user),
+    partial: bool = False,
+):
+    """bulk_update_posts view is responsible for modifying given fields of
+    many posts at once. batch fails as a whole if any post can't be modified,
+    unless partial is set, then valid items are still applied.
+    user must be logged in to execute this operation.
+    """
+    results = await check_bulk_ownership(
+        [item.id for item in updates.items], current_user_id, db
+    )
+    rejected = bulk_failed(results, partial)
+    values = [
+        {"id": item.id, **item.dict(exclude_unset=True, exclude={"id"})}
+        for item, item_result in zip(updates.items, results)
+        if item_result.status < 400
+    ]
+    if not rejected and values:
+        # posts are updated by primary key with executemany.
+        await db.execute(update(models.Post), values)
+        await db.commit()
+        await response_cache.invalidate_posts([value["id"] for value in values])
+    return bulk_response(results, rejected, status.HTTP_200_OK)
+
+
+@router.delete(
+    "/bulk",
+    response_model=schemas.BulkResult,
+    dependencies=[Depends(replica.pin_to_primary)],
+)
+async def bulk_delete_posts(
+    deletes: schemas.BulkDeletePosts,
+    db: AsyncSession = Depends(get_async_db),
+    current_user_id: int = Depends(oauth2.get_current_user),
+    partial: bool = False,
+):
+    """bulk_delete_posts view is responsible for deleting many posts by one
+    statement. batch fails as a whole if any post can't be deleted,
+    unless partial is set, then valid items are still applied.
+    user must be logged in to execute this operation.
+    """
+    results = await check_bulk_ownership(deletes.ids, current_user_id, db)
+    rejected = bulk_failed(results, partial)
+    ids = [item.id for item in results if item.status < 400]
+    if not rejected and ids:
+        await db.execute(delete(models.Post).where(models.Post.id.in_(ids)))
+        await db.commit()
+        await response_cache.invalidate_posts(ids)
+    return bulk_response(results, rejected, status.HTTP_200_OK)
+
+
+def if_match_condition(id: int, if_match: Optional[str]):
+    """function turns If-Match header into condition on post modification
+    time, so write is applied only to the version client has seen.
+    comments aren't modifications of post, so their number, which is part
+    of ETag too, doesn't make write fail.
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    versions = []
+    for etag in if_match.split(","):
+        version = parse_post_etag(etag)
+        if version is not None and version[0] == id:
+            versions.append(version[1])
+    if not versions:
+        # none of given ETags belongs to this post.
+        return false()
+    return models.Post.updated_at.in_(versions)
+
+
+async def raise_write_miss(id: int, current_user_id: int, db: AsyncSession):
+    """function finds out why conditional write didn't match any row,
+    it is called only when update or delete failed.
+    """
+    my_post = await db.execute(
+        select(models.Post.author_id).where(models.Post.id == id)
+    )
+    author_id = my_post.scalar_one_or_none()
+    if author_id is None:
         # if chosen post not exists, then we will raise 404 error.
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"post with id: {id}, was not found!",
         )
+    if author_id != current_user_id:
+        # if chosen post doesn't belong to current user, then
+        # he/she won't be able to modify it, because we raise
+        # 403 error.
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to perform requested action!",
+        )
+    # otherwise post was modified since client has seen it.
+    raise HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        detail=f"post with id: {id}, has been modified!",
+    )
 
 
-@router.put("/{id}", response_model=schemas.SendPost)
-def put_post(
+@router.delete("/{id}", dependencies=[Depends(replica.pin_to_primary)])
+async def delete_post(
+    id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user_id: int = Depends(oauth2.get_current_user),
+    if_match: Optional[str] = Header(None),
+):
+    """delete_post view is responsible for deleting chosen post
+    from database, user must be logged in to execute this operation.
+    if If-Match header is sent, post is deleted only if it wasn't
+    modified since client received given ETag.
+    """
+    # ownership is checked by the same statement, which deletes post,
+    # so nobody can change post between check and write.
+    my_query = delete(models.Post).where(
+        models.Post.id == id, models.Post.author_id == current_user_id
+    )
+    condition = if_match_condition(id, if_match)
+    if condition is not None:
+        my_query = my_query.where(condition)
+    result = await db.execute(my_query.returning(models.Post.id))
+    if result.scalar_one_or_none() is None:
+        await raise_write_miss(id, current_user_id, db)
+    await db.commit()
+    await response_cache.invalidate_posts([id])
+    return {"message": f"Post with id {id}, has been deleted!"}
+
+
+@router.put(
+    "/{id}",
+    response_model=schemas.SendPost,
+    dependencies=[Depends(replica.pin_to_primary)],
+)
+async def put_post(
     id: int,
     update_post: schemas.GetPost,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     current_user_id: int = Depends(oauth2.get_current_user),
+    if_match: Optional[str] = Header(None),
 ):
     """put_post view is responsible for updating existing post
     in the database, user must be logged in to execute this operation.
+    if If-Match header is sent, post is updated only if it wasn't
+    modified since client received given ETag.
     """
-    my_query = db.query(models.Post).filter(models.Post.id == id)
-    my_post = my_query.first()
-    # we check if chosen post exists in the database.
-    if my_post:
-        # we check if chosen post belongs to current user.
-        if my_post.author_id == current_user_id:
-            my_query.update(update_post.dict(), synchronize_session=False)
-            db.commit()
-            db.refresh(my_post)
-            return my_post
-        else:
-            # if chosen post doesn't belong to current user, then we will
-            # raise 403 error and he/she won't be able to modify it.
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not authorized to perform requested action!",
-            )
-    else:
-        # if chosen post not exists in the database, then we will
-        # raise 404 error.
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"post with id: {id}, was not found!",
+    # ownership is checked by the same statement, which updates post,
+    # updated post and its author, joined by FROM, are returned by it too.
+    # statement is executed as core one, ORM can't return other table.
+    my_query = (
+        update(models.Post.__table__)
+        .where(
+            models.Post.id == id,
+            models.Post.author_id == current_user_id,
+            models.Author.id == models.Post.author_id,
         )
+        .values(**update_post.dict())
+    )
+    condition = if_match_condition(id, if_match)
+    if condition is not None:
+        my_query = my_query.where(condition)
+    result = await db.execute(
+        my_query.returning(
+            models.Post.title,
+            models.Post.description,
+            models.Post.price,
+            models.Post.is_active,
+            models.Post.created_at,
+            models.Post.updated_at,
+            models.Post.comment_count,
+            models.Author.username,
+            models.Author.email,
+        )
+    )
+    my_post = result.one_or_none()
+    if my_post is None:
+        await raise_write_miss(id, current_user_id, db)
+    await db.commit()
+    await response_cache.invalidate_posts([id])
+    response.headers["ETag"] = post_etag(id, my_post.updated_at, my_post.comment_count)
+    return schemas.SendPost(
+        title=my_post.title,
+        description=my_post.description,
+        price=my_post.price,
+        is_active=my_post.is_active,
+        created_at=my_post.created_at,
+        updated_at=my_post.updated_at,
+        comment_count=my_post.comment_count,
+        author=schemas.SendUser(
+            username=my_post.username, email=my_post.email, id=current_user_id
+        ),
+    )
@@ -2,24 +2,21 @@
 
 from fastapi import status, HTTPException, Depends, APIRouter
 
-from sqlalchemy.orm import Session
-from app import models, schemas, oauth2
-from app.database import get_db, engine
-
-models.Base.metadata.create_all(bind=engine)
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models, schemas, oauth2, replica
 
 
 router = APIRouter(tags=["User"])
 
 
 @router.get("/users/{id}", response_model=schemas.SendUser)
-def get_user(
+async def get_user(
     id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(replica.get_read_db),
     current_user_id: int = Depends(oauth2.get_current_user),
 ):
     """get_user view is responsible for retrieving user specific information."""
-    my_user = db.query(models.Author).filter(models.Author.id == id).first()
+    my_user = await db.get(models.Author, id)
     # we check if user exists in the database,
     # if exists, we return user information,
     # if not exists, we raise 404 error.
@@ -0,0 +1,112 @@
+"""Module is responsible for post voting feature."""
+
+from fastapi import status, HTTPException, Depends, APIRouter
+
+from sqlalchemy import delete, literal, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models, schemas, oauth2, replica
+from app.cache import response_cache
+from app.database import get_async_db
+
+
+router = APIRouter(prefix="/posts", tags=["Vote"])
+
+
+async def change_vote_count(id: int, change: int, db: AsyncSession) -> int:
+    """function changes denormalized vote counter of post in the same
+    transaction as vote itself and returns new value of the counter.
+    """
+    result = await db.execute(
+        update(models.Post)
+        .where(models.Post.id == id)
+        # vote isn't modification of post, so updated_at is kept.
+        .values(
+            vote_count=models.Post.vote_count + change,
+            updated_at=models.Post.updated_at,
+        )
+        .returning(models.Post.vote_count)
+        .execution_options(synchronize_session=False)
+    )
+    return result.scalar_one()
+
+
+async def current_vote_count(id: int, db: AsyncSession) -> int:
+    """function returns vote counter of post, 404 error is raised
+    if post doesn't exist.
+    """
+    vote_count = await db.scalar(
+        select(models.Post.vote_count).where(models.Post.id == id)
+    )
+    if vote_count is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"post with id: {id}, was not found!",
+        )
+    return vote_count
+
+
+@router.post(
+    "/{id}/vote",
+    response_model=schemas.VoteResult,
+    dependencies=[Depends(replica.pin_to_primary)],
+)
+async def vote(
+    id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user_id: int = Depends(oauth2.get_current_user),
+):
+    """vote view is responsible for adding vote of current user to post,
+    voting for the same post again changes nothing.
+    user must be logged in to execute this operation.
+    """
+    # vote is inserted only if post exists and user hasn't voted yet.
+    result = await db.execute(
+        insert(models.Vote)
+        .from_select(
+            ["author_id", "post_id"],
+            select(literal(current_user_id), models.Post.id).where(
+                models.Post.id == id
+            ),
+        )
+        .on_conflict_do_nothing()
+        .returning(models.Vote.post_id)
+    )
+    if result.scalar_one_or_none() is None:
+        # we check if post exists, if it does, user has already voted.
+        return {"post_id": id, "votes": await current_vote_count(id, db), "voted": True}
+    vote_count = await change_vote_count(id, 1, db)
+    await db.commit()
+    await response_cache.invalidate_posts([id])
+    return {"post_id": id, "votes": vote_count, "voted": True}
+
+
+@router.delete(
+    "/{id}/vote",
+    response_model=schemas.VoteResult,
+    dependencies=[Depends(replica.pin_to_primary)],
+)
+async def unvote(
+    id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user_id: int = Depends(oauth2.get_current_user),
+):
+    """unvote view is responsible for removing vote of current user from
+    post, removing vote, which doesn't exist, changes nothing.
+    user must be logged in to execute this operation.
+    """
+    result = await db.execute(
+        delete(models.Vote)
+        .where(models.Vote.author_id == current_user_id, models.Vote.post_id == id)
+        .returning(models.Vote.post_id)
+    )
+    if result.scalar_one_or_none() is None:
+        return {
+            "post_id": id,
+            "votes": await current_vote_count(id, db),
+            "voted": False,
+        }
+    vote_count = await change_vote_count(id, -1, db)
+    await db.commit()
+    await response_cache.invalidate_posts([id])
+    return {"post_id": id, "votes": vote_count, "voted": False}
@@ -1,21 +1,36 @@
 """Module is responsible for creating pydantic models."""
 
-from pydantic import BaseModel, EmailStr, validator, ValidationError
+from pydantic import BaseModel, EmailStr, conlist, validator, ValidationError
 from datetime import datetime
-from typing import Optional
+from enum import Enum
+from typing import Any, List, Optional
+
+from .config import settings
 
 
 # Token data related pydantic model.
 class TokenData(BaseModel):
     id: Optional[str] = None
+    jti: Optional[str] = None
+    exp: Optional[datetime] = None
+    # id of refresh token family, which token was issued with.
+    family: Optional[str] = None
 
 
-# User token related pydantic model.
+# User token related pydantic models.
 class UserToken(BaseModel):
     access_token: str
     token_type: str
 
 
+class LoginToken(UserToken):
+    refresh_token: str
+
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
+
+
 # User related pydantic models.
 class BaseUser(BaseModel):
     username: str
@@ -78,12 +93,82 @@ class GetPost(BasePost):
 class SendPost(BasePost):
     created_at: datetime
     updated_at: datetime
+    comment_count: int = 0
     author: SendUser
 
     class Config:
         orm_mode = True
 
 
+class PostSort(str, Enum):
+    new = "new"
+    votes = "votes"
+
+
+class PostPage(BaseModel):
+    items: List[SendPost]
+    next_cursor: Optional[str] = None
+
+
+# Post search related pydantic models.
+class PostHighlight(BaseModel):
+    title: str
+    description: str
+
+
+class PostSearchHit(SendPost):
+    id: int
+    rank: float
+    highlight: PostHighlight
+
+
+class PostSearchPage(BaseModel):
+    items: List[PostSearchHit]
+    next_offset: Optional[int] = None
+
+
+# Bulk post operation related pydantic models.
+class PatchPost(BasePost):
+    id: int
+    title: Optional[str] = None
+    description: Optional[str] = None
+    price: Optional[float] = None
+    is_active: Optional[bool] = None
+
+    # field, which isn't given, stays unchanged, but no field can be set
+    # to null, so validators of BasePost never get None.
+    @validator("title", "description", "price", "is_active", pre=True)
+    def field_must_not_be_null(cls, value, field):
+        if value is None:
+            raise ValueError(f"{field.name} can't be null!")
+        return value
+
+
+class BulkCreatePosts(BaseModel):
+    # every item is validated as GetPost by the view, so invalid item
+    # fails alone instead of the whole batch.
+    items: conlist(Any, min_items=1, max_items=settings.bulk_max_items)
+
+
+class BulkPatchPosts(BaseModel):
+    items: conlist(PatchPost, min_items=1, max_items=settings.bulk_max_items)
+
+
+class BulkDeletePosts(BaseModel):
+    ids: conlist(int, min_items=1, max_items=settings.bulk_max_items)
+
+
+class BulkItemResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    status: int
+    detail: Optional[str] = None
+
+
+class BulkResult(BaseModel):
+    items: List[BulkItemResult]
+
+
 class PostOut(BaseModel):
     Post: SendPost
     votes: int
@@ -92,6 +177,18 @@ class PostOut(BaseModel):
         orm_mode = True
 
 
+class PostOutPage(BaseModel):
+    items: List[PostOut]
+    next_cursor: Optional[str] = None
+
+
+# Vote related pydantic model.
+class VoteResult(BaseModel):
+    post_id: int
+    votes: int
+    voted: bool
+
+
 # Comment related pydantic models.
 class BaseComment(BaseModel):
     comment: str
@@ -115,6 +212,11 @@ class SendComment(BaseComment):
         orm_mode = True
 
 
+class CommentPage(BaseModel):
+    items: List[SendComment]
+    next_cursor: Optional[str] = None
+
+
 # User logout related pydantic model
 class UserLogout(BaseModel):
     username: str
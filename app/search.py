@@ -0,0 +1,119 @@
+"""Module is responsible for full-text search over posts, PostgreSQL
+tsvector index is used in production and SQLite FTS5 table elsewhere.
+"""
+
+import html
+
+from sqlalchemy import column, func, literal_column, select, table
+from sqlalchemy.sql import Select
+
+from app import models, serialization
+
+
+HIGHLIGHT_START = "<b>"
+HIGHLIGHT_STOP = "</b>"
+# database marks matched words with control characters, which aren't
+# HTML, so highlighted text is escaped first and marks become tags after.
+START_MARK = "\x02"
+STOP_MARK = "\x03"
+
+
+def without_marks(text_column):
+    """function removes mark characters from text, which is highlighted,
+    so user can't open or close highlight on his/her own.
+    """
+    return func.translate(text_column, START_MARK + STOP_MARK, "")
+
+
+def highlight_html(fragment: str) -> str:
+    """function escapes highlighted fragment and turns marks into tags."""
+    return (
+        html.escape(fragment)
+        .replace(START_MARK, HIGHLIGHT_START)
+        .replace(STOP_MARK, HIGHLIGHT_STOP)
+    )
+
+
+def postgresql_search_query(q: str) -> Select:
+    """function builds ranked search query over generated tsvector column."""
+    search_vector = literal_column("posts.search_vector")
+    ts_query = func.websearch_to_tsquery("english", q)
+    rank = func.ts_rank_cd(search_vector, ts_query)
+    options = f"StartSel={START_MARK}, StopSel={STOP_MARK}"
+    return (
+        select(
+            *serialization.POST_ROW_COLUMNS,
+            rank.label("rank"),
+            func.ts_headline(
+                "english",
+                without_marks(models.Post.title),
+                ts_query,
+                options + ", HighlightAll=true",
+            ),
+            func.ts_headline(
+                "english", without_marks(models.Post.description), ts_query, options
+            ),
+        )
+        .join(models.Post.author)
+        .where(search_vector.op("@@")(ts_query))
+        .order_by(rank.desc(), models.Post.id.desc())
+    )
+
+
+def sqlite_match_expression(q: str) -> str:
+    """function turns user input into FTS5 query, every word is quoted,
+    so operators and special characters are searched as plain text.
+    """
+    return " ".join('"' + word.replace('"', '""') + '"' for word in q.split())
+
+
+def sqlite_search_query(q: str) -> Select:
+    """function builds ranked search query over FTS5 table."""
+    posts_fts_table = table("posts_fts", column("rowid"))
+    # FTS5 functions take table name itself as the first argument.
+    posts_fts = literal_column("posts_fts")
+    # bm25 returns lower values for better matches, title weighs more.
+    rank = -func.bm25(posts_fts, 10.0, 1.0)
+    # FTS5 highlights indexed text as is, mark characters in it can only
+    # add highlight tags, text itself is still escaped.
+    return (
+        select(
+            *serialization.POST_ROW_COLUMNS,
+            rank.label("rank"),
+            func.highlight(posts_fts, 0, START_MARK, STOP_MARK),
+            func.highlight(posts_fts, 1, START_MARK, STOP_MARK),
+        )
+        .select_from(posts_fts_table)
+        .join(models.Post, models.Post.id == posts_fts_table.c.rowid)
+        .join(models.Post.author)
+        .where(posts_fts.op("MATCH")(sqlite_match_expression(q)))
+        .order_by(rank.desc(), models.Post.id.desc())
+    )
+
+
+def search_query(q: str, dialect_name: str) -> Select:
+    """function builds search query for database of given dialect."""
+    if dialect_name == "sqlite":
+        return sqlite_search_query(q)
+    return postgresql_search_query(q)
+
+
+async def search_posts(db, q: str, limit: int, offset: int):
+    """function returns one page of search hits, best matches come first,
+    and offset of the next page or None if it is the last one.
+    """
+    statement = search_query(q, db.get_bind().dialect.name)
+    # we fetch one extra row to find out if next page exists.
+    result = await db.execute(statement.limit(limit + 1).offset(offset))
+    rows = result.all()
+    next_offset = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_offset = offset + limit
+    items = serialization.search_rows_to_dicts(rows)
+    for item in items:
+        item["highlight"] = {
+            name: highlight_html(fragment)
+            for name, fragment in item["highlight"].items()
+        }
+    return items, next_offset
@@ -0,0 +1,131 @@
+"""Module is responsible for serializing large list responses straight from
+column tuples, without building ORM objects and pydantic models for them.
+"""
+
+from typing import Iterable, List, Sequence
+
+import orjson
+
+from app import models
+
+
+# columns of SendPost in the order of its fields, post id and vote count
+# are selected in front of them for keyset pagination and PostOut.
+POST_ROW_COLUMNS = (
+    models.Post.id,
+    models.Post.vote_count,
+    models.Post.title,
+    models.Post.description,
+    models.Post.price,
+    models.Post.is_active,
+    models.Post.created_at,
+    models.Post.updated_at,
+    models.Post.comment_count,
+    models.Author.username,
+    models.Author.email,
+    models.Author.id,
+)
+
+# columns of SendComment in the order of its fields.
+COMMENT_ROW_COLUMNS = (
+    models.Comment.comment,
+    models.Comment.created_at,
+    models.Author.username,
+    models.Author.email,
+    models.Author.id,
+)
+
+# comment id is selected in front of SendComment columns for keyset
+# pagination and export.
+COMMENT_EXPORT_COLUMNS = (models.Comment.id, *COMMENT_ROW_COLUMNS)
+
+
+def post_rows_to_dicts(rows: Sequence[tuple]) -> List[dict]:
+    """function turns rows of POST_ROW_COLUMNS into SendPost shaped dicts."""
+    return [
+        {
+            "title": title,
+            "description": description,
+            "price": price,
+            "is_active": is_active,
+            "created_at": created_at,
+            "updated_at": updated_at,
+            "comment_count": comment_count,
+            "author": {"username": username, "email": email, "id": author_id},
+        }
+        for (
+            _,
+            _,
+            title,
+            description,
+            price,
+            is_active,
+            created_at,
+            updated_at,
+            comment_count,
+            username,
+            email,
+            author_id,
+        ) in rows
+    ]
+
+
+def post_rows_to_out_dicts(rows: Sequence[tuple]) -> List[dict]:
+    """function turns rows of POST_ROW_COLUMNS into PostOut shaped dicts."""
+    return [
+        {"Post": post, "votes": row[1]}
+        for row, post in zip(rows, post_rows_to_dicts(rows))
+    ]
+
+
+def search_rows_to_dicts(rows: Sequence[tuple]) -> List[dict]:
+    """function turns rows of POST_ROW_COLUMNS followed by rank and
+    highlighted title and description into PostSearchHit shaped dicts.
+    """
+    width = len(POST_ROW_COLUMNS)
+    return [
+        {
+            "id": row[0],
+            **post,
+            "rank": row[width],
+            "highlight": {"title": row[width + 1], "description": row[width + 2]},
+        }
+        for row, post in zip(rows, post_rows_to_dicts([row[:width] for row in rows]))
+    ]
+
+
+def comment_rows_to_dicts(rows: Iterable[tuple]) -> List[dict]:
+    """function turns rows of COMMENT_ROW_COLUMNS into SendComment shaped dicts."""
+    return [
+        {
+            "comment": comment,
+            "created_at": created_at,
+            "author": {"username": username, "email": email, "id": author_id},
+        }
+        for comment, created_at, username, email, author_id in rows
+    ]
+
+
+def post_rows_to_export_dicts(rows: Sequence[tuple]) -> List[dict]:
+    """function turns rows of POST_ROW_COLUMNS into exported posts, they
+    have id, so client can resume interrupted export after the last one.
+    """
+    return [{"id": row[0], **post} for row, post in zip(rows, post_rows_to_dicts(rows))]
+
+
+def comment_rows_to_export_dicts(rows: Sequence[tuple]) -> List[dict]:
+    """function turns rows of COMMENT_EXPORT_COLUMNS into exported comments."""
+    return [
+        {"id": row[0], **comment}
+        for row, comment in zip(rows, comment_rows_to_dicts(row[1:] for row in rows))
+    ]
+
+
+def dumps(content) -> bytes:
+    """function encodes content the same way ORJSONResponse does."""
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def dumps_lines(items: Sequence[dict]) -> bytes:
+    """function encodes items as newline-delimited JSON."""
+    return b"".join(dumps(item) + b"\n" for item in items)
@@ -0,0 +1,84 @@
+"""Module is responsible for background maintenance tasks,
+which run alongside the application.
+"""
+
+import asyncio
+import logging
+import time
+
+from fastapi.concurrency import run_in_threadpool
+
+from app import crud, database, refresh_tokens
+from app.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+purge_metrics = {
+    "runs": 0,
+    "rows_purged": 0,
+    "last_rows_purged": 0,
+    "last_duration_seconds": 0.0,
+    "backlog": 0,
+}
+
+
+def purge_black_list(session_factory=None) -> int:
+    """function removes expired tokens from black list table in batches,
+    every batch is committed separately, so row locks are held shortly.
+    application sessions are used, unless other session factory is given.
+    returns number of removed tokens.
+    """
+    if session_factory is None:
+        database.create_engines()
+        session_factory = database.SessionLocal
+    batch_size = settings.blacklist_purge_batch_size
+    started = time.perf_counter()
+    removed = 0
+    with session_factory() as db:
+        for _ in range(settings.blacklist_purge_max_batches):
+            batch_removed = crud.remove_old_black_tokens(db, batch_size)
+            removed += batch_removed
+            if batch_removed < batch_size:
+                break
+        backlog = crud.count_old_black_tokens(db)
+    purge_metrics["runs"] += 1
+    purge_metrics["rows_purged"] += removed
+    purge_metrics["last_rows_purged"] = removed
+    purge_metrics["last_duration_seconds"] = time.perf_counter() - started
+    purge_metrics["backlog"] = backlog
+    return removed
+
+
+def purge_refresh_tokens(session_factory=None) -> int:
+    """function removes expired refresh tokens in batches of the same size,
+    as black list purge uses. returns number of removed tokens.
+    """
+    if session_factory is None:
+        database.create_engines()
+        session_factory = database.SessionLocal
+    batch_size = settings.blacklist_purge_batch_size
+    removed = 0
+    with session_factory() as db:
+        for _ in range(settings.blacklist_purge_max_batches):
+            batch_removed = refresh_tokens.remove_expired_refresh_tokens(db, batch_size)
+            removed += batch_removed
+            if batch_removed < batch_size:
+                break
+    return removed
+
+
+async def purge_black_list_periodically() -> None:
+    """function runs black list and refresh tokens purge every purge
+    interval, until cancelled.
+    """
+    while True:
+        await asyncio.sleep(settings.blacklist_purge_interval_seconds)
+        try:
+            await run_in_threadpool(purge_black_list)
+        except Exception:
+            logger.exception("black list purge failed")
+        try:
+            await run_in_threadpool(purge_refresh_tokens)
+        except Exception:
+            logger.exception("refresh tokens purge failed")
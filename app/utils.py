@@ -1,18 +1,94 @@
 """Module is responsible for hashing and verifying user's password."""
 
-from passlib.context import CryptContext
+import asyncio
+import functools
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
 
+from app.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+@functools.lru_cache(maxsize=None)
+def password_context():
+    """function creates bcrypt context on first use, so passlib is loaded
+    only by processes, which really hash or verify passwords.
+    """
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 def hash_user_password(password: str) -> str:
     """function is responsible for hashing user password."""
-    return pwd_context.hash(password)
+    return password_context().hash(password)
 
 
 def verify_user_password(plain_password: str, hashed_password: str) -> bool:
     """function is responsible for verifying, if hashed version of user input
     password is correct.
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_context().verify(plain_password, hashed_password)
+
+
+class PasswordHasherBusy(Exception):
+    """exception is raised when too many passwords are already waiting
+    to be hashed or verified.
+    """
+
+
+_password_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_pending = 0
+
+
+def _get_password_pool() -> ProcessPoolExecutor:
+    global _password_pool
+    with _pool_lock:
+        if _password_pool is None:
+            # workers are spawned, not forked, so they don't inherit
+            # database connections of the application process.
+            _password_pool = ProcessPoolExecutor(
+                max_workers=settings.password_hash_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _password_pool
+
+
+async def _run_in_password_pool(function, *args):
+    """function runs bcrypt related function in dedicated process pool,
+    PasswordHasherBusy is raised instead of queueing without limit.
+    """
+    global _pending
+    with _pool_lock:
+        if _pending >= settings.password_hash_max_pending:
+            raise PasswordHasherBusy()
+        _pending += 1
+    try:
+        future = _get_password_pool().submit(function, *args)
+        return await asyncio.wrap_future(future)
+    finally:
+        with _pool_lock:
+            _pending -= 1
+
+
+async def hash_user_password_async(password: str) -> str:
+    """function hashes user password without blocking event loop."""
+    return await _run_in_password_pool(hash_user_password, password)
+
+
+async def verify_user_password_async(plain_password: str, hashed_password: str) -> bool:
+    """function verifies user password without blocking event loop."""
+    return await _run_in_password_pool(
+        verify_user_password, plain_password, hashed_password
+    )
+
+
+def shutdown_password_pool() -> None:
+    """function stops worker processes of password pool."""
+    global _password_pool
+    with _pool_lock:
+        if _password_pool is not None:
+            _password_pool.shutdown(wait=True, cancel_futures=True)
+            _password_pool = None
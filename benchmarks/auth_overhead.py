@@ -0,0 +1,45 @@
+"""Module is responsible for measuring per-request cost of access token
+verification with and without cache of decoded tokens:
+
+    python -m benchmarks.auth_overhead --requests 100000
+
+Result is printed as JSON, so runs on two commits can be compared.
+"""
+
+import argparse
+import json
+import time
+
+from fastapi import HTTPException, status
+
+from app import oauth2
+
+
+def measure(requests: int) -> dict:
+    token = oauth2.create_access_token({"author_id": 1})
+    credential_exception = HTTPException(status_code=status.HTTP_403_FORBIDDEN)
+    result = {"requests": requests}
+    # cache of size 0 keeps nothing, so every token is decoded and verified.
+    for name, max_size in (("uncached", 0), ("cached", 1)):
+        oauth2.decoded_tokens = oauth2.DecodedTokens(max_size=max_size)
+        started = time.perf_counter()
+        for _ in range(requests):
+            oauth2.verify_access_token(token, credential_exception)
+        seconds = time.perf_counter() - started
+        result[f"{name}_us_per_request"] = round(seconds / requests * 1_000_000, 2)
+        result[f"{name}_stats"] = oauth2.decoded_tokens.stats()
+    result["speedup"] = round(
+        result["uncached_us_per_request"] / result["cached_us_per_request"], 1
+    )
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100_000)
+    args = parser.parse_args()
+    print(json.dumps(measure(args.requests), indent=2))
+
+
+if __name__ == "__main__":
+    main()
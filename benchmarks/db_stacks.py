@@ -0,0 +1,102 @@
+"""Module is responsible for comparing throughput of GET /posts/ on
+async database stack (AsyncSession + asyncpg) and on sync session,
+which is used from threadpool.
+
+Application runs in the same process, database from .env is used:
+
+    python -m benchmarks.db_stacks --concurrency 200 --duration 10
+
+Result is printed as JSON, so runs on two commits can be compared.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+import httpx
+
+from app.cache import NullCacheBackend, response_cache
+from app.config import settings
+from app.main import app
+from app.rate_limit import rate_limiter
+from benchmarks.login_storm import read_posts, summary
+
+
+async def measure_stack(token: str, concurrency: int, duration: float) -> dict:
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(
+        app=app, base_url="http://benchmark", limits=limits, timeout=120
+    ) as client:
+        deadline = time.perf_counter() + duration
+        results = await asyncio.gather(
+            *(read_posts(client, token, deadline) for _ in range(concurrency))
+        )
+    latencies = [latency for result in results for latency in result]
+    return {**summary(latencies), "rps": round(len(latencies) / duration, 1)}
+
+
+async def measure(
+    concurrency: int,
+    duration: float,
+    rate_limits: bool = False,
+    cached: bool = False,
+) -> dict:
+    # all requests come from one author, so rate limits are turned off,
+    # unless they are measured too. repeated pages would be served from
+    # response cache without database, so it is turned off too.
+    limiter_enabled = rate_limiter.enabled
+    cache_backend = response_cache.backend
+    rate_limiter.enabled = rate_limits
+    if not cached:
+        response_cache.backend = NullCacheBackend()
+    try:
+        return await measure_stacks(concurrency, duration)
+    finally:
+        rate_limiter.enabled = limiter_enabled
+        response_cache.backend = cache_backend
+
+
+async def measure_stacks(concurrency: int, duration: float) -> dict:
+    username = f"bench-{uuid.uuid4().hex[:8]}"
+    async with httpx.AsyncClient(app=app, base_url="http://benchmark") as client:
+        response = await client.post(
+            "/register",
+            json={
+                "username": username,
+                "email": f"{username}@bench.com",
+                "password": "bench",
+            },
+        )
+        response.raise_for_status()
+        token = response.json()["access_token"]
+
+    results = {}
+    for stack, db_async in (("threadpool", False), ("async", True)):
+        settings.db_async = db_async
+        results[stack] = await measure_stack(token, concurrency, duration)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument(
+        "--rate-limits", action="store_true", help="keep rate limits turned on"
+    )
+    parser.add_argument(
+        "--response-cache",
+        action="store_true",
+        help="keep response cache turned on",
+    )
+    args = parser.parse_args()
+    result = asyncio.run(
+        measure(args.concurrency, args.duration, args.rate_limits, args.response_cache)
+    )
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Module is responsible for measuring latency of GET /posts/ while
+many clients are logging in at the same time.
+
+Server must be started separately, all requests come from one client,
+so its rate limits are turned off, response cache is turned off too,
+otherwise GET /posts/ wouldn't reach database, e.g.:
+
+    RATE_LIMIT_BACKEND=none RESPONSE_CACHE_BACKEND=none uvicorn app.main:app --workers 1
+    python -m benchmarks.login_storm --base-url http://127.0.0.1:8000
+
+Result is printed as JSON, so runs on two commits can be compared.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+import httpx
+
+
+def percentile(values: list, percent: float) -> float:
+    """function returns given percentile of measured values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summary(latencies: list) -> dict:
+    return {
+        "requests": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def check_not_limited(response: httpx.Response) -> None:
+    """function stops benchmark, which would measure rate limiter
+    instead of the application.
+    """
+    if response.status_code == 429:
+        raise SystemExit(
+            "requests are rate limited, start server with "
+            "RATE_LIMIT_BACKEND=none RESPONSE_CACHE_BACKEND=none"
+        )
+
+
+async def read_posts(client: httpx.AsyncClient, token: str, deadline: float) -> list:
+    latencies = []
+    headers = {"Authorization": f"Bearer {token}"}
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        response = await client.get("/posts/", headers=headers)
+        check_not_limited(response)
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+async def login(client: httpx.AsyncClient, credentials: dict, deadline: float):
+    status_codes = {}
+    while time.perf_counter() < deadline:
+        response = await client.post("/login", data=credentials)
+        check_not_limited(response)
+        status_codes[response.status_code] = (
+            status_codes.get(response.status_code, 0) + 1
+        )
+        if response.status_code == 503:
+            await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+    return status_codes
+
+
+async def measure(base_url: str, duration: float, readers: int, storm: int) -> dict:
+    credentials = {"username": f"bench-{uuid.uuid4().hex[:8]}", "password": "bench"}
+    limits = httpx.Limits(max_connections=readers + storm)
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=60
+    ) as client:
+        response = await client.post(
+            "/register",
+            json={**credentials, "email": f"{credentials['username']}@bench.com"},
+        )
+        check_not_limited(response)
+        response.raise_for_status()
+        token = response.json()["access_token"]
+
+        deadline = time.perf_counter() + duration
+        results = await asyncio.gather(
+            *(read_posts(client, token, deadline) for _ in range(readers))
+        )
+        baseline = [latency for result in results for latency in result]
+
+        deadline = time.perf_counter() + duration
+        storm_tasks = [login(client, credentials, deadline) for _ in range(storm)]
+        reader_tasks = [read_posts(client, token, deadline) for _ in range(readers)]
+        results = await asyncio.gather(*reader_tasks, *storm_tasks)
+        during_storm = [latency for result in results[:readers] for latency in result]
+        logins = {}
+        for status_codes in results[readers:]:
+            for status_code, amount in status_codes.items():
+                logins[str(status_code)] = logins.get(str(status_code), 0) + amount
+
+    return {
+        "get_posts_baseline": summary(baseline),
+        "get_posts_during_login_storm": summary(during_storm),
+        "logins": logins,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--storm", type=int, default=32)
+    args = parser.parse_args()
+    result = asyncio.run(
+        measure(args.base_url, args.duration, args.readers, args.storm)
+    )
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
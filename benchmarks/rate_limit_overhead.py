@@ -0,0 +1,120 @@
+"""Module is responsible for measuring per-request cost of rate limiting
+middleware with memory backend. middleware wraps application, which
+only answers, so nothing but the limiter itself is measured:
+
+    python -m benchmarks.rate_limit_overhead --requests 100000
+
+every case is run several rounds and the fastest round is reported, so
+other processes of the machine disturb result less. authenticated route
+looks up claims of token itself, unless limiter has done it, so cost,
+which limiter adds to it, is reported separately.
+
+Result is printed as JSON, so runs on two commits can be compared.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from app import oauth2
+from app.rate_limit import (
+    INVALID_TOKEN,
+    MemoryRateLimitBackend,
+    RateLimiter,
+    RateLimitMiddleware,
+    bearer_token,
+)
+
+
+async def empty_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def authenticated_app(scope, receive, send):
+    # claims are reused the same way, as get_current_token does.
+    if "token_data" not in scope.get("state", {}):
+        token = bearer_token(scope).decode("latin-1")
+        oauth2.verify_access_token(token, INVALID_TOKEN)
+    await empty_app(scope, receive, send)
+
+
+async def receive():
+    return {"type": "http.request", "body": b""}
+
+
+async def send(message):
+    pass
+
+
+async def run_case(asgi_app, path: str, headers: list, requests: int) -> float:
+    """function returns time of single request in microseconds."""
+    started = time.perf_counter()
+    for _ in range(requests):
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": path,
+            "headers": headers,
+            "client": ("127.0.0.1", 50000),
+        }
+        await asgi_app(scope, receive, send)
+    return (time.perf_counter() - started) / requests * 1_000_000
+
+
+async def measure(requests: int, rounds: int = 5) -> dict:
+    # limit is never reached, so every request takes its token.
+    limiter = RateLimiter(
+        MemoryRateLimitBackend(max_keys=1000), {"GET /posts/": f"{requests}/second"}
+    )
+    token = oauth2.create_access_token({"author_id": 1})
+    authorization = [(b"authorization", f"Bearer {token}".encode())]
+    cases = {
+        "baseline": (empty_app, "/posts/", []),
+        "unlimited_route": (RateLimitMiddleware(empty_app, limiter), "/", []),
+        "by_ip": (RateLimitMiddleware(empty_app, limiter), "/posts/", []),
+        "by_author": (
+            RateLimitMiddleware(empty_app, limiter),
+            "/posts/",
+            authorization,
+        ),
+        "authenticated_baseline": (authenticated_app, "/posts/", authorization),
+        "by_author_on_authenticated_route": (
+            RateLimitMiddleware(authenticated_app, limiter),
+            "/posts/",
+            authorization,
+        ),
+    }
+    timings = {name: float("inf") for name in cases}
+    for _ in range(rounds):
+        for name, (asgi_app, path, headers) in cases.items():
+            timing = await run_case(asgi_app, path, headers, requests)
+            timings[name] = min(timings[name], timing)
+    # overhead is time, which middleware adds to the same request.
+    overhead = {
+        name: round(timings[name] - timings["baseline"], 2)
+        for name in ("unlimited_route", "by_ip", "by_author")
+    }
+    overhead["by_author_on_authenticated_route"] = round(
+        timings["by_author_on_authenticated_route"] - timings["authenticated_baseline"],
+        2,
+    )
+    return {
+        "requests": requests,
+        "rounds": rounds,
+        "baseline_us_per_request": round(timings["baseline"], 2),
+        "overhead_us_per_request": overhead,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(measure(args.requests, args.rounds)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""Module is responsible for seeding database with generated authors,
+posts, comments and black list rows, so benchmarks run against tables
+of known size. benchmark database must be given explicitly, server and
+credentials are taken from .env, database of the application is refused:
+
+    python -m benchmarks.seed --database fastapi_bench --posts 100000
+    DB_NAME=fastapi_bench python -m benchmarks.traffic
+
+Tables are dropped and created again by alembic migrations, every seeded
+author has password BENCH_PASSWORD, so benchmarks can log in as any of them.
+"""
+
+import argparse
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.engine import Engine, make_url
+
+from app import database, models, utils
+from app.config import settings
+
+
+BENCH_PASSWORD = "bench"
+CHUNK_SIZE = 5000
+MIGRATIONS_DIRECTORY = Path(__file__).resolve().parent.parent / "alembic"
+
+
+def author_username(author_id: int) -> str:
+    """function returns username of seeded author with given id."""
+    return f"bench{author_id}"
+
+
+def insert_chunks(connection, table, rows) -> None:
+    """function inserts generated rows in chunks, so they are never
+    held in memory all at once.
+    """
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == CHUNK_SIZE:
+            connection.execute(insert(table), chunk)
+            chunk = []
+    if chunk:
+        connection.execute(insert(table), chunk)
+
+
+def build_schema(engine: Engine) -> None:
+    """function drops every table and creates schema again by migrations."""
+    models.Base.metadata.drop_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE IF EXISTS alembic_version"))
+        # config isn't read from alembic.ini, so logging of the caller
+        # isn't reconfigured.
+        config = Config()
+        config.set_main_option("script_location", str(MIGRATIONS_DIRECTORY))
+        config.attributes["connection"] = connection
+        command.upgrade(config, "head")
+
+
+def seed(
+    engine: Engine,
+    authors: int,
+    posts: int,
+    comments: int,
+    blacklist: int,
+    random_seed: int = 0,
+) -> dict:
+    """function recreates tables and fills them with generated rows, the
+    same sizes and seed always produce the same data. number of seeded
+    rows of every table is returned. database of the application is
+    never seeded, its tables would be lost.
+    """
+    if engine.url.database == settings.db_name:
+        raise ValueError(
+            f"refusing to seed database of the application: {settings.db_name}"
+        )
+    rng = random.Random(random_seed)
+    now = datetime.now(timezone.utc)
+    build_schema(engine)
+
+    # bcrypt is slow on purpose, so password is hashed only once.
+    password = utils.hash_user_password(BENCH_PASSWORD)
+    # tables are created again, so rows get ids 1..n in insertion order.
+    comment_posts = [rng.randint(1, posts) for _ in range(comments if posts else 0)]
+    comment_counts = {}
+    for post_id in comment_posts:
+        comment_counts[post_id] = comment_counts.get(post_id, 0) + 1
+
+    with engine.begin() as connection:
+        insert_chunks(
+            connection,
+            models.Author,
+            (
+                {
+                    "username": author_username(author_id),
+                    "email": f"{author_username(author_id)}@bench.com",
+                    "password": password,
+                }
+                for author_id in range(1, authors + 1)
+            ),
+        )
+        insert_chunks(
+            connection,
+            models.Post,
+            (
+                {
+                    "title": f"Post {post_id}",
+                    "description": f"Description of benchmark post {post_id}",
+                    "price": round(rng.uniform(1, 1000), 2),
+                    "is_active": rng.random() < 0.9,
+                    # older posts come first, so ids follow creation time.
+                    "created_at": now - timedelta(seconds=posts - post_id),
+                    "author_id": rng.randint(1, authors),
+                    "comment_count": comment_counts.get(post_id, 0),
+                }
+                for post_id in range(1, posts + 1)
+            ),
+        )
+        insert_chunks(
+            connection,
+            models.Comment,
+            (
+                {
+                    "comment": f"Comment on post {post_id}",
+                    "post_id": post_id,
+                    "author_id": rng.randint(1, authors),
+                }
+                for post_id in comment_posts
+            ),
+        )
+        insert_chunks(
+            connection,
+            models.BlackList,
+            (
+                {
+                    "jti": uuid.UUID(int=rng.getrandbits(128)).hex,
+                    # half of revoked tokens are already expired.
+                    "exp": now + timedelta(minutes=rng.randint(-60, 60)),
+                    "user_id": rng.randint(1, authors),
+                }
+                for _ in range(blacklist)
+            ),
+        )
+    return {
+        "authors": authors,
+        "posts": posts,
+        "comments": len(comment_posts),
+        "blacklist": blacklist,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--database",
+        default=settings.benchmark_db_name,
+        help="benchmark database, BENCHMARK_DB_NAME by default",
+    )
+    parser.add_argument("--authors", type=int, default=100)
+    parser.add_argument("--posts", type=int, default=10_000)
+    parser.add_argument("--comments", type=int, default=50_000)
+    parser.add_argument("--blacklist", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if args.authors < 1:
+        parser.error("at least one author is needed")
+    if not args.database:
+        parser.error("benchmark database must be given by --database")
+    if args.database == settings.db_name:
+        parser.error(f"{args.database} is database of the application")
+    engine = create_engine(
+        make_url(database.SQLALCHEMY_DATABASE_URL).set(database=args.database)
+    )
+    started = time.perf_counter()
+    result = seed(
+        engine,
+        args.authors,
+        args.posts,
+        args.comments,
+        args.blacklist,
+        args.seed,
+    )
+    result["seconds"] = round(time.perf_counter() - started, 2)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
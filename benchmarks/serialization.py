@@ -0,0 +1,102 @@
+"""Module is responsible for measuring serialization time of post pages
+built by fast path and by pydantic orm_mode path, at several page sizes:
+
+    python -m benchmarks.serialization --sizes 1000,10000,100000
+
+Result is printed as JSON, so runs on two commits can be compared.
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from app import schemas, serialization
+
+
+def make_post_rows(count: int) -> list:
+    created_at = datetime(2023, 6, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+    return [
+        (
+            number,
+            number % 7,
+            f"post {number}",
+            f"post {number} content",
+            number + 0.5,
+            number % 2 == 0,
+            created_at + timedelta(seconds=number),
+            created_at + timedelta(seconds=number, microseconds=1),
+            number % 5,
+            f"author {number % 10}",
+            f"author{number % 10}@gmail.com",
+            number % 10,
+        )
+        for number in range(count)
+    ]
+
+
+def make_post_objects(rows: list) -> list:
+    """function builds objects, which look like ORM posts for pydantic."""
+    return [
+        SimpleNamespace(
+            id=row[0],
+            vote_count=row[1],
+            title=row[2],
+            description=row[3],
+            price=row[4],
+            is_active=row[5],
+            created_at=row[6],
+            updated_at=row[7],
+            comment_count=row[8],
+            author=SimpleNamespace(username=row[9], email=row[10], id=row[11]),
+        )
+        for row in rows
+    ]
+
+
+def pydantic_body(posts: list) -> bytes:
+    return schemas.PostPage(items=posts, next_cursor=None).json().encode()
+
+
+def fast_body(rows: list) -> bytes:
+    return serialization.dumps(
+        {"items": serialization.post_rows_to_dicts(rows), "next_cursor": None}
+    )
+
+
+def measure(sizes) -> dict:
+    result = {}
+    for count in sizes:
+        rows = make_post_rows(count)
+        posts = make_post_objects(rows)
+
+        started = time.perf_counter()
+        fast_body(rows)
+        fast_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        pydantic_body(posts)
+        pydantic_seconds = time.perf_counter() - started
+
+        result[str(count)] = {
+            "fast_ms": round(fast_seconds * 1000, 1),
+            "pydantic_ms": round(pydantic_seconds * 1000, 1),
+            "speedup": round(pydantic_seconds / fast_seconds, 1),
+        }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        type=lambda value: [int(size) for size in value.split(",")],
+        default=[1_000, 10_000, 100_000],
+    )
+    args = parser.parse_args()
+    print(json.dumps(measure(args.sizes), indent=2))
+
+
+if __name__ == "__main__":
+    main()
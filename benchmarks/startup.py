@@ -0,0 +1,108 @@
+"""Module is responsible for measuring how fast worker of the application
+starts: import time, lifespan startup and time to the first request.
+
+Every worker is a fresh interpreter, they are started at the same time,
+as server workers are. database from .env is used for the first request,
+which needs it:
+
+    python -m benchmarks.startup --workers 4
+
+Result is printed as JSON, so runs on two commits can be compared.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+
+async def measure_worker(author_id: int) -> dict:
+    """function imports the application, starts it and sends first
+    requests to it, time of every step is returned in milliseconds.
+    """
+    import httpx
+
+    started = time.perf_counter()
+    from app.main import app
+    from app.oauth2 import create_access_token
+
+    result = {"import_ms": (time.perf_counter() - started) * 1000}
+    async with httpx.AsyncClient(app=app, base_url="http://benchmark") as client:
+        started = time.perf_counter()
+        async with app.router.lifespan_context(app):
+            result["startup_ms"] = (time.perf_counter() - started) * 1000
+
+            started = time.perf_counter()
+            response = await client.get("/")
+            response.raise_for_status()
+            result["first_request_ms"] = (time.perf_counter() - started) * 1000
+
+            # first request, which needs database, also opens connection
+            # and checks token, so it loads jose as well.
+            headers = {
+                "Authorization": f"Bearer {create_access_token({'author_id': author_id})}"
+            }
+            started = time.perf_counter()
+            response = await client.get("/posts/?limit=1", headers=headers)
+            result["first_db_request_ms"] = (time.perf_counter() - started) * 1000
+            result["first_db_request_status"] = response.status_code
+    return {
+        name: round(value, 2) if isinstance(value, float) else value
+        for name, value in result.items()
+    }
+
+
+def measure(workers: int, author_id: int) -> dict:
+    started = time.perf_counter()
+    processes = [
+        subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.startup",
+                "--worker",
+                "--author-id",
+                str(author_id),
+            ],
+            stdout=subprocess.PIPE,
+        )
+        for _ in range(workers)
+    ]
+    results = []
+    for process in processes:
+        output, _ = process.communicate()
+        if process.returncode != 0:
+            raise SystemExit(f"worker failed with exit code {process.returncode}")
+        results.append(json.loads(output))
+    total_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    steps = ("import_ms", "startup_ms", "first_request_ms", "first_db_request_ms")
+    return {
+        "workers": workers,
+        "median": {
+            step: round(statistics.median(result[step] for result in results), 2)
+            for step in steps
+        },
+        "max": {step: max(result[step] for result in results) for step in steps},
+        "all_workers_done_ms": total_ms,
+        "per_worker": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--author-id", type=int, default=1)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        print(json.dumps(asyncio.run(measure_worker(args.author_id))))
+        return
+    print(json.dumps(measure(args.workers, args.author_id), indent=2))
+
+
+if __name__ == "__main__":
+    main()
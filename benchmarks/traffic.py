@@ -0,0 +1,288 @@
+"""Module is responsible for measuring throughput and latency of the
+application under scripted mix of login, list, detail, create and
+comment requests sent at fixed concurrency.
+
+Application runs in the same process, database seeded by
+benchmarks.seed is used:
+
+    python -m benchmarks.seed --database fastapi_bench --posts 100000
+    DB_NAME=fastapi_bench python -m benchmarks.traffic --concurrency 50
+
+Result, including SQL statements per request, is printed as JSON,
+so runs on two commits can be compared.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional
+
+import httpx
+from sqlalchemy import event, func, select
+
+from app import database, models
+from app.config import settings
+from app.main import app
+from app.oauth2 import create_access_token
+from app.rate_limit import rate_limiter
+from benchmarks.login_storm import summary
+from benchmarks.seed import BENCH_PASSWORD, author_username
+
+
+# relative weights of operations, most requests read posts.
+DEFAULT_MIX = {"login": 1, "list": 40, "detail": 40, "create": 5, "comment": 14}
+
+# statements counter of request, which is being sent by current task.
+current_queries: ContextVar[Optional[List[int]]] = ContextVar(
+    "current_queries", default=None
+)
+
+
+def count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = current_queries.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+def application_engines() -> list:
+    """function returns sync engines, which application sends statements to."""
+    engines = [database.engine, database.async_engine.sync_engine]
+    if database.replica_engine is not None:
+        engines.append(database.replica_engine)
+    if database.async_replica_engine is not None:
+        engines.append(database.async_replica_engine.sync_engine)
+    return engines
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    """function parses mix given as comma separated name=weight pairs."""
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown operation: {name}")
+        mix[name] = int(weight)
+    return mix
+
+
+class Traffic:
+    """class sends requests of scripted operations on behalf of seeded
+    authors, ids of posts are chosen among seeded ones.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, authors: int, posts: int):
+        self.client = client
+        self.authors = authors
+        self.posts = posts
+
+    @staticmethod
+    def headers(author_id: int) -> dict:
+        return {
+            "Authorization": f"Bearer {create_access_token({'author_id': author_id})}"
+        }
+
+    async def login(self, rng: random.Random, headers: dict) -> httpx.Response:
+        username = author_username(rng.randint(1, self.authors))
+        return await self.client.post(
+            "/login", data={"username": username, "password": BENCH_PASSWORD}
+        )
+
+    async def list(self, rng: random.Random, headers: dict) -> httpx.Response:
+        return await self.client.get("/posts/", headers=headers)
+
+    async def detail(self, rng: random.Random, headers: dict) -> httpx.Response:
+        post_id = rng.randint(1, self.posts)
+        return await self.client.get(f"/posts/{post_id}", headers=headers)
+
+    async def create(self, rng: random.Random, headers: dict) -> httpx.Response:
+        return await self.client.post(
+            "/posts/",
+            json={
+                "title": "Benchmark post",
+                "description": "Post created during benchmark",
+                "price": round(rng.uniform(1, 1000), 2),
+            },
+            headers=headers,
+        )
+
+    async def comment(self, rng: random.Random, headers: dict) -> httpx.Response:
+        post_id = rng.randint(1, self.posts)
+        return await self.client.post(
+            f"/posts/{post_id}/comments",
+            json={"comment": "Comment sent during benchmark"},
+            headers=headers,
+        )
+
+
+async def run_worker(
+    traffic: Traffic,
+    rng: random.Random,
+    mix: Dict[str, int],
+    author_id: int,
+    deadline: float,
+) -> List[tuple]:
+    """function sends requests one after another until deadline, every
+    result is (operation, latency, status code, number of statements).
+    """
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    headers = traffic.headers(author_id)
+    results = []
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        counter = [0]
+        token = current_queries.set(counter)
+        started = time.perf_counter()
+        try:
+            response = await getattr(traffic, name)(rng, headers)
+        finally:
+            current_queries.reset(token)
+        results.append(
+            (name, time.perf_counter() - started, response.status_code, counter[0])
+        )
+    return results
+
+
+def report(results: List[tuple], duration: float) -> dict:
+    """function summarizes results of every operation and all of them together."""
+
+    def describe(items: list) -> dict:
+        status_codes = {}
+        for _, _, status_code, _ in items:
+            status_codes[str(status_code)] = status_codes.get(str(status_code), 0) + 1
+        queries = sum(item[3] for item in items)
+        return {
+            **summary([item[1] for item in items]),
+            "rps": round(len(items) / duration, 1),
+            "queries_per_request": round(queries / len(items), 2) if items else 0.0,
+            "status_codes": status_codes,
+        }
+
+    operations = {}
+    for result in results:
+        operations.setdefault(result[0], []).append(result)
+    return {
+        "total": describe(results),
+        "operations": {name: describe(items) for name, items in operations.items()},
+    }
+
+
+async def drive(
+    asgi_app,
+    authors: int,
+    posts: int,
+    concurrency: int,
+    duration: float,
+    mix: Dict[str, int] = DEFAULT_MIX,
+    random_seed: int = 0,
+    engines: Iterable = (),
+    rate_limits: bool = False,
+) -> dict:
+    """function sends scripted traffic to given application and reports
+    latency, throughput and statements sent to given engines per request.
+    all requests come from one client, so rate limits are turned off,
+    unless they are measured too.
+    """
+    engines = list(engines)
+    limiter_enabled = rate_limiter.enabled
+    rate_limiter.enabled = rate_limits
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", count_query)
+    limits = httpx.Limits(max_connections=concurrency)
+    try:
+        async with httpx.AsyncClient(
+            app=asgi_app, base_url="http://benchmark", limits=limits, timeout=120
+        ) as client:
+            traffic = Traffic(client, authors, posts)
+            deadline = time.perf_counter() + duration
+            started = time.perf_counter()
+            results = await asyncio.gather(
+                *(
+                    run_worker(
+                        traffic,
+                        random.Random(random_seed * concurrency + worker),
+                        mix,
+                        worker % authors + 1,
+                        deadline,
+                    )
+                    for worker in range(concurrency)
+                )
+            )
+            elapsed = time.perf_counter() - started
+    finally:
+        rate_limiter.enabled = limiter_enabled
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", count_query)
+    return report([item for result in results for item in result], elapsed)
+
+
+async def measure(
+    concurrency: int,
+    duration: float,
+    mix: Dict[str, int],
+    random_seed: int,
+    rate_limits: bool = False,
+) -> dict:
+    # sizes of seeded tables are read before traffic starts.
+    database.create_engines()
+    async with database.async_engine.connect() as connection:
+        authors = await connection.scalar(select(func.max(models.Author.id)))
+        posts = await connection.scalar(select(func.max(models.Post.id)))
+    if not authors or not posts:
+        raise SystemExit("database is empty, run python -m benchmarks.seed first")
+    async with app.router.lifespan_context(app):
+        result = await drive(
+            app,
+            authors,
+            posts,
+            concurrency,
+            duration,
+            mix,
+            random_seed,
+            application_engines(),
+            rate_limits,
+        )
+    return {
+        "config": {
+            "stack": "async" if settings.db_async else "threadpool",
+            "concurrency": concurrency,
+            "duration": duration,
+            "mix": mix,
+            "seed": random_seed,
+            "rate_limits": rate_limits,
+            "authors": authors,
+            "posts": posts,
+        },
+        **result,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default=DEFAULT_MIX,
+        help="comma separated weights, e.g. list=50,detail=30,comment=20",
+    )
+    parser.add_argument("--stack", choices=["async", "threadpool"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--rate-limits", action="store_true", help="keep rate limits turned on"
+    )
+    args = parser.parse_args()
+    if args.stack is not None:
+        settings.db_async = args.stack == "async"
+    result = asyncio.run(
+        measure(args.concurrency, args.duration, args.mix, args.seed, args.rate_limits)
+    )
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,61 +3,320 @@ overriding existing db instance with test_db instance for
 testing purposes and creating pytest fixtures.
  """
 
+import functools
+import hashlib
+import os
+
+import anyio
 import pytest
+from fastapi import status
 from fastapi.testclient import TestClient
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from sqlalchemy.schema import CreateIndex, CreateTable
 
 from app.main import app
 from app.config import settings
-from app.database import Base, get_db
-from app.oauth2 import create_access_token
+from app.database import Base, ThreadpoolSession, get_async_db
+from app.oauth2 import create_access_token, decoded_tokens, known_authors
+from app.cache import NullCacheBackend, response_cache
+from app.replica import primary_pins
+from app.rate_limit import rate_limiter
+from app.revocation import revocation_cache
+from app.utils import hash_user_password
 from app import models
 
 
-SQLALCHEMY_DATABASE_URL = f"postgresql://{settings.db_username}:{settings.db_password}@{settings.db_hostname}:{settings.db_port}/{settings.db_name_test}"
+def database_url(name: str, driver: str = "postgresql") -> str:
+    return f"{driver}://{settings.db_username}:{settings.db_password}@{settings.db_hostname}:{settings.db_port}/{name}"
+
+
+# every worker of pytest-xdist (pytest -n) gets its own database.
+XDIST_WORKER = os.environ.get("PYTEST_XDIST_WORKER")
+TEST_DATABASE_NAME = (
+    f"{settings.db_name_test}_{XDIST_WORKER}" if XDIST_WORKER else settings.db_name_test
+)
+
+SQLALCHEMY_DATABASE_URL = database_url(TEST_DATABASE_NAME)
 
 engine = create_engine(SQLALCHEMY_DATABASE_URL)
 
 TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+ASYNC_SQLALCHEMY_DATABASE_URL = database_url(TEST_DATABASE_NAME, "postgresql+asyncpg")
+
+# every request of test client runs in its own event loop,
+# so async connections can't be pooled between requests.
+async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, poolclass=NullPool)
+
+TestAsyncSessionLocal = async_sessionmaker(
+    autocommit=False, autoflush=False, bind=async_engine, expire_on_commit=False
+)
+
+# workers create template database one at a time.
+TEMPLATE_LOCK_KEY = 7_120_020
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "committed: test data is committed and removed afterwards, because "
+        "other connections must see it or now() must differ between writes.",
+    )
+
+
+def schema_digest() -> str:
+    """function returns digest of tables DDL, template database
+    is built again, when models are changed.
+    """
+    dialect = postgresql.dialect()
+    ddl = [
+        str(CreateTable(table).compile(dialect=dialect))
+        for table in Base.metadata.sorted_tables
+    ]
+    ddl += [
+        str(CreateIndex(index).compile(dialect=dialect))
+        for table in Base.metadata.sorted_tables
+        for index in sorted(table.indexes, key=lambda index: index.name)
+    ]
+    ddl += models.POSTGRESQL_SEARCH_DDL
+    return hashlib.blake2b("\n".join(ddl).encode(), digest_size=4).hexdigest()
+
+
+def clone_template_database() -> None:
+    """function copies worker database from template database, which
+    has all tables already created. template is created by the first
+    worker, which needs it.
+    """
+    template_prefix = f"{settings.db_name_test}_template_"
+    template = template_prefix + schema_digest()
+    admin_engine = create_engine(
+        database_url("postgres"), isolation_level="AUTOCOMMIT", poolclass=NullPool
+    )
+    with admin_engine.connect() as connection:
+        connection.execute(
+            text("SELECT pg_advisory_lock(:key)"), {"key": TEMPLATE_LOCK_KEY}
+        )
+        try:
+            exists = connection.scalar(
+                text("SELECT 1 FROM pg_database WHERE datname = :name"),
+                {"name": template},
+            )
+            if not exists:
+                # templates of previous versions of models aren't needed anymore.
+                names = connection.scalars(text("SELECT datname FROM pg_database"))
+                for name in names.all():
+                    if name.startswith(template_prefix):
+                        connection.execute(text(f'DROP DATABASE "{name}"'))
+                # template gets its name only when it is complete,
+                # so interrupted run doesn't leave broken template.
+                building = f"{template}_building"
+                connection.execute(text(f'DROP DATABASE IF EXISTS "{building}"'))
+                connection.execute(text(f'CREATE DATABASE "{building}"'))
+                template_engine = create_engine(
+                    database_url(building), poolclass=NullPool
+                )
+                Base.metadata.create_all(bind=template_engine)
+                template_engine.dispose()
+                connection.execute(
+                    text(f'ALTER DATABASE "{building}" RENAME TO "{template}"')
+                )
+            connection.execute(text(f'DROP DATABASE IF EXISTS "{TEST_DATABASE_NAME}"'))
+            connection.execute(
+                text(f'CREATE DATABASE "{TEST_DATABASE_NAME}" TEMPLATE "{template}"')
+            )
+        finally:
+            connection.execute(
+                text("SELECT pg_advisory_unlock(:key)"), {"key": TEMPLATE_LOCK_KEY}
+            )
+    admin_engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def database_schema():
+    """fixture creates tables once per test run, workers of
+    pytest-xdist clone them from template database instead.
+    """
+    if XDIST_WORKER:
+        clone_template_database()
+    else:
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+    yield
+    engine.dispose()
+
+
+def keeps_committed_data(request) -> bool:
+    """function checks if test data must be really committed: asyncpg
+    connections of async stack and tests marked as committed can't see
+    data of SAVEPOINT, which is rolled back afterwards.
+    """
+    callspec = getattr(request.node, "callspec", None)
+    stack = callspec.params.get("client") if callspec is not None else None
+    return stack == "async" or request.node.get_closest_marker("committed") is not None
+
+
+def truncate_tables() -> None:
+    names = ", ".join(table.name for table in Base.metadata.sorted_tables)
+    with engine.begin() as connection:
+        connection.execute(text(f"TRUNCATE {names} RESTART IDENTITY CASCADE"))
+
+
+def restart_sequences() -> None:
+    # sequences aren't rolled back with transaction, ids must start from 1 again.
+    with engine.begin() as connection:
+        sequences = connection.scalars(
+            text("SELECT sequencename FROM pg_sequences WHERE schemaname = 'public'")
+        ).all()
+        for sequence in sequences:
+            connection.execute(text(f'ALTER SEQUENCE "{sequence}" RESTART'))
+
 
 @pytest.fixture()
-def session():
-    Base.metadata.drop_all(bind=engine)
-    Base.metadata.create_all(bind=engine)
-    db = TestSessionLocal()
+def session(request, database_schema):
+    """fixture gives session, every change of which is undone after test:
+    test runs inside SAVEPOINT, which is rolled back, or its committed
+    data is truncated, if other connections must see it.
+    """
+    # black list ids start from 1 again, so cached sync state is dropped.
+    revocation_cache.clear()
+    primary_pins.clear()
+    known_authors.clear()
+    decoded_tokens.clear()
+    anyio.run(response_cache.clear)
+    anyio.run(rate_limiter.clear)
+    if keeps_committed_data(request):
+        db = TestSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+            truncate_tables()
+        return
+    connection = engine.connect()
+    transaction = connection.begin()
+    # commit of the session releases SAVEPOINT, outer transaction stays.
+    db = TestSessionLocal(bind=connection, join_transaction_mode="create_savepoint")
     try:
         yield db
     finally:
         db.close()
+        transaction.rollback()
+        connection.close()
+        restart_sequences()
+
+
+SAVEPOINT_STATEMENTS = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+
+
+class QueryCounter:
+    """class counts SQL statements, which are sent to test database."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        # savepoints are made by test transaction only, not by application.
+        if statement.startswith(SAVEPOINT_STATEMENTS):
+            return
+        self.count += 1
+        self.statements.append(statement)
 
 
 @pytest.fixture()
-def client(session):
-    def get_db_test():
-        try:
-            yield session
-        finally:
-            session.close()
+def query_counter():
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+    event.listen(async_engine.sync_engine, "before_cursor_execute", counter)
+    yield counter
+    event.remove(engine, "before_cursor_execute", counter)
+    event.remove(async_engine.sync_engine, "before_cursor_execute", counter)
+
+
+@pytest.fixture()
+def no_response_cache(monkeypatch):
+    """fixture turns response cache off, so every request reaches database."""
+    monkeypatch.setattr(response_cache, "backend", NullCacheBackend())
+
 
-    app.dependency_overrides[get_db] = get_db_test
+@pytest.fixture(params=["sync", "async"])
+def client(request, session, monkeypatch):
+    """fixture runs every test against both database stacks: sync session
+    used from threadpool and AsyncSession on top of asyncpg.
+    """
+    # sessions, which aren't overridden below (e.g. replica ones),
+    # are opened on the same stack.
+    monkeypatch.setattr(settings, "db_async", request.param == "async")
+
+    if request.param == "async":
+
+        async def get_async_db_test():
+            async with TestAsyncSessionLocal() as db:
+                yield db
+
+    else:
+
+        async def get_async_db_test():
+            yield ThreadpoolSession(session)
+
+    app.dependency_overrides[get_async_db] = get_async_db_test
     yield TestClient(app)
 
 
+@functools.lru_cache(maxsize=None)
+def hashed_password(password: str) -> str:
+    """function hashes every password once per test run, bcrypt is slow on purpose."""
+    return hash_user_password(password)
+
+
+@pytest.fixture
+def author_factory(session):
+    """fixture returns function, which saves author with pre-hashed password
+    and returns the same data, as registration would, without calling /register.
+    """
+
+    def create_author(username: str, email: str, password: str = "nadira") -> dict:
+        author = models.Author(
+            username=username, email=email, password=hashed_password(password)
+        )
+        session.add(author)
+        session.commit()
+        access_token = create_access_token(data={"author_id": author.id})
+        return {
+            "response": {"access_token": access_token, "token_type": "bearer"},
+            "status_code": status.HTTP_201_CREATED,
+            "id": author.id,
+        }
+
+    return create_author
+
+
 @pytest.fixture
-def test_user(client) -> dict:
+def registered_user(client) -> dict:
+    """fixture registers author through /register, it is needed by tests
+    of registration itself only, others use author_factory.
+    """
     user_data = {"username": "nata", "email": "fighter@gmail.com", "password": "nadira"}
     response = client.post("/register", json=user_data)
     return {"response": response.json(), "status_code": response.status_code, "id": 1}
 
 
 @pytest.fixture
-def test_second_user(client) -> dict:
-    user_data = {"username": "nika", "email": "chincho@gmail.com", "password": "nadira"}
-    response = client.post("/register", json=user_data)
-    return {"response": response.json(), "status_code": response.status_code, "id": 2}
+def test_user(author_factory) -> dict:
+    return author_factory("nata", "fighter@gmail.com")
+
+
+@pytest.fixture
+def test_second_user(test_user, author_factory) -> dict:
+    return author_factory("nika", "chincho@gmail.com")
 
 
 @pytest.fixture
@@ -65,6 +324,15 @@ def token(test_user):
     return create_access_token(data={"author_id": test_user["id"]})
 
 
+@pytest.fixture
+def metrics_headers(monkeypatch) -> dict:
+    """fixture turns internal metrics endpoint on and gives headers,
+    which carry its token.
+    """
+    monkeypatch.setattr(settings, "metrics_token", "metrics-token")
+    return {"Authorization": "Bearer metrics-token"}
+
+
 @pytest.fixture
 def authorized_client(client, token):
     client.headers = {**client.headers, "Authorization": f"Bearer {token}"}
@@ -150,3 +418,38 @@ def test_comments(test_posts, session) -> None:
     )
     session.commit()
     return None
+
+
+@pytest.fixture
+def add_new_authors(test_comments, session):
+    """fixture returns function, which adds given number of new authors,
+    every one of them with own post and comment under first post.
+    """
+
+    def add_authors(amount: int) -> None:
+        for number in range(amount):
+            author = models.Author(
+                username=f"new author {number}",
+                email=f"new_author_{number}@gmail.com",
+                password="not-a-real-hash",
+            )
+            session.add(author)
+            session.flush()
+            session.add_all(
+                [
+                    models.Post(
+                        title=f"new author {number} post",
+                        description="new author post content",
+                        price=10,
+                        author_id=author.id,
+                    ),
+                    models.Comment(
+                        comment=f"new author {number} comment",
+                        author_id=author.id,
+                        post_id=1,
+                    ),
+                ]
+            )
+        session.commit()
+
+    return add_authors
@@ -1,25 +1,28 @@
 """Module is responsible for testing register, login and logout endpoints."""
 
 import pytest
+from fastapi import HTTPException
 from jose import jwt
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
-from app import schemas, models
+from app import schemas, models, oauth2, refresh_tokens, utils
+from app.routers import authentication
 from app.config import settings
 
 
-def test_register_view_success(test_user):
+def test_register_view_success(registered_user):
     """TestCase checks register view, if it creates new author
     and returns token for another authorized operations.
     """
-    res_data = schemas.UserToken(**test_user["response"])
+    res_data = schemas.UserToken(**registered_user["response"])
     decode_token = jwt.decode(
         token=res_data.access_token,
         key=settings.secret_key,
         algorithms=[settings.algorithm],
     )
-    assert test_user["status_code"] == 201
+    assert registered_user["status_code"] == 201
     assert decode_token["author_id"] == 1
+    assert len(decode_token["jti"]) == 32
     assert res_data.token_type == "bearer"
 
 
@@ -98,6 +101,30 @@ def test_login_view_wrong_credentials_error(
     assert response.status_code == status_code
 
 
+@pytest.mark.parametrize(
+    "url, data, json",
+    [
+        ("/login", {"username": "nata", "password": "nadira"}, None),
+        (
+            "/register",
+            None,
+            {"username": "tommy", "email": "tommy@gmail.com", "password": "shelby"},
+        ),
+    ],
+)
+def test_password_pool_saturated_error(client, test_user, monkeypatch, url, data, json):
+    """TestCase checks that if password hashing pool can't accept more work,
+    then 503 exception error with Retry-After header will be raised
+    instead of waiting in the queue.
+    """
+    monkeypatch.setattr(settings, "password_hash_max_pending", 0)
+    response = client.post(url, data=data, json=json)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(
+        settings.password_hash_retry_after_seconds
+    )
+
+
 def test_logout_view_authorized_success(authorized_client):
     """TestCase checks that authorized user will be able to call logout endpoint
     and, get special message that he/she was logged out successfully.
@@ -117,41 +144,331 @@ def test_logout_view_non_authorized_error(client):
     assert response.json().get("detail") == "Not authenticated"
 
 
-def test_logout_view_save_blacklist_token(authorized_client, test_user, session):
+def test_logout_view_save_blacklist_token(authorized_client, token, session):
     """TestCase checks that if authorized user access logout endpoint,
-    then his/her token will be stored into black_list table and, user
+    then his/her token id will be stored into black_list table and, user
     will no longer be able to use it.
     """
     response = authorized_client.get("/logout")
-    black_token = test_user["response"]["access_token"]
+    decode_token = jwt.decode(
+        token=token, key=settings.secret_key, algorithms=[settings.algorithm]
+    )
     db_data = (
         session.query(models.BlackList)
-        .filter(models.BlackList.token == black_token)
+        .filter(models.BlackList.jti == decode_token["jti"])
         .first()
     )
     assert response.status_code == 200
     assert db_data is not None
+    assert db_data.exp.timestamp() == decode_token["exp"]
+    assert authorized_client.get("/logout").status_code == 403
 
 
-def test_logout_view_remove_old_blacklist_tokens(authorized_client, test_user, session):
-    """TestCase checks that when authorized user access logout endpoint,
-    then in the background there will be executed special function that
-    remove old(older than 30 minutes) tokens from black_list table.
+def test_logout_view_single_insert(authorized_client, query_counter):
+    """TestCase checks that logout endpoint only inserts token id into
+    black_list table, expired tokens are not removed during request.
     """
-    old_token = (
-        "my_randomly_generated_token_which_is_to_old_and_needs_to_be_removed_from_db"
+    authorized_client.get("/users/1")
+    query_counter.reset()
+    response = authorized_client.get("/logout")
+    statements = [statement.split()[0] for statement in query_counter.statements]
+    assert response.status_code == 200
+    assert statements.count("INSERT") == 1
+    assert "DELETE" not in statements
+
+
+def test_token_without_jti_error(client, test_user):
+    """TestCase checks that token, which has no token id (jti),
+    can't be used, because it would be impossible to revoke it.
+    """
+    old_token = jwt.encode(
+        {
+            "author_id": 1,
+            "exp": datetime.now(timezone.utc) + timedelta(minutes=5),
+        },
+        settings.secret_key,
+        algorithm=settings.algorithm,
     )
-    old_record = models.BlackList(
-        token=old_token, user_id=1, created_at=datetime.now() - timedelta(minutes=50)
+    response = client.get("/users/1", headers={"Authorization": f"Bearer {old_token}"})
+    assert response.status_code == 403
+
+
+def test_cached_response_without_queries(authorized_client, test_posts, query_counter):
+    """TestCase checks that author of the token is checked once, so cached
+    response is returned without sending any statement to database.
+    """
+    assert authorized_client.get("/posts/").status_code == 200
+    query_counter.reset()
+    response = authorized_client.get("/posts/")
+    assert response.status_code == 200
+    assert query_counter.count == 0
+
+
+def test_invalid_token_without_queries(client, query_counter):
+    """TestCase checks that request with invalid token is rejected
+    before any statement is sent to database.
+    """
+    response = client.get("/posts/", headers={"Authorization": "Bearer wrong"})
+    assert response.status_code == 403
+    assert query_counter.count == 0
+
+
+def test_token_of_missing_author_error(client, test_user):
+    """TestCase checks that token of author, who doesn't exist, is rejected."""
+    token = oauth2.create_access_token(data={"author_id": 999})
+    response = client.get("/posts/", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 403
+
+
+def test_author_check_turned_off(client, test_user, monkeypatch, query_counter):
+    """TestCase checks that id is taken from the token without querying
+    authors table, if author check is turned off.
+    """
+    monkeypatch.setattr(settings, "verify_token_author", False)
+    token = oauth2.create_access_token(data={"author_id": test_user["id"]})
+    response = client.get("/posts/", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert not any("FROM authors" in item for item in query_counter.statements)
+
+
+def test_known_authors_expire(monkeypatch):
+    """TestCase checks that confirmed author is forgotten after cache interval."""
+    known_authors = oauth2.KnownAuthors(max_size=2, ttl_seconds=10)
+    now = 1000.0
+    monkeypatch.setattr(oauth2.time, "monotonic", lambda: now)
+    known_authors.add(1)
+    assert 1 in known_authors
+    assert 2 not in known_authors
+    now += 10
+    assert 1 not in known_authors
+
+
+def test_known_authors_max_size():
+    """TestCase checks that number of remembered authors is bounded."""
+    known_authors = oauth2.KnownAuthors(max_size=2, ttl_seconds=10)
+    for author_id in range(1, 4):
+        known_authors.add(author_id)
+    assert 3 in known_authors
+    assert len(known_authors._known_until) <= 2
+    known_authors.clear()
+    assert 3 not in known_authors
+
+
+def test_register_view_two_statements(client, query_counter):
+    """TestCase checks that registration checks user with one SELECT and
+    saves him/her with one INSERT, which returns id of new author.
+    """
+    author_data = {"username": "tommy", "email": "tommy@gmail.com", "password": "a"}
+    response = client.post("/register", json=author_data)
+    assert response.status_code == 201
+    assert [statement.split()[0] for statement in query_counter.statements] == [
+        "SELECT",
+        "INSERT",
+    ]
+    assert "ON CONFLICT DO NOTHING RETURNING" in query_counter.statements[1]
+
+
+def test_register_view_email_already_exists_error(test_user, client, monkeypatch):
+    """TestCase checks that author can't be registered with email of other
+    author and password isn't hashed for such request.
+    """
+
+    async def hash_not_expected(password):
+        raise AssertionError("password must not be hashed")
+
+    monkeypatch.setattr(utils, "hash_user_password_async", hash_not_expected)
+    author_data = {"username": "tommy", "email": "fighter@gmail.com", "password": "a"}
+    response = client.post("/register", json=author_data)
+    assert response.status_code == 409
+    assert response.json()["detail"] == (
+        "User with email fighter@gmail.com - already exists!"
     )
-    session.add(old_record)
-    session.commit()
-    # call logout endpoint, that should remove old tokens from db
-    response = authorized_client.get("/logout")
-    db_data = (
-        session.query(models.BlackList)
-        .filter(models.BlackList.token == old_token)
-        .first()
+
+
+def test_register_view_concurrent_registration_error(test_user, client, monkeypatch):
+    """TestCase checks that author, who was registered by concurrent request
+    after the check, is reported as conflict by INSERT statement itself.
+    """
+
+    async def not_registered_yet(username, email, db):
+        return None
+
+    monkeypatch.setattr(authentication, "find_registered_author", not_registered_yet)
+    author_data = {"username": "nata", "email": "other@gmail.com", "password": "a"}
+    response = client.post("/register", json=author_data)
+    assert response.status_code == 409
+    assert (
+        client.post(
+            "/login", data={"username": "nata", "password": "nadira"}
+        ).status_code
+        == 200
     )
+
+
+def test_decoded_token_reused(token):
+    """TestCase checks that claims of verified token are taken from cache,
+    when the same token is verified again.
+    """
+    exception = HTTPException(status_code=403)
+    first = oauth2.verify_access_token(token, exception)
+    second = oauth2.verify_access_token(token, exception)
+    assert second == first
+    assert oauth2.decoded_tokens.stats() == {"size": 1, "hits": 1, "misses": 1}
+
+
+def test_decoded_token_evicted_at_exp(monkeypatch):
+    """TestCase checks that cached claims are dropped, when token expires."""
+    decoded_tokens = oauth2.DecodedTokens(max_size=10)
+    key = decoded_tokens.key("token")
+    token_data = schemas.TokenData(id="1", jti="a" * 32)
+    now = 1000.0
+    monkeypatch.setattr(oauth2.time, "time", lambda: now)
+    decoded_tokens.add(key, 1010.0, token_data)
+    assert decoded_tokens.get(key) == token_data
+    now = 1010.0
+    assert decoded_tokens.get(key) is None
+    assert decoded_tokens.stats() == {"size": 0, "hits": 1, "misses": 1}
+
+
+def test_decoded_tokens_max_size():
+    """TestCase checks that least recently used token is evicted first."""
+    decoded_tokens = oauth2.DecodedTokens(max_size=2)
+    expires_at = datetime.now(timezone.utc).timestamp() + 60
+    keys = [decoded_tokens.key(f"token {number}") for number in range(3)]
+    for key in keys[:2]:
+        decoded_tokens.add(key, expires_at, schemas.TokenData())
+    decoded_tokens.get(keys[0])
+    decoded_tokens.add(keys[2], expires_at, schemas.TokenData())
+    assert decoded_tokens.get(keys[1]) is None
+    assert decoded_tokens.get(keys[0]) is not None
+    assert decoded_tokens.get(keys[2]) is not None
+
+
+def test_expired_token_error(client, test_user):
+    """TestCase checks that expired token is rejected."""
+    expired_token = jwt.encode(
+        {
+            "author_id": test_user["id"],
+            "jti": "e" * 32,
+            "exp": datetime.now(timezone.utc) - timedelta(seconds=1),
+        },
+        settings.secret_key,
+        algorithm=settings.algorithm,
+    )
+    headers = {"Authorization": f"Bearer {expired_token}"}
+    assert client.get("/posts/", headers=headers).status_code == 403
+    assert oauth2.decoded_tokens.stats()["size"] == 0
+
+
+def test_revoked_token_with_cached_claims_error(authorized_client):
+    """TestCase checks that revoked token is rejected, even though its
+    claims are still in cache of decoded tokens.
+    """
+    assert authorized_client.get("/posts/").status_code == 200
+    assert authorized_client.get("/logout").status_code == 200
+    assert authorized_client.get("/posts/").status_code == 403
+    assert oauth2.decoded_tokens.stats()["hits"] >= 2
+
+
+def test_metrics_view_token_cache(authorized_client, metrics_headers):
+    """TestCase checks that internal metrics expose counters of token cache."""
+    authorized_client.get("/posts/")
+    authorized_client.get("/posts/")
+    token_cache = authorized_client.get(
+        "/internal/metrics", headers=metrics_headers
+    ).json()["token_cache"]
+    assert token_cache == {"size": 1, "hits": 1, "misses": 1}
+
+
+def log_in(client) -> dict:
+    response = client.post("/login", data={"username": "nata", "password": "nadira"})
     assert response.status_code == 200
-    assert db_data is None
+    return response.json()
+
+
+def refresh(client, refresh_token: str):
+    return client.post("/token/refresh", json={"refresh_token": refresh_token})
+
+
+def test_login_view_refresh_token_stored_hashed(client, test_user, session):
+    """TestCase checks that login gives refresh token, which is stored
+    in database only as its digest.
+    """
+    tokens = schemas.LoginToken(**log_in(client))
+    stored = session.query(models.RefreshToken).one()
+    assert stored.token_hash == refresh_tokens.hash_refresh_token(tokens.refresh_token)
+    assert stored.token_hash != tokens.refresh_token
+    assert stored.author_id == test_user["id"]
+    assert stored.used_at is None
+
+
+def test_refresh_view_success(client, test_user, monkeypatch, query_counter):
+    """TestCase checks that refresh token gives new access and refresh
+    tokens with two statements and without verifying password.
+    """
+
+    async def verify_not_expected(plain_password, hashed_password):
+        raise AssertionError("password must not be verified")
+
+    tokens = log_in(client)
+    monkeypatch.setattr(utils, "verify_user_password_async", verify_not_expected)
+    query_counter.reset()
+    response = refresh(client, tokens["refresh_token"])
+    assert response.status_code == 200
+    assert [statement.split()[0] for statement in query_counter.statements] == [
+        "UPDATE",
+        "INSERT",
+    ]
+    new_tokens = response.json()
+    assert new_tokens["refresh_token"] != tokens["refresh_token"]
+    decode_token = jwt.decode(
+        token=new_tokens["access_token"],
+        key=settings.secret_key,
+        algorithms=[settings.algorithm],
+    )
+    assert decode_token["author_id"] == test_user["id"]
+    headers = {"Authorization": f"Bearer {new_tokens['access_token']}"}
+    assert client.get("/posts/", headers=headers).status_code == 200
+
+
+def test_refresh_view_reuse_revokes_family(client, test_user):
+    """TestCase checks that refresh token can be used once only and its
+    reuse revokes every token of the family, including the newest one.
+    """
+    tokens = log_in(client)
+    other_login = log_in(client)
+    rotated = refresh(client, tokens["refresh_token"]).json()
+    assert refresh(client, tokens["refresh_token"]).status_code == 403
+    assert refresh(client, rotated["refresh_token"]).status_code == 403
+    # tokens of other logins aren't affected.
+    assert refresh(client, other_login["refresh_token"]).status_code == 200
+
+
+@pytest.mark.parametrize("refresh_token", ["", "not-a-refresh-token"])
+def test_refresh_view_unknown_token_error(client, test_user, refresh_token):
+    """TestCase checks that unknown refresh token is rejected."""
+    log_in(client)
+    assert refresh(client, refresh_token).status_code == 403
+
+
+def test_refresh_view_expired_token_error(client, test_user, session):
+    """TestCase checks that expired refresh token is rejected."""
+    tokens = log_in(client)
+    # now() of database is frozen at start of test transaction, so token
+    # expires long before it, whenever the transaction started.
+    session.query(models.RefreshToken).update(
+        {"expires_at": datetime.now(timezone.utc) - timedelta(days=1)}
+    )
+    session.commit()
+    assert refresh(client, tokens["refresh_token"]).status_code == 403
+
+
+def test_logout_view_revokes_refresh_tokens(client, test_user):
+    """TestCase checks that logout revokes refresh tokens, which were
+    issued with the access token.
+    """
+    tokens = log_in(client)
+    rotated = refresh(client, tokens["refresh_token"]).json()
+    headers = {"Authorization": f"Bearer {rotated['access_token']}"}
+    assert client.get("/logout", headers=headers).status_code == 200
+    assert refresh(client, rotated["refresh_token"]).status_code == 403
@@ -0,0 +1,73 @@
+"""Module is responsible for testing that benchmarks seed database
+and report measured traffic.
+"""
+
+import anyio
+import pytest
+from sqlalchemy import create_engine, func, inspect, select
+
+from app import models
+from app.config import settings
+from app.main import app
+from benchmarks import seed, traffic
+from tests.conftest import async_engine, database_url, engine
+
+
+# seeding recreates tables, so it can't run inside test transaction.
+pytestmark = pytest.mark.committed
+
+
+def test_seed_sizes(session):
+    """TestCase checks that seeding creates requested number of rows
+    and keeps comment counters of posts in line with comments.
+    """
+    result = seed.seed(engine, authors=3, posts=20, comments=50, blacklist=5)
+    assert result == {"authors": 3, "posts": 20, "comments": 50, "blacklist": 5}
+    assert session.scalar(select(func.count()).select_from(models.Author)) == 3
+    assert session.scalar(select(func.count()).select_from(models.BlackList)) == 5
+    assert session.scalar(select(func.sum(models.Post.comment_count))) == 50
+    assert session.scalar(select(func.max(models.Post.id))) == 20
+
+
+def test_seed_refuses_application_database(session):
+    """TestCase checks that database of the application is never seeded."""
+    application_engine = create_engine(database_url(settings.db_name))
+    with pytest.raises(ValueError):
+        seed.seed(application_engine, authors=1, posts=1, comments=0, blacklist=0)
+
+
+def test_seed_builds_schema_by_migrations(session):
+    """TestCase checks that seeded database gets its schema from migrations."""
+    seed.seed(engine, authors=1, posts=1, comments=0, blacklist=0)
+    assert "alembic_version" in inspect(engine).get_table_names()
+    columns = {column["name"] for column in inspect(engine).get_columns("posts")}
+    assert "search_vector" in columns
+
+
+def test_traffic_report(client):
+    """TestCase checks that scripted traffic reaches every operation
+    and report has latency percentiles and statements per request.
+    """
+    seed.seed(engine, authors=2, posts=10, comments=10, blacklist=2)
+    mix = {"login": 1, "list": 1, "detail": 1, "create": 1, "comment": 1}
+
+    async def run():
+        return await traffic.drive(
+            app,
+            authors=2,
+            posts=10,
+            concurrency=1,
+            duration=2,
+            mix=mix,
+            engines=[engine, async_engine.sync_engine],
+        )
+
+    result = anyio.run(run)
+    total = result["total"]
+    assert total["requests"] > 0
+    assert total["p50_ms"] <= total["p95_ms"] <= total["p99_ms"]
+    assert total["queries_per_request"] > 0
+    assert set(total["status_codes"]) <= {"200", "201"}
+    assert sum(item["requests"] for item in result["operations"].values()) == (
+        total["requests"]
+    )
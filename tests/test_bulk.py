@@ -0,0 +1,184 @@
+"""Module is responsible for testing bulk post create/update/delete endpoints."""
+
+import pytest
+
+from app import models
+from app.config import settings
+
+
+def new_posts(count: int) -> list:
+    return [
+        {"title": f"bulk {number}", "description": "bulk content", "price": number}
+        for number in range(count)
+    ]
+
+
+def test_bulk_create_posts(authorized_client, test_posts, query_counter):
+    """TestCase checks that posts are created by one insert statement
+    and id of every created post is returned in request order.
+    """
+    query_counter.reset()
+    response = authorized_client.post("/posts/bulk", json={"items": new_posts(5)})
+    assert response.status_code == 201
+    items = response.json()["items"]
+    assert [item["index"] for item in items] == [0, 1, 2, 3, 4]
+    assert [item["id"] for item in items] == [7, 8, 9, 10, 11]
+    assert all(item["status"] == 201 for item in items)
+    inserts = [s for s in query_counter.statements if s.startswith("INSERT")]
+    assert len(inserts) == 1
+    response = authorized_client.get("/posts/9")
+    assert response.json()["title"] == "bulk 2"
+
+
+def test_bulk_create_posts_limit(authorized_client):
+    """TestCase checks that batch can't be empty or exceed the limit."""
+    response = authorized_client.post("/posts/bulk", json={"items": []})
+    assert response.status_code == 422
+    response = authorized_client.post(
+        "/posts/bulk", json={"items": new_posts(settings.bulk_max_items + 1)}
+    )
+    assert response.status_code == 422
+
+
+def test_bulk_create_posts_rejected_and_partial(authorized_client, test_posts, session):
+    """TestCase checks that batch with invalid item is rejected as a whole,
+    while in partial mode valid items are created and every invalid item
+    gets its own validation error.
+    """
+    items = [*new_posts(2), {"title": "no price", "description": "a"}, "post"]
+    response = authorized_client.post("/posts/bulk", json={"items": items})
+    assert response.status_code == 400
+    assert [item["status"] for item in response.json()["items"]] == [
+        424,
+        424,
+        422,
+        422,
+    ]
+    assert session.query(models.Post).count() == 6
+    response = authorized_client.post(
+        "/posts/bulk", params={"partial": True}, json={"items": items}
+    )
+    assert response.status_code == 207
+    results = response.json()["items"]
+    assert [item["status"] for item in results] == [201, 201, 422, 422]
+    assert [item["id"] for item in results] == [7, 8, None, None]
+    assert results[2]["detail"] == "price: field required"
+    assert authorized_client.get("/posts/8").json()["title"] == "bulk 1"
+
+
+@pytest.mark.committed
+def test_bulk_update_posts(authorized_client, test_posts):
+    """TestCase checks that only given fields of every post are modified."""
+    response = authorized_client.patch(
+        "/posts/bulk",
+        json={
+            "items": [
+                {"id": 1, "title": "new title 1"},
+                {"id": 2, "price": 99, "is_active": False},
+            ]
+        },
+    )
+    assert response.status_code == 200
+    assert [item["status"] for item in response.json()["items"]] == [200, 200]
+    first = authorized_client.get("/posts/1").json()
+    assert first["title"] == "new title 1"
+    assert first["price"] == 23.5
+    assert first["updated_at"] > first["created_at"]
+    second = authorized_client.get("/posts/2").json()
+    assert second["title"] == "post 2"
+    assert second["price"] == 99
+    assert second["is_active"] is False
+
+
+def test_bulk_update_posts_rejected(authorized_client, test_posts):
+    """TestCase checks that nothing is modified, when any post of the batch
+    doesn't exist or belongs to other user.
+    """
+    response = authorized_client.patch(
+        "/posts/bulk",
+        json={
+            "items": [
+                {"id": 1, "title": "new title"},
+                {"id": 5, "title": "new title"},
+                {"id": 100, "title": "new title"},
+                {"id": 1, "title": "new title"},
+            ]
+        },
+    )
+    assert response.status_code == 400
+    assert [item["status"] for item in response.json()["items"]] == [
+        424,
+        403,
+        404,
+        409,
+    ]
+    assert authorized_client.get("/posts/1").json()["title"] == "post 1"
+
+
+def test_bulk_update_posts_null_fields(authorized_client, test_posts):
+    """TestCase checks that field can't be set to null and clear
+    message tells which one.
+    """
+    response = authorized_client.patch(
+        "/posts/bulk",
+        json={"items": [{"id": 1, "title": None}, {"id": 2, "is_active": None}]},
+    )
+    assert response.status_code == 422
+    errors = response.json()["detail"]
+    assert [(error["loc"], error["msg"]) for error in errors] == [
+        (["body", "items", 0, "title"], "title can't be null!"),
+        (["body", "items", 1, "is_active"], "is_active can't be null!"),
+    ]
+    assert authorized_client.get("/posts/1").json()["title"] == "post 1"
+
+
+def test_bulk_update_posts_partial(authorized_client, test_posts):
+    """TestCase checks that valid items are applied in partial mode."""
+    response = authorized_client.patch(
+        "/posts/bulk",
+        params={"partial": True},
+        json={"items": [{"id": 1, "title": "new title"}, {"id": 5, "price": 1}]},
+    )
+    assert response.status_code == 207
+    assert [item["status"] for item in response.json()["items"]] == [200, 403]
+    assert authorized_client.get("/posts/1").json()["title"] == "new title"
+    assert authorized_client.get("/posts/5").json()["price"] == 27.5
+
+
+def test_bulk_delete_posts(authorized_client, test_posts, session, query_counter):
+    """TestCase checks that posts are deleted by one statement after
+    ownership of the whole batch is checked by one query.
+    """
+    query_counter.reset()
+    response = authorized_client.request(
+        "DELETE", "/posts/bulk", json={"ids": [1, 2, 3]}
+    )
+    assert response.status_code == 200
+    deletes = [s for s in query_counter.statements if s.startswith("DELETE")]
+    assert len(deletes) == 1
+    assert [post.id for post in session.query(models.Post).order_by("id")] == [
+        4,
+        5,
+        6,
+    ]
+
+
+def test_bulk_delete_posts_rejected_and_partial(authorized_client, test_posts, session):
+    """TestCase checks that batch with foreign post is rejected as a whole,
+    while in partial mode own posts are deleted.
+    """
+    response = authorized_client.request("DELETE", "/posts/bulk", json={"ids": [1, 6]})
+    assert response.status_code == 400
+    assert session.query(models.Post).count() == 6
+    response = authorized_client.request(
+        "DELETE", "/posts/bulk", params={"partial": True}, json={"ids": [1, 6]}
+    )
+    assert response.status_code == 207
+    assert [item["status"] for item in response.json()["items"]] == [200, 403]
+    assert authorized_client.get("/posts/1").status_code == 404
+
+
+def test_bulk_not_authorized_error(client, test_posts):
+    """TestCase checks that not-authorized user can't use bulk endpoints."""
+    response = client.post("/posts/bulk", json={"items": new_posts(1)})
+    assert response.status_code == 401
@@ -0,0 +1,163 @@
+"""Module is responsible for testing response cache of posts
+and conditional requests.
+"""
+
+from datetime import datetime, timezone
+
+import anyio
+import pytest
+
+from app.cache import MemoryCacheBackend, etag_matches, parse_post_etag, post_etag
+
+
+def post_queries(query_counter) -> int:
+    return sum("FROM posts" in statement for statement in query_counter.statements)
+
+
+def test_memory_backend_evicts_least_recently_used():
+    """TestCase checks that memory backend keeps limited number of entries
+    and evicts entry, which wasn't used for the longest time.
+    """
+
+    async def scenario():
+        backend = MemoryCacheBackend(max_size=2)
+        await backend.set("first", b"1", ttl=60)
+        await backend.set("second", b"2", ttl=60)
+        assert await backend.get("first") == b"1"
+        await backend.set("third", b"3", ttl=60)
+        assert await backend.get("second") is None
+        assert await backend.get("first") == b"1"
+        assert await backend.get("third") == b"3"
+
+    anyio.run(scenario)
+
+
+def test_memory_backend_expires_entries():
+    """TestCase checks that entry isn't returned after its ttl."""
+
+    async def scenario():
+        backend = MemoryCacheBackend(max_size=2)
+        await backend.set("key", b"value", ttl=0)
+        assert await backend.get("key") is None
+        assert await backend.incr("counter") == 1
+        assert await backend.get_counter("counter") == 1
+
+    anyio.run(scenario)
+
+
+def test_memory_backend_bounds_counters():
+    """TestCase checks that memory backend keeps limited number of counters
+    and evicted counter never returns to version, which was already used.
+    """
+
+    async def scenario():
+        backend = MemoryCacheBackend(max_size=2)
+        assert await backend.incr("first") == 1
+        assert await backend.incr("second") == 1
+        assert await backend.incr("second") == 2
+        assert await backend.incr("third") == 1
+        assert len(backend._counters) == 2
+        assert await backend.get_counter("first") == 2
+        await backend.incr("fourth")
+        assert await backend.get_counter("second") == 3
+        assert await backend.incr("second") == 4
+
+    anyio.run(scenario)
+
+
+@pytest.mark.parametrize(
+    "if_none_match, expected",
+    [
+        (None, False),
+        ('W/"1-100"', True),
+        ('"1-100"', True),
+        ('W/"2-100", W/"1-100"', True),
+        ("*", True),
+        ('W/"1-101"', False),
+    ],
+)
+def test_etag_matches(if_none_match, expected):
+    """TestCase checks weak comparison of If-None-Match header."""
+    assert etag_matches(if_none_match, 'W/"1-100"') is expected
+
+
+def test_post_etag_round_trip():
+    """TestCase checks that post id and modification time are restored
+    from ETag exactly, to microsecond.
+    """
+    updated_at = datetime(2023, 6, 1, 12, 30, 15, 999999, tzinfo=timezone.utc)
+    assert parse_post_etag(post_etag(7, updated_at, 3)) == (7, updated_at)
+    assert parse_post_etag('"something else"') is None
+
+
+def test_one_post_served_from_cache(authorized_client, test_posts, query_counter):
+    """TestCase checks that cached post is returned without querying posts."""
+    first = authorized_client.get("/posts/1")
+    query_counter.reset()
+    second = authorized_client.get("/posts/1")
+    assert second.status_code == 200
+    assert second.json() == first.json()
+    assert second.headers["etag"] == first.headers["etag"]
+    assert post_queries(query_counter) == 0
+
+
+def test_one_post_not_modified(authorized_client, test_posts, query_counter):
+    """TestCase checks that client, which has current version of post,
+    gets 304 without body.
+    """
+    etag = authorized_client.get("/posts/1").headers["etag"]
+    query_counter.reset()
+    response = authorized_client.get("/posts/1", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    assert post_queries(query_counter) == 0
+
+
+@pytest.mark.committed
+def test_one_post_invalidated_by_update(authorized_client, test_posts, update_data):
+    """TestCase checks that updated post is served instead of cached one
+    and old ETag doesn't match anymore.
+    """
+    etag = authorized_client.get("/posts/1").headers["etag"]
+    response = authorized_client.put("/posts/1", json=update_data)
+    assert response.status_code == 200
+    response = authorized_client.get("/posts/1", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["title"] == update_data["title"]
+    assert response.headers["etag"] != etag
+
+
+def test_one_post_invalidated_by_delete(authorized_client, test_posts):
+    """TestCase checks that deleted post isn't served from cache."""
+    assert authorized_client.get("/posts/1").status_code == 200
+    assert authorized_client.delete("/posts/1").status_code == 200
+    assert authorized_client.get("/posts/1").status_code == 404
+
+
+def test_post_list_served_from_cache(authorized_client, test_posts, query_counter):
+    """TestCase checks that page of posts is cached by query parameters."""
+    first = authorized_client.get("/posts", params={"limit": 2})
+    query_counter.reset()
+    second = authorized_client.get("/posts", params={"limit": 2})
+    assert second.json() == first.json()
+    assert post_queries(query_counter) == 0
+    response = authorized_client.get(
+        "/posts", params={"limit": 2}, headers={"If-None-Match": first.headers["etag"]}
+    )
+    assert response.status_code == 304
+    response = authorized_client.get("/posts", params={"limit": 3})
+    assert len(response.json()["items"]) == 3
+    assert post_queries(query_counter) == 1
+
+
+def test_post_list_invalidated_by_create(authorized_client, test_posts, update_data):
+    """TestCase checks that new post appears in list, which was cached
+    before it was created.
+    """
+    etag = authorized_client.get("/posts").headers["etag"]
+    response = authorized_client.post("/posts", json=update_data)
+    assert response.status_code == 201
+    response = authorized_client.get("/posts", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["items"][0]["title"] == update_data["title"]
@@ -59,12 +59,32 @@ def test_get_comments_view_authorized_success(
     under specific post, that can be chosen by post id.
     """
     response = authorized_client.get("/posts/1/comments")
-    res_data = map(lambda item: schemas.SendComment(**item), response.json())
+    res_data = map(lambda item: schemas.SendComment(**item), response.json()["items"])
     for my_comment in res_data:
         assert my_comment.author.id in [1, 2]
     assert response.status_code == 200
 
 
+def test_get_comments_view_constant_query_count(
+    authorized_client, add_new_authors, query_counter
+):
+    """TestCase checks that number of SQL statements, which are executed
+    to retrieve post comments, doesn't depend on number of comment authors.
+    """
+    # first request also loads black list into in-memory cache.
+    authorized_client.get("/posts/1/comments")
+    query_counter.reset()
+    response = authorized_client.get("/posts/1/comments")
+    assert len(response.json()["items"]) == 3
+    few_comments_queries = query_counter.count
+
+    add_new_authors(6)
+    query_counter.reset()
+    response = authorized_client.get("/posts/1/comments")
+    assert len(response.json()["items"]) == 9
+    assert query_counter.count == few_comments_queries
+
+
 def test_get_comments_view_authorized_non_exist_post_error(
     authorized_client, test_posts, test_comments
 ):
@@ -86,3 +106,66 @@ def test_get_comments_view_not_authorized_error(client, test_posts, test_comment
     response = client.get("/posts/1/comments")
     assert response.status_code == 401
     assert response.json().get("detail") == "Not authenticated"
+
+
+def test_get_comments_view_pagination(authorized_client, test_comments):
+    """TestCase checks that comments are returned page by page,
+    oldest comments come first.
+    """
+    response = authorized_client.get("/posts/1/comments", params={"limit": 2})
+    page = response.json()
+    assert [item["comment"] for item in page["items"]] == [
+        "First User's - First Comment",
+        "First User's - Second Comment",
+    ]
+    response = authorized_client.get(
+        "/posts/1/comments", params={"limit": 2, "cursor": page["next_cursor"]}
+    )
+    page = response.json()
+    assert [item["comment"] for item in page["items"]] == [
+        "Second User's - First Comment"
+    ]
+    assert page["next_cursor"] is None
+
+
+def test_get_comments_view_single_query(
+    authorized_client, test_comments, query_counter
+):
+    """TestCase checks that post existence is checked by the same query,
+    which loads page of comments, also for post without comments.
+    """
+    # first request also loads black list into in-memory cache.
+    authorized_client.get("/posts/2/comments")
+    query_counter.reset()
+    response = authorized_client.get("/posts/2/comments")
+    assert response.status_code == 200
+    assert response.json() == {"items": [], "next_cursor": None}
+    assert len([s for s in query_counter.statements if "comments" in s]) == 1
+    assert len([s for s in query_counter.statements if "posts" in s]) == 1
+
+
+def test_get_comments_view_invalid_cursor_error(authorized_client, test_comments):
+    """TestCase checks that cursor, which wasn't issued by server, is rejected."""
+    response = authorized_client.get("/posts/1/comments", params={"cursor": "abc"})
+    assert response.status_code == 400
+
+
+def test_create_comment_view_counts_comments(
+    authorized_client, test_posts, new_comment
+):
+    """TestCase checks that comment counter of post is increased and
+    shown in post list, without changing modification time of post.
+    ETag changes, so client which has post without new comments gets it
+    again instead of 304.
+    """
+    first = authorized_client.get("/posts/1")
+    etag = first.headers["etag"]
+    authorized_client.post("/posts/1/comments", json=new_comment)
+    authorized_client.post("/posts/1/comments", json=new_comment)
+    response = authorized_client.get("/posts/1", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["comment_count"] == 2
+    assert response.json()["updated_at"] == first.json()["updated_at"]
+    assert response.headers["etag"] != etag
+    items = authorized_client.get("/posts").json()["items"]
+    assert {item["title"]: item["comment_count"] for item in items}["post 1"] == 2
@@ -0,0 +1,117 @@
+"""Module is responsible for testing database engine configuration
+and instrumented connection pools.
+"""
+
+import anyio
+import pytest
+from sqlalchemy import create_engine, text
+
+from app import database
+from app.config import settings
+from app.pool import TimedQueuePool, WaitHistogram
+from tests.conftest import SQLALCHEMY_DATABASE_URL, TestSessionLocal, engine
+
+
+@pytest.mark.parametrize(
+    "async_driver, expected",
+    [
+        (False, {"options": "-c statement_timeout=1500"}),
+        (True, {"server_settings": {"statement_timeout": "1500"}}),
+    ],
+)
+def test_connect_args_statement_timeout(monkeypatch, async_driver, expected):
+    """TestCase checks that statement timeout is set once per connection,
+    when application connects to PostgreSQL directly.
+    """
+    monkeypatch.setattr(settings, "db_pgbouncer", False)
+    monkeypatch.setattr(settings, "db_statement_timeout_ms", 1500)
+    assert database.connect_args(async_driver) == expected
+
+
+def test_connect_args_pgbouncer(monkeypatch):
+    """TestCase checks that no session level state is used, when
+    application connects through PgBouncer in transaction mode,
+    prepared statements of asyncpg get unique names.
+    """
+    monkeypatch.setattr(settings, "db_pgbouncer", True)
+    monkeypatch.setattr(settings, "db_statement_timeout_ms", 1500)
+    assert database.connect_args(async_driver=False) == {}
+    async_args = database.connect_args(async_driver=True)
+    assert async_args == {
+        "prepared_statement_cache_size": 0,
+        "prepared_statement_name_func": database.unique_statement_name,
+    }
+    names = {async_args["prepared_statement_name_func"]() for _ in range(3)}
+    assert len(names) == 3
+    assert all(name.startswith("__asyncpg_") for name in names)
+
+
+def test_pgbouncer_statement_timeout_per_transaction(monkeypatch):
+    """TestCase checks that in PgBouncer mode statement timeout
+    is set for every transaction and doesn't outlive it.
+    """
+    monkeypatch.setattr(settings, "db_pgbouncer", True)
+    monkeypatch.setattr(settings, "db_statement_timeout_ms", 1500)
+    with database.AppSession(bind=engine) as db:
+        assert db.execute(text("SHOW statement_timeout")).scalar() == "1500ms"
+        db.commit()
+        monkeypatch.setattr(settings, "db_pgbouncer", False)
+        assert db.execute(text("SHOW statement_timeout")).scalar() != "1500ms"
+
+
+def test_wait_histogram_buckets():
+    """TestCase checks that wait times are counted into right buckets."""
+    histogram = WaitHistogram()
+    for seconds in (0.0005, 0.003, 0.003, 2, 100):
+        histogram.observe(seconds)
+    data = histogram.as_dict()
+    assert data["count"] == 5
+    assert data["buckets"]["0.001"] == 1
+    assert data["buckets"]["0.005"] == 2
+    assert data["buckets"]["5.0"] == 1
+    assert data["buckets"]["inf"] == 1
+
+
+def test_timed_pool_measures_checkout():
+    """TestCase checks that instrumented pool measures every checkout
+    and reports checked out connections.
+    """
+    timed_engine = create_engine(SQLALCHEMY_DATABASE_URL, poolclass=TimedQueuePool)
+    with timed_engine.connect():
+        assert timed_engine.pool.checkedout() == 1
+    with timed_engine.connect():
+        pass
+    assert timed_engine.pool.wait_histogram.total == 2
+    timed_engine.dispose()
+
+
+def test_metrics_view_pool_metrics(client, metrics_headers):
+    """TestCase checks that internal metrics endpoint exposes state
+    of both connection pools.
+    """
+    response = client.get("/internal/metrics", headers=metrics_headers)
+    pool_metrics = response.json()["pool"]
+    assert response.status_code == 200
+    for name in ("sync", "async"):
+        assert pool_metrics[name]["size"] == settings.db_pool_size
+        assert "checkout_wait" in pool_metrics[name]
+
+
+def test_threadpool_session_takes_slot_lazily():
+    """TestCase checks that sync session takes pool slot on its first
+    database call only and gives it back when it is closed.
+    """
+
+    async def use_session():
+        slots = anyio.Semaphore(1)
+        db = database.ThreadpoolSession(TestSessionLocal(), slots)
+        assert slots.value == 1
+        assert await db.scalar(text("SELECT 1")) == 1
+        assert slots.value == 0
+        await db.close()
+        assert slots.value == 1
+        unused = database.ThreadpoolSession(TestSessionLocal(), slots)
+        await unused.close()
+        assert slots.value == 1
+
+    anyio.run(use_session)
@@ -0,0 +1,59 @@
+"""Module is responsible for testing streaming export of posts and comments."""
+
+import json
+
+from app.config import settings
+
+
+def read_lines(response) -> list:
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_export_posts(authorized_client, test_posts, monkeypatch):
+    """TestCase checks that every post is streamed as separate JSON line
+    ordered by id, also when table is read by several chunks.
+    """
+    monkeypatch.setattr(settings, "export_chunk_size", 4)
+    response = authorized_client.get("/posts/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    posts = read_lines(response)
+    assert [post["id"] for post in posts] == [1, 2, 3, 4, 5, 6]
+    assert posts[0]["title"] == "post 1"
+    assert posts[0]["author"]["id"] == 1
+    assert posts[5]["author"]["id"] == 2
+
+
+def test_export_posts_resume(authorized_client, test_posts):
+    """TestCase checks that export continues after post given by after_id."""
+    response = authorized_client.get("/posts/export", params={"after_id": 4})
+    assert [post["id"] for post in read_lines(response)] == [5, 6]
+
+
+def test_export_posts_not_authorized_error(client, test_posts):
+    """TestCase checks that not-authorized user can't export posts."""
+    response = client.get("/posts/export")
+    assert response.status_code == 401
+
+
+def test_export_comments(authorized_client, test_comments, monkeypatch):
+    """TestCase checks that comments of chosen post are streamed
+    and export can be resumed.
+    """
+    monkeypatch.setattr(settings, "export_chunk_size", 2)
+    response = authorized_client.get("/posts/1/comments/export")
+    assert response.status_code == 200
+    comments = read_lines(response)
+    assert [comment["id"] for comment in comments] == [1, 2, 3]
+    assert comments[2]["author"]["id"] == 2
+    response = authorized_client.get(
+        "/posts/1/comments/export", params={"after_id": comments[0]["id"]}
+    )
+    assert [comment["id"] for comment in read_lines(response)] == [2, 3]
+
+
+def test_export_comments_non_exist_post_error(authorized_client, test_posts):
+    """TestCase checks that 404 error is raised for post which doesn't exist."""
+    response = authorized_client.get("/posts/100/comments/export")
+    assert response.status_code == 404
+    assert response.json().get("detail") == "Post with id 100 not exists"
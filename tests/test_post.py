@@ -10,10 +10,91 @@ from app import schemas
 def test_all_post_view_authorized_success(authorized_client, test_posts):
     """TestCase checks that authorized user can retrieve all post data."""
     response = authorized_client.get("/posts")
-    res_data = map(lambda item: schemas.SendPost(**item), response.json())
-    for my_post in res_data:
+    res_data = schemas.PostPage(**response.json())
+    for my_post in res_data.items:
         assert my_post.author.id in [1, 2]
     assert response.status_code == 200
+    assert len(res_data.items) == 6
+    assert res_data.next_cursor is None
+
+
+def test_all_post_view_authorized_pagination(authorized_client, test_posts):
+    """TestCase checks that authorized user can walk through all posts
+    page by page by using next_cursor, and every post is returned once.
+    """
+    titles = []
+    cursor = None
+    for _ in range(3):
+        params = {"limit": 2}
+        if cursor is not None:
+            params["cursor"] = cursor
+        response = authorized_client.get("/posts", params=params)
+        res_data = schemas.PostPage(**response.json())
+        assert response.status_code == 200
+        assert len(res_data.items) == 2
+        titles.extend(my_post.title for my_post in res_data.items)
+        cursor = res_data.next_cursor
+    assert cursor is None
+    assert len(set(titles)) == 6
+
+
+@pytest.mark.parametrize(
+    "params, titles",
+    [
+        ({"author_id": 2}, {"another post 1", "another post 2"}),
+        ({"min_price": 25, "max_price": 27}, {"post 3", "post 4"}),
+        ({"is_active": False}, set()),
+        ({"author_id": 1, "min_price": 26}, {"post 4"}),
+    ],
+)
+def test_all_post_view_authorized_filters(
+    authorized_client, test_posts, params, titles
+):
+    """TestCase checks that authorized user can filter posts by
+    author, activity status and price range.
+    """
+    response = authorized_client.get("/posts", params=params)
+    res_data = schemas.PostPage(**response.json())
+    assert response.status_code == 200
+    assert {my_post.title for my_post in res_data.items} == titles
+
+
+def test_all_post_view_authorized_invalid_cursor_error(authorized_client, test_posts):
+    """TestCase checks that if authorized user provides cursor, that
+    was not generated by server, then 400 exception error will be raised.
+    """
+    response = authorized_client.get("/posts", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+    assert response.json().get("detail") == "Invalid cursor!"
+
+
+@pytest.mark.parametrize("limit", [0, 101])
+def test_all_post_view_authorized_limit_error(authorized_client, test_posts, limit):
+    """TestCase checks that page size is bounded and, 422 exception
+    error will be raised for out of range limit.
+    """
+    response = authorized_client.get("/posts", params={"limit": limit})
+    assert response.status_code == 422
+
+
+def test_all_post_view_constant_query_count(
+    authorized_client, add_new_authors, query_counter, no_response_cache
+):
+    """TestCase checks that number of SQL statements, which are executed
+    to retrieve post list, doesn't depend on number of posts and authors.
+    """
+    # first request also loads black list into in-memory cache.
+    authorized_client.get("/posts")
+    query_counter.reset()
+    response = authorized_client.get("/posts")
+    assert len(response.json()["items"]) == 6
+    few_posts_queries = query_counter.count
+
+    add_new_authors(6)
+    query_counter.reset()
+    response = authorized_client.get("/posts")
+    assert len(response.json()["items"]) == 12
+    assert query_counter.count == few_posts_queries
 
 
 def test_all_post_view_not_authorized_error(client, test_posts):
@@ -268,3 +349,92 @@ def test_put_post_view_not_authorized_error(client, test_posts, update_data):
     response = client.put("/posts/1", json=update_data)
     assert response.status_code == 401
     assert response.json().get("detail") == "Not authenticated"
+
+
+def test_put_post_view_single_statement(
+    authorized_client, test_posts, update_data, query_counter
+):
+    """TestCase checks that post is checked, updated and returned together
+    with its author by one statement, without reading anything else.
+    """
+    # first request also loads black list into in-memory cache.
+    authorized_client.get("/users/1")
+    query_counter.reset()
+    response = authorized_client.put("/posts/1", json=update_data)
+    assert response.status_code == 200
+    assert len(query_counter.statements) == 1
+    assert query_counter.statements[0].startswith("UPDATE posts")
+    assert "RETURNING" in query_counter.statements[0]
+    assert response.json()["author"]["username"] == "nata"
+
+
+@pytest.mark.committed
+def test_put_post_view_if_match_success(authorized_client, test_posts, update_data):
+    """TestCase checks that post is updated, when client sends ETag of
+    current version, and new ETag is returned.
+    """
+    etag = authorized_client.get("/posts/1").headers["etag"]
+    response = authorized_client.put(
+        "/posts/1", json=update_data, headers={"If-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.headers["etag"] == authorized_client.get("/posts/1").headers["etag"]
+
+
+@pytest.mark.committed
+def test_put_post_view_if_match_modified_error(
+    authorized_client, test_posts, update_data
+):
+    """TestCase checks that if post was modified since client received
+    its ETag, then 412 exception error will be raised and post isn't changed.
+    """
+    etag = authorized_client.get("/posts/1").headers["etag"]
+    assert authorized_client.put("/posts/1", json=update_data).status_code == 200
+    response = authorized_client.put(
+        "/posts/1", json={**update_data, "title": "lost"}, headers={"If-Match": etag}
+    )
+    assert response.status_code == 412
+    assert response.json().get("detail") == "post with id: 1, has been modified!"
+    assert authorized_client.get("/posts/1").json()["title"] == update_data["title"]
+
+
+def test_put_post_view_if_match_after_comment(
+    authorized_client, test_posts, update_data, new_comment
+):
+    """TestCase checks that comment, which changes ETag of post, doesn't
+    make update of post with ETag received before it fail.
+    """
+    etag = authorized_client.get("/posts/1").headers["etag"]
+    assert (
+        authorized_client.post("/posts/1/comments", json=new_comment).status_code == 201
+    )
+    response = authorized_client.put(
+        "/posts/1", json=update_data, headers={"If-Match": etag}
+    )
+    assert response.status_code == 200
+
+
+def test_put_post_view_if_match_others_post_error(
+    authorized_client, test_posts, update_data
+):
+    """TestCase checks that ownership is checked before precondition."""
+    response = authorized_client.put(
+        "/posts/5", json=update_data, headers={"If-Match": 'W/"5-0-0"'}
+    )
+    assert response.status_code == 403
+
+
+@pytest.mark.committed
+def test_delete_post_view_if_match(authorized_client, test_posts, update_data):
+    """TestCase checks that post is deleted only if client has seen
+    its current version.
+    """
+    etag = authorized_client.get("/posts/1").headers["etag"]
+    assert authorized_client.put("/posts/1", json=update_data).status_code == 200
+    response = authorized_client.delete("/posts/1", headers={"If-Match": etag})
+    assert response.status_code == 412
+    etag = authorized_client.get("/posts/1").headers["etag"]
+    response = authorized_client.delete("/posts/1", headers={"If-Match": etag})
+    assert response.status_code == 200
+    assert authorized_client.get("/posts/1").status_code == 404
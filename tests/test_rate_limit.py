@@ -0,0 +1,165 @@
+"""Module is responsible for testing rate limiting middleware."""
+
+import anyio
+import pytest
+
+from app import oauth2
+from app.config import settings
+from app.oauth2 import create_access_token
+from app.rate_limit import MemoryRateLimitBackend, RateLimiter, Rule, rate_limiter
+
+
+@pytest.fixture
+def limits():
+    """fixture gives function, which replaces rules of the rate limiter,
+    rules from settings are restored after test.
+    """
+    yield rate_limiter.configure
+    rate_limiter.configure(settings.rate_limits)
+
+
+def test_rule_parse():
+    """TestCase checks that limit is parsed into bucket size and refill rate,
+    invalid limits are rejected.
+    """
+    rule = Rule.parse("POST /login", "30/minute")
+    assert (rule.limit, rule.period, rule.refill_per_second) == (30, 60, 0.5)
+    for value in ("30", "30/week", "0/minute", "many/second"):
+        with pytest.raises(ValueError):
+            Rule.parse("POST /login", value)
+
+
+def test_memory_backend_refills_bucket():
+    """TestCase checks that empty bucket gets tokens back over time,
+    but never more than its limit.
+    """
+    now = 100.0
+    backend = MemoryRateLimitBackend(max_keys=10)
+    backend.clock = lambda: now
+    rule = Rule("GET /posts/", limit=2, period=10)
+
+    async def scenario():
+        nonlocal now
+        assert await backend.take("key", rule) == (True, 1)
+        assert await backend.take("key", rule) == (True, 0)
+        assert await backend.take("key", rule) == (False, 0)
+        now += 5
+        assert await backend.take("key", rule) == (True, 0)
+        now += 1000
+        assert await backend.take("key", rule) == (True, 1)
+
+    anyio.run(scenario)
+
+
+def test_memory_backend_evicts_least_recently_used():
+    """TestCase checks that number of buckets is limited and evicted
+    bucket starts full again.
+    """
+    backend = MemoryRateLimitBackend(max_keys=2)
+    rule = Rule("GET /posts/", limit=1, period=60)
+
+    async def scenario():
+        for key in ("first", "second", "third"):
+            assert (await backend.take(key, rule))[0]
+        assert not (await backend.take("third", rule))[0]
+        assert (await backend.take("first", rule))[0]
+
+    anyio.run(scenario)
+
+
+def test_limiter_matches_routes():
+    """TestCase checks that rules are found by method and path,
+    paths with parameters included.
+    """
+    limiter = RateLimiter(
+        MemoryRateLimitBackend(max_keys=10),
+        {"POST /login": "1/second", "GET /posts/{id}": "2/second"},
+    )
+    assert limiter.rule("POST", "/login").limit == 1
+    assert limiter.rule("GET", "/posts/7").limit == 2
+    assert limiter.rule("GET", "/login") is None
+    assert limiter.rule("GET", "/posts/7/comments") is None
+
+
+def test_login_limited_by_ip(client, limits, test_user, monkeypatch):
+    """TestCase checks that client, who used up limit of login view,
+    gets 429 with Retry-After and RateLimit headers.
+    """
+    # clock of limiter is stopped, so time of password checks doesn't
+    # refill the bucket and headers don't depend on it.
+    monkeypatch.setattr(rate_limiter.backend, "clock", lambda: 1000.0)
+    limits({"POST /login": "2/minute"})
+    credentials = {"username": "nata", "password": "wrong"}
+    first = client.post("/login", data=credentials)
+    assert first.status_code == 403
+    assert first.headers["RateLimit-Limit"] == "2"
+    assert first.headers["RateLimit-Remaining"] == "1"
+    assert first.headers["RateLimit-Policy"] == "2;w=60"
+    assert client.post("/login", data=credentials).status_code == 403
+    response = client.post("/login", data=credentials)
+    assert response.status_code == 429
+    assert response.json() == {"detail": "Too many requests!"}
+    assert response.headers["RateLimit-Remaining"] == "0"
+    assert response.headers["Retry-After"] == "30"
+    assert response.headers["RateLimit-Reset"] == "60"
+
+
+def test_posts_limited_by_author(client, limits, test_user, test_second_user):
+    """TestCase checks that every author has own bucket and
+    requests without token share bucket of their IP address.
+    """
+    limits({"GET /posts/": "1/minute"})
+    for author in (test_user, test_second_user):
+        token = create_access_token(data={"author_id": author["id"]})
+        headers = {"Authorization": f"Bearer {token}"}
+        assert client.get("/posts/", headers=headers).status_code == 200
+        assert client.get("/posts/", headers=headers).status_code == 429
+    assert client.get("/posts/").status_code == 401
+    assert client.get("/posts/").status_code == 429
+
+
+def test_invalid_token_limited_by_ip(client, limits, test_user):
+    """TestCase checks that token, which can't be verified, doesn't give
+    client new bucket.
+    """
+    limits({"GET /posts/": "1/minute"})
+    assert (
+        client.get("/posts/", headers={"Authorization": "Bearer a"}).status_code == 403
+    )
+    assert (
+        client.get("/posts/", headers={"Authorization": "Bearer b"}).status_code == 429
+    )
+
+
+def test_token_verified_once_per_request(authorized_client, limits):
+    """TestCase checks that route reuses claims, which were verified
+    by the rate limiter during the same request, and limiter finds claims
+    of known token in cache of decoded tokens.
+    """
+    limits({"GET /posts/": "10/minute"})
+    assert authorized_client.get("/posts/").status_code == 200
+    assert oauth2.decoded_tokens.stats() == {"size": 1, "hits": 0, "misses": 1}
+    assert authorized_client.get("/posts/").status_code == 200
+    assert oauth2.decoded_tokens.stats() == {"size": 1, "hits": 1, "misses": 1}
+
+
+def test_unlimited_route_has_no_headers(client, limits):
+    """TestCase checks that routes without rule aren't touched by limiter."""
+    limits({"POST /login": "1/minute"})
+    response = client.get("/")
+    assert response.status_code == 200
+    assert "RateLimit-Limit" not in response.headers
+
+
+def test_backend_failure_lets_request_through(client, limits, monkeypatch):
+    """TestCase checks that request isn't rejected, when backend fails."""
+
+    async def broken_take(key, rule):
+        raise ConnectionError("backend is down")
+
+    limits({"GET /": "1/minute"})
+    monkeypatch.setattr(rate_limiter.backend, "take", broken_take)
+    for _ in range(2):
+        response = client.get("/")
+        assert response.status_code == 200
+        assert "RateLimit-Limit" not in response.headers
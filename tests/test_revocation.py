@@ -0,0 +1,71 @@
+"""Module is responsible for testing in-memory token revocation cache."""
+
+import time
+from datetime import datetime, timezone
+
+from jose import jwt
+
+from app import models
+from app.revocation import RevocationCache, revocation_cache
+
+
+def test_revocation_cache_add_and_expire():
+    """TestCase checks that revoked token is reported until its expiration,
+    and already expired tokens are not stored at all.
+    """
+    cache = RevocationCache(max_size=10, sync_seconds=5)
+    cache.add("live", time.time() + 60)
+    cache.add("expired", time.time() - 1)
+    assert cache.is_revoked("live") is True
+    assert cache.is_revoked("expired") is False
+    assert cache.is_revoked("unknown") is False
+
+
+def test_revocation_cache_overflow_is_not_trusted():
+    """TestCase checks that when cache had to drop live token, it doesn't
+    give negative answers anymore, so caller must ask database.
+    """
+    cache = RevocationCache(max_size=2, sync_seconds=5)
+    for number in range(3):
+        cache.add(f"token-{number}", time.time() + 60 + number)
+    assert cache.is_revoked("token-2") is True
+    assert cache.is_revoked("token-0") is None
+
+
+def test_revoked_token_is_rejected_without_blacklist_query(
+    authorized_client, query_counter
+):
+    """TestCase checks that after logout the same token is rejected and,
+    black list table isn't queried on every request.
+    """
+    authorized_client.get("/users/1")
+    query_counter.reset()
+    response = authorized_client.get("/users/1")
+    assert response.status_code == 200
+    assert not any("blacklist" in statement for statement in query_counter.statements)
+
+    authorized_client.get("/logout")
+    response = authorized_client.get("/users/1")
+    assert response.status_code == 403
+
+
+def test_token_revoked_by_other_worker_is_synced(
+    authorized_client, token, session, monkeypatch
+):
+    """TestCase checks that token, which was written into black list table
+    by another worker, is rejected after the next sync.
+    """
+    assert authorized_client.get("/users/1").status_code == 200
+    claims = jwt.get_unverified_claims(token)
+    session.add(
+        models.BlackList(
+            jti=claims["jti"],
+            exp=datetime.fromtimestamp(claims["exp"], timezone.utc),
+            user_id=1,
+        )
+    )
+    session.commit()
+    # sync interval hasn't passed yet, so token is still accepted.
+    assert authorized_client.get("/users/1").status_code == 200
+    monkeypatch.setattr(revocation_cache, "sync_seconds", 0)
+    assert authorized_client.get("/users/1").status_code == 403
@@ -0,0 +1,210 @@
+"""Module is responsible for testing full-text search over posts, both on
+PostgreSQL and on SQLite FTS5 fallback.
+"""
+
+from datetime import datetime, timezone
+
+import anyio
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import models, search
+from app.database import Base, ThreadpoolSession
+from tests.conftest import engine
+
+
+@pytest.fixture
+def search_posts(test_user, session) -> None:
+    session.add_all(
+        [
+            models.Post(
+                title="Vintage bicycle",
+                description="Red road bicycle in good condition",
+                price=120,
+                author_id=test_user["id"],
+            ),
+            models.Post(
+                title="Mountain boots",
+                description="Boots for hiking, fit a bicycle trip as well",
+                price=60,
+                author_id=test_user["id"],
+            ),
+            models.Post(
+                title="Kitchen table",
+                description="Wooden table with four chairs",
+                price=80,
+                author_id=test_user["id"],
+            ),
+        ]
+    )
+    session.commit()
+
+
+def test_search_view_ranked(authorized_client, search_posts):
+    """TestCase checks that matching posts are returned, post which
+    matches by title comes before post which matches by description.
+    """
+    response = authorized_client.get("/posts/search", params={"q": "bicycles"})
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert [item["title"] for item in items] == ["Vintage bicycle", "Mountain boots"]
+    assert items[0]["rank"] > items[1]["rank"]
+    assert items[0]["author"]["id"] == 1
+    assert items[0]["highlight"]["title"] == "Vintage <b>bicycle</b>"
+    assert "<b>bicycle</b>" in items[1]["highlight"]["description"]
+    assert response.json()["next_offset"] is None
+
+
+def test_search_view_escapes_html(authorized_client, test_user, session):
+    """TestCase checks that markup stored in post is escaped in highlights,
+    only highlight tags themselves are left as HTML.
+    """
+    session.add(
+        models.Post(
+            title='<img src=x onerror="alert(1)"> bicycle \x02',
+            description="<script>alert(1)</script> red bicycle",
+            price=10,
+            author_id=test_user["id"],
+        )
+    )
+    session.commit()
+    response = authorized_client.get("/posts/search", params={"q": "bicycle"})
+    highlight = response.json()["items"][0]["highlight"]
+    assert highlight["title"] == (
+        "&lt;img src=x onerror=&quot;alert(1)&quot;&gt; <b>bicycle</b> "
+    )
+    assert "<b>bicycle</b>" in highlight["description"]
+    assert "<script>" not in highlight["description"]
+
+
+def test_search_objects_skipped_by_autogenerate(session):
+    """TestCase checks that migrations autogenerate doesn't propose to drop
+    search column and index, which aren't declared on the model.
+    """
+    with engine.connect() as connection:
+        context = MigrationContext.configure(
+            connection, opts={"include_object": models.include_object}
+        )
+        assert compare_metadata(context, Base.metadata) == []
+
+
+def test_search_view_pagination(authorized_client, search_posts):
+    """TestCase checks that search results are returned page by page."""
+    response = authorized_client.get(
+        "/posts/search", params={"q": "bicycle", "limit": 1}
+    )
+    page = response.json()
+    assert [item["title"] for item in page["items"]] == ["Vintage bicycle"]
+    assert page["next_offset"] == 1
+    response = authorized_client.get(
+        "/posts/search", params={"q": "bicycle", "limit": 1, "offset": 1}
+    )
+    page = response.json()
+    assert [item["title"] for item in page["items"]] == ["Mountain boots"]
+    assert page["next_offset"] is None
+
+
+def test_search_view_no_match(authorized_client, search_posts):
+    """TestCase checks that query with special characters doesn't fail."""
+    response = authorized_client.get("/posts/search", params={"q": 'sofa & "(bed'})
+    assert response.status_code == 200
+    assert response.json()["items"] == []
+
+
+def test_search_view_validation_error(authorized_client):
+    """TestCase checks that query can't be empty."""
+    response = authorized_client.get("/posts/search", params={"q": ""})
+    assert response.status_code == 422
+
+
+def test_search_view_not_authorized_error(client):
+    """TestCase checks that not-authorized user can't search posts."""
+    response = client.get("/posts/search", params={"q": "bicycle"})
+    assert response.status_code == 401
+
+
+@pytest.fixture
+def sqlite_db():
+    """fixture creates in-memory SQLite database with FTS5 search table."""
+    # the only connection is shared, because ThreadpoolSession
+    # uses it from threadpool.
+    engine = create_engine(
+        "sqlite://",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+    tables = [models.Author.__table__, models.Post.__table__]
+    Base.metadata.create_all(engine, tables=tables)
+    db = sessionmaker(bind=engine)()
+    created_at = datetime(2023, 6, 1, tzinfo=timezone.utc)
+    db.add(
+        models.Author(
+            id=1,
+            username="nata",
+            email="fighter@gmail.com",
+            password="hash",
+            created_at=created_at,
+        )
+    )
+    db.add_all(
+        [
+            models.Post(
+                title=title,
+                description=description,
+                price=10,
+                is_active=True,
+                author_id=1,
+                created_at=created_at,
+                updated_at=created_at,
+            )
+            for title, description in [
+                ("Vintage bicycle", "Red road bicycle"),
+                ("Mountain boots", "Boots for a bicycle trip"),
+                ("Kitchen table", "Wooden table"),
+            ]
+        ]
+    )
+    db.commit()
+    yield ThreadpoolSession(db)
+    db.close()
+    Base.metadata.drop_all(engine, tables=tables)
+
+
+def test_sqlite_search(sqlite_db):
+    """TestCase checks that SQLite FTS5 fallback ranks and highlights
+    matches the same way as PostgreSQL search does.
+    """
+    items, next_offset = anyio.run(search.search_posts, sqlite_db, "bicycle", 10, 0)
+    assert [item["title"] for item in items] == ["Vintage bicycle", "Mountain boots"]
+    assert items[0]["highlight"]["title"] == "Vintage <b>bicycle</b>"
+    assert next_offset is None
+
+
+def test_highlight_html():
+    """TestCase checks that highlighted fragment is escaped and marks of
+    matched words become highlight tags.
+    """
+    fragment = "<i>a & b</i> \x02bicycle\x03"
+    assert search.highlight_html(fragment) == (
+        "&lt;i&gt;a &amp; b&lt;/i&gt; <b>bicycle</b>"
+    )
+
+
+def test_sqlite_search_follows_changes(sqlite_db):
+    """TestCase checks that FTS5 table is updated together with posts
+    and special characters of query are searched as plain text.
+    """
+    post = sqlite_db.sync_session.get(models.Post, 3)
+    post.title = "Bicycle table"
+    sqlite_db.sync_session.commit()
+    items, _ = anyio.run(search.search_posts, sqlite_db, "table", 10, 0)
+    assert [item["title"] for item in items] == ["Bicycle table"]
+    items, next_offset = anyio.run(search.search_posts, sqlite_db, "bicycle", 1, 0)
+    assert len(items) == 1
+    assert next_offset == 1
+    items, _ = anyio.run(search.search_posts, sqlite_db, 'table" OR "boots', 10, 0)
+    assert items == []
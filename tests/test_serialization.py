@@ -0,0 +1,54 @@
+"""Module is responsible for testing that fast serialization of list
+responses gives the same documents as pydantic orm_mode serialization.
+"""
+
+import json
+from datetime import datetime, timezone
+
+from app import schemas, serialization
+from app.main import app
+from benchmarks.serialization import (
+    fast_body,
+    make_post_objects,
+    make_post_rows,
+    pydantic_body,
+)
+
+
+def test_post_rows_match_pydantic_output():
+    """TestCase checks that fast path produces the same document
+    as pydantic serialization of SendPost models.
+    """
+    rows = make_post_rows(50)
+    assert json.loads(fast_body(rows)) == json.loads(
+        pydantic_body(make_post_objects(rows))
+    )
+
+
+def test_comment_rows_match_pydantic_output():
+    """TestCase checks that comment rows are serialized as SendComment."""
+    created_at = datetime(2023, 6, 1, tzinfo=timezone.utc)
+    rows = [("nice post", created_at, "nata", "fighter@gmail.com", 1)]
+    comments = [
+        schemas.SendComment(
+            comment="nice post",
+            created_at=created_at,
+            author=schemas.SendUser(username="nata", email="fighter@gmail.com", id=1),
+        )
+    ]
+    expected = [json.loads(comment.json()) for comment in comments]
+    body = serialization.dumps(serialization.comment_rows_to_dicts(rows))
+    assert json.loads(body) == expected
+
+
+def test_openapi_schema_unchanged():
+    """TestCase checks that list endpoints still document their models."""
+    paths = app.openapi()["paths"]
+    posts_schema = paths["/posts/"]["get"]["responses"]["200"]["content"][
+        "application/json"
+    ]["schema"]
+    assert {"$ref": "#/components/schemas/PostPage"} in posts_schema["anyOf"]
+    comments_schema = paths["/posts/{id}/comments"]["get"]["responses"]["200"][
+        "content"
+    ]["application/json"]["schema"]
+    assert comments_schema == {"$ref": "#/components/schemas/CommentPage"}
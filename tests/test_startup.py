@@ -0,0 +1,59 @@
+"""Module is responsible for testing that application starts without
+database and heavy dependencies, which aren't needed before first request.
+"""
+
+import os
+import subprocess
+import sys
+
+import anyio
+
+from app import database
+
+
+WORKER_SCRIPT = """
+import asyncio, sys
+import httpx
+from app.main import app
+
+HEAVY_MODULES = ("psycopg2", "asyncpg", "jose", "passlib")
+
+async def main():
+    assert not [name for name in HEAVY_MODULES if name in sys.modules]
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        async with app.router.lifespan_context(app):
+            assert (await client.get("/")).status_code == 200
+
+asyncio.run(main())
+"""
+
+
+def test_worker_starts_without_database():
+    """TestCase checks that importing and starting the application neither
+    connects to database nor loads database drivers, jose and passlib.
+    """
+    environment = {**os.environ, "DB_HOSTNAME": "database.invalid"}
+    result = subprocess.run(
+        [sys.executable, "-c", WORKER_SCRIPT],
+        env=environment,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+
+
+def test_create_and_dispose_engines():
+    """TestCase checks that engines are created once and are forgotten,
+    when they are disposed.
+    """
+    database.create_engines()
+    engine = database.engine
+    database.create_engines()
+    assert database.engine is engine
+    assert database.SessionLocal.kw["bind"] is engine
+
+    anyio.run(database.dispose_engines)
+    assert database.engine is None
+    assert database.async_engine is None
+    assert database.SessionLocal is None
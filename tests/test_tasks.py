@@ -0,0 +1,107 @@
+"""Module is responsible for testing background maintenance tasks."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import models, tasks
+from app.config import settings
+from tests.conftest import TestSessionLocal
+
+
+# purge task opens its own sessions, they must see data of the test.
+pytestmark = pytest.mark.committed
+
+
+def add_black_tokens(session, amount: int, minutes: int) -> None:
+    now = datetime.now(timezone.utc)
+    session.add_all(
+        [
+            models.BlackList(
+                jti=f"{minutes}-{number}".ljust(32, "0"),
+                exp=now + timedelta(minutes=minutes),
+                user_id=1,
+            )
+            for number in range(amount)
+        ]
+    )
+    session.commit()
+
+
+def test_purge_black_list_removes_expired_tokens(session, monkeypatch):
+    """TestCase checks that purge task removes only expired tokens,
+    batch by batch, and updates purge metrics.
+    """
+    add_black_tokens(session, 7, minutes=-5)
+    add_black_tokens(session, 2, minutes=5)
+    monkeypatch.setattr(settings, "blacklist_purge_batch_size", 3)
+    runs = tasks.purge_metrics["runs"]
+
+    removed = tasks.purge_black_list(TestSessionLocal)
+
+    assert removed == 7
+    assert session.query(models.BlackList).count() == 2
+    assert tasks.purge_metrics["runs"] == runs + 1
+    assert tasks.purge_metrics["last_rows_purged"] == 7
+    assert tasks.purge_metrics["backlog"] == 0
+
+
+def test_purge_black_list_reports_backlog(session, monkeypatch):
+    """TestCase checks that purge task stops after max batches and,
+    reports number of expired tokens, which are left for the next run.
+    """
+    add_black_tokens(session, 7, minutes=-5)
+    monkeypatch.setattr(settings, "blacklist_purge_batch_size", 2)
+    monkeypatch.setattr(settings, "blacklist_purge_max_batches", 2)
+
+    removed = tasks.purge_black_list(TestSessionLocal)
+
+    assert removed == 4
+    assert tasks.purge_metrics["backlog"] == 3
+
+
+def test_metrics_view_purge_metrics(client, metrics_headers):
+    """TestCase checks that internal metrics endpoint exposes purge metrics."""
+    response = client.get("/internal/metrics", headers=metrics_headers)
+    assert response.status_code == 200
+    assert set(response.json()["blacklist_purge"]) == set(tasks.purge_metrics)
+
+
+def test_metrics_view_turned_off_without_token(client):
+    """TestCase checks that internal metrics endpoint doesn't exist,
+    when metrics token isn't configured.
+    """
+    assert client.get("/internal/metrics").status_code == 404
+
+
+def test_metrics_view_rejects_other_credentials(authorized_client, metrics_headers):
+    """TestCase checks that internal metrics aren't served to authors
+    or callers with wrong metrics token.
+    """
+    assert authorized_client.get("/internal/metrics").status_code == 401
+    response = authorized_client.get(
+        "/internal/metrics", headers={"Authorization": "Bearer wrong-token"}
+    )
+    assert response.status_code == 401
+
+
+def test_purge_refresh_tokens_removes_expired_tokens(session, test_user):
+    """TestCase checks that purge task removes only expired refresh tokens."""
+    now = datetime.now(timezone.utc)
+    session.add_all(
+        [
+            models.RefreshToken(
+                token_hash=f"{number}".ljust(64, "0"),
+                family_id="f" * 32,
+                author_id=test_user["id"],
+                expires_at=now + timedelta(minutes=5 if number % 2 else -5),
+            )
+            for number in range(5)
+        ]
+    )
+    session.commit()
+
+    removed = tasks.purge_refresh_tokens(TestSessionLocal)
+
+    assert removed == 3
+    assert session.query(models.RefreshToken).count() == 2
@@ -0,0 +1,100 @@
+"""Module is responsible for testing following views: vote, unvote
+and posts sorted by votes.
+"""
+
+from app import models
+
+
+def test_vote_view_success(authorized_client, test_posts, session):
+    """TestCase checks that vote is stored and counter of post is
+    increased, voting again changes nothing.
+    """
+    response = authorized_client.post("/posts/5/vote")
+    assert response.status_code == 200
+    assert response.json() == {"post_id": 5, "votes": 1, "voted": True}
+    response = authorized_client.post("/posts/5/vote")
+    assert response.json() == {"post_id": 5, "votes": 1, "voted": True}
+    assert session.query(models.Vote).count() == 1
+
+
+def test_vote_keeps_updated_at(authorized_client, test_posts):
+    """TestCase checks that vote doesn't change ETag of post, which is
+    used for optimistic concurrency of post updates.
+    """
+    etag = authorized_client.get("/posts/1").headers["etag"]
+    authorized_client.post("/posts/1/vote")
+    assert authorized_client.get("/posts/1").headers["etag"] == etag
+
+
+def test_vote_view_non_exist_post_error(authorized_client, test_posts):
+    """TestCase checks that user can't vote for post, which doesn't exist."""
+    response = authorized_client.post("/posts/100/vote")
+    assert response.status_code == 404
+    assert response.json().get("detail") == "post with id: 100, was not found!"
+
+
+def test_vote_view_not_authorized_error(client, test_posts):
+    """TestCase checks that not-authorized user can't vote."""
+    response = client.post("/posts/1/vote")
+    assert response.status_code == 401
+
+
+def test_unvote_view_success(authorized_client, test_posts):
+    """TestCase checks that vote is removed and counter is decreased,
+    removing it again changes nothing.
+    """
+    authorized_client.post("/posts/5/vote")
+    response = authorized_client.delete("/posts/5/vote")
+    assert response.json() == {"post_id": 5, "votes": 0, "voted": False}
+    response = authorized_client.delete("/posts/5/vote")
+    assert response.json() == {"post_id": 5, "votes": 0, "voted": False}
+    assert authorized_client.delete("/posts/100/vote").status_code == 404
+
+
+def test_one_post_with_votes(authorized_client, test_posts):
+    """TestCase checks that post is returned as PostOut with its votes."""
+    authorized_client.post("/posts/2/vote")
+    response = authorized_client.get("/posts/2", params={"with_votes": True})
+    assert response.status_code == 200
+    assert response.json()["votes"] == 1
+    assert response.json()["Post"]["title"] == "post 2"
+
+
+def test_all_post_sorted_by_votes(authorized_client, test_posts, session):
+    """TestCase checks that posts are sorted by votes page by page
+    and every post comes with its number of votes.
+    """
+    session.add_all(
+        [
+            models.Vote(author_id=1, post_id=3),
+            models.Vote(author_id=2, post_id=3),
+            models.Vote(author_id=1, post_id=6),
+        ]
+    )
+    session.query(models.Post).filter(models.Post.id == 3).update({"vote_count": 2})
+    session.query(models.Post).filter(models.Post.id == 6).update({"vote_count": 1})
+    session.commit()
+    params = {"sort": "votes", "with_votes": True, "limit": 4}
+    response = authorized_client.get("/posts", params=params)
+    assert response.status_code == 200
+    page = response.json()
+    assert [item["votes"] for item in page["items"]] == [2, 1, 0, 0]
+    assert [item["Post"]["title"] for item in page["items"][:2]] == [
+        "post 3",
+        "another post 2",
+    ]
+    response = authorized_client.get(
+        "/posts", params={**params, "cursor": page["next_cursor"]}
+    )
+    page = response.json()
+    assert [item["votes"] for item in page["items"]] == [0, 0]
+    assert page["next_cursor"] is None
+
+
+def test_all_post_vote_cursor_mismatch_error(authorized_client, test_posts):
+    """TestCase checks that cursor of other sort order is rejected."""
+    cursor = authorized_client.get("/posts", params={"limit": 1}).json()["next_cursor"]
+    response = authorized_client.get(
+        "/posts", params={"sort": "votes", "cursor": cursor}
+    )
+    assert response.status_code == 400